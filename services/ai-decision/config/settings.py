@@ -84,6 +84,30 @@ class Settings:
             return self._region
         return os.getenv('AWS_REGION', 'us-east-1')
     
+    @property
+    def db_pool_size(self) -> int:
+        """Database connection pool size (max connections)"""
+        return int(os.getenv('DB_POOL_SIZE', '16'))
+    
+    @property
+    def db_pool_min_size(self) -> int:
+        """
+        Database connections opened up front and kept open (capped at db_pool_size).
+        The pool closes returned connections beyond this many idle ones, dropping
+        their prepared statements, so it defaults to db_pool_size
+        """
+        return min(int(os.getenv('DB_POOL_MIN_SIZE', str(self.db_pool_size))), self.db_pool_size)
+    
+    @property
+    def redis_pool_size(self) -> int:
+        """Redis connection pool size (max connections)"""
+        return int(os.getenv('REDIS_POOL_SIZE', '32'))
+    
+    @property
+    def opensearch_pool_size(self) -> int:
+        """OpenSearch keep-alive HTTPS connection pool size"""
+        return int(os.getenv('OPENSEARCH_POOL_SIZE', '32'))
+    
     @property
     def db_host(self) -> str:
         """Database host"""
@@ -1,43 +1,61 @@
 """
 Core Infrastructure Module
 Core infrastructure module exporting all core classes
+
+Exports resolve lazily on first access, so importing one client (e.g. the logger)
+does not load boto3 / opensearchpy / psycopg2 / redis for all the others.
 """
 
-from .secrets_manager import SecretsManager, get_secrets_manager
-from .database import DatabaseManager, get_database_manager
-from .redis_client import RedisClient, get_redis_client
-from .ai_client import AIClient, get_ai_client
-from .bedrock_client import BedrockClient, get_bedrock_client
-from .opensearch_client import OpenSearchClient, get_opensearch_client
-from .logger import setup_logger, get_logger, create_context_logger
+import importlib
 
-__all__ = [
+# Exported name -> defining submodule
+_EXPORTS = {
+    # AWS Session
+    'get_boto_session': '.aws_session',
+    
     # Secrets Manager
-    'SecretsManager',
-    'get_secrets_manager',
+    'SecretsManager': '.secrets_manager',
+    'get_secrets_manager': '.secrets_manager',
     
     # Database
-    'DatabaseManager',
-    'get_database_manager',
+    'DatabaseManager': '.database',
+    'get_database_manager': '.database',
     
     # Redis
-    'RedisClient',
-    'get_redis_client',
+    'RedisClient': '.redis_client',
+    'get_redis_client': '.redis_client',
     
     # AI Client
-    'AIClient',
-    'get_ai_client',
+    'AIClient': '.ai_client',
+    'get_ai_client': '.ai_client',
     
     # Bedrock Client
-    'BedrockClient',
-    'get_bedrock_client',
+    'BedrockClient': '.bedrock_client',
+    'get_bedrock_client': '.bedrock_client',
     
     # OpenSearch Client
-    'OpenSearchClient',
-    'get_opensearch_client',
+    'OpenSearchClient': '.opensearch_client',
+    'get_opensearch_client': '.opensearch_client',
     
     # Logger
-    'setup_logger',
-    'get_logger',
-    'create_context_logger',
-]
+    'setup_logger': '.logger',
+    'get_logger': '.logger',
+    'create_context_logger': '.logger',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    """Import the defining submodule on first access (PEP 562)"""
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -3,9 +3,11 @@ AI Client (BaiCai API)
 Unified BaiCai API client with retries and error handling
 """
 
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
 import time
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator
 from .logger import get_logger
 
 logger = get_logger()
@@ -20,7 +22,8 @@ class AIClient:
         api_key: str,
         timeout: int = 200,
         max_retries: int = 3,
-        retry_delay: int = 1
+        retry_delay: int = 1,
+        pool_maxsize: int = 10
     ):
         """
         Initialize the AI client
@@ -31,6 +34,7 @@ class AIClient:
             timeout: request timeout (seconds)
             max_retries: max retries
             retry_delay: retry delay (seconds)
+            pool_maxsize: max pooled keep-alive connections to the API host
         """
         self.api_url = api_url.rstrip('/')
         self.api_key = api_key
@@ -43,6 +47,14 @@ class AIClient:
             'Authorization': f'Bearer {api_key}',
             'Content-Type': 'application/json'
         }
+        
+        # Keep-alive session: repeated calls to the same provider reuse TCP+TLS
+        # connections instead of handshaking on every request
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
     
     def call(
         self,
@@ -90,9 +102,8 @@ class AIClient:
                     extra={'details': {'model': model, 'endpoint': endpoint}}
                 )
                 
-                response = requests.post(
+                response = self.session.post(
                     endpoint,
-                    headers=self.headers,
                     json=payload,
                     timeout=request_timeout
                 )
@@ -171,6 +182,94 @@ class AIClient:
         # All retries failed
         raise RuntimeError(f"AI API call failed after {self.max_retries} retries: {last_error}")
     
+    def call_stream(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[int] = None
+    ) -> Iterator[str]:
+        """
+        Call the AI API in streaming mode (server-sent events)
+        
+        Retries apply only until the response starts streaming; errors after
+        the first chunk propagate to the consumer.
+
+        Args:
+            model: model name
+            messages: message list
+            temperature: temperature (0-1)
+            max_tokens: max token count
+            timeout: request timeout override (seconds), uses self.timeout if None
+
+        Yields:
+            Content deltas as they arrive
+
+        Raises:
+            RuntimeError: API call failed
+        """
+        endpoint = f"{self.api_url}/v1/chat/completions"
+        request_timeout = timeout if timeout is not None else self.timeout
+        
+        payload = {
+            'model': model,
+            'messages': messages,
+            'temperature': temperature,
+            'stream': True
+        }
+        
+        if max_tokens:
+            payload['max_tokens'] = max_tokens
+        
+        response = None
+        last_error = None
+        
+        for attempt in range(self.max_retries):
+            try:
+                response = self.session.post(
+                    endpoint,
+                    json=payload,
+                    timeout=request_timeout,
+                    stream=True
+                )
+            except requests.exceptions.RequestException as e:
+                last_error = e
+                response = None
+            else:
+                if response.status_code == 200:
+                    break
+                
+                last_error = f"status {response.status_code}: {response.text}"
+                if response.status_code != 429 and response.status_code < 500:
+                    raise RuntimeError(f"API call failed with status {response.status_code}: {response.text}")
+                response = None
+            
+            logger.warning(
+                f"Streaming request failed, retrying",
+                extra={'details': {'model': model, 'attempt': attempt + 1, 'error': str(last_error)}}
+            )
+            if attempt < self.max_retries - 1:
+                time.sleep(self.retry_delay * (2 ** attempt))
+        
+        if response is None:
+            raise RuntimeError(f"AI API stream failed after {self.max_retries} retries: {last_error}")
+        
+        with response:
+            for line in response.iter_lines():
+                if not line.startswith(b'data:'):
+                    continue
+                
+                data = line[5:].strip()
+                if data == b'[DONE]':
+                    break
+                
+                choices = orjson.loads(data).get('choices') or []
+                if choices:
+                    delta = (choices[0].get('delta') or {}).get('content')
+                    if delta:
+                        yield delta
+    
     def extract_content(self, response: Dict[str, Any]) -> str:
         """
         Extract content from API response
@@ -199,6 +298,10 @@ class AIClient:
         
         except (KeyError, IndexError) as e:
             raise ValueError(f"Invalid response format: {e}")
+    
+    def close(self):
+        """Close pooled HTTP connections"""
+        self.session.close()
 
 
 # Global singleton (optional)
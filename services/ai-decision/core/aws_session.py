@@ -0,0 +1,26 @@
+"""
+AWS Session
+Share one boto3 Session per thread instead of building a new one per client
+"""
+
+import threading
+import boto3
+
+# boto3 Sessions are not thread-safe, so each thread gets its own
+_local = threading.local()
+
+
+def get_boto_session() -> boto3.Session:
+    """
+    Get the boto3 Session for the current thread (created on first use)
+    
+    Returns:
+        boto3.Session instance
+    """
+    session = getattr(_local, 'session', None)
+    
+    if session is None:
+        session = boto3.Session()
+        _local.session = session
+    
+    return session
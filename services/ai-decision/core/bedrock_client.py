@@ -3,9 +3,9 @@ Bedrock Client
 Call AWS Bedrock services: Titan V2 Embedding + Knowledge Base Retrieve
 """
 
-import boto3
 import json
 from typing import List, Dict, Any, Optional
+from .aws_session import get_boto_session
 from .logger import get_logger
 
 logger = get_logger()
@@ -25,11 +25,13 @@ class BedrockClient:
         self.region = region
         self.knowledge_base_id = knowledge_base_id
         
+        session = get_boto_session()
+        
         # Bedrock Runtime (for generating embeddings)
-        self.runtime_client = boto3.client('bedrock-runtime', region_name=region)
+        self.runtime_client = session.client('bedrock-runtime', region_name=region)
         
         # Bedrock Agent Runtime (for KB retrieval)
-        self.agent_client = boto3.client('bedrock-agent-runtime', region_name=region)
+        self.agent_client = session.client('bedrock-agent-runtime', region_name=region)
     
     def generate_embedding(self, text: str, dimensions: int = 1024) -> List[float]:
         """
@@ -6,10 +6,47 @@ Manage database connection pool, transactions, and queries
 import psycopg2
 from psycopg2 import pool, extras
 from psycopg2.extensions import connection, cursor
-from typing import Optional, List, Dict, Any, Tuple
+from typing import Optional, List, Dict, Any, Tuple, Union, Iterator
 from contextlib import contextmanager
+import hashlib
+import itertools
+import re
+import threading
 import time
 
+# NUMERIC -> float, decoded in the driver (opt-in per cursor: money paths keep Decimal)
+_DEC2FLOAT = psycopg2.extensions.new_type(
+    psycopg2.extensions.DECIMAL.values,
+    'DEC2FLOAT',
+    lambda value, curs: float(value) if value is not None else None
+)
+
+_ISOLATION_LEVELS = ('READ COMMITTED', 'REPEATABLE READ', 'SERIALIZABLE')
+
+# %(name)s placeholder, rewritten to $n for PREPARE
+_NAMED_PLACEHOLDER = re.compile(r'%\((\w+)\)s')
+
+
+class _PreparingConnection(connection):
+    """Connection that remembers which statements it has PREPAREd (session-scoped)"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+
+def _statement_name(query: str) -> str:
+    """
+    Derive a stable prepared-statement name from the query text
+    
+    Args:
+        query: SQL query string
+        
+    Returns:
+        Statement name
+    """
+    return "q_" + hashlib.blake2b(query.encode(), digest_size=8).hexdigest()
+
 
 class DatabaseManager:
     """PostgreSQL database manager"""
@@ -22,7 +59,8 @@ class DatabaseManager:
         user: str,
         password: str,
         minconn: int = 2,
-        maxconn: int = 10
+        maxconn: int = 10,
+        pool_timeout: float = 30.0
     ):
         """
         Initialize the database connection pool
@@ -35,6 +73,7 @@ class DatabaseManager:
             password: database password
             minconn: minimum connections
             maxconn: maximum connections
+            pool_timeout: seconds to wait for a free connection when the pool is exhausted
         """
         self.host = host
         self.port = port
@@ -50,20 +89,36 @@ class DatabaseManager:
             database=database,
             user=user,
             password=password,
-            connect_timeout=10
+            connect_timeout=10,
+            connection_factory=_PreparingConnection
         )
+        
+        # ThreadedConnectionPool raises as soon as it is exhausted; gate checkouts
+        # so concurrent agent workflows queue for a connection instead of failing
+        self.pool_timeout = pool_timeout
+        self._slots = threading.BoundedSemaphore(maxconn)
+        
+        # Unique server-side cursor names for stream_query
+        self._stream_ids = itertools.count()
     
     def get_connection(self) -> connection:
         """
-        Get a connection from the pool
+        Get a connection from the pool (waits up to pool_timeout for a free one)
         
         Returns:
             Database connection object
             
         Raises:
-            pool.PoolError: pool exhausted
+            pool.PoolError: no connection became free within pool_timeout
         """
-        return self.pool.getconn()
+        if not self._slots.acquire(timeout=self.pool_timeout):
+            raise pool.PoolError(f"connection pool exhausted (waited {self.pool_timeout}s)")
+        
+        try:
+            return self.pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
     
     def release_connection(self, conn: connection):
         """
@@ -72,15 +127,20 @@ class DatabaseManager:
         Args:
             conn: database connection object
         """
-        self.pool.putconn(conn)
+        try:
+            self.pool.putconn(conn)
+        finally:
+            self._slots.release()
     
     @contextmanager
-    def get_cursor(self, commit: bool = False):
+    def get_cursor(self, commit: bool = False, numeric_as_float: bool = False, dict_rows: bool = True):
         """
         Context manager: automatically acquire and release connection
         
         Args:
             commit: whether to auto-commit
+            numeric_as_float: decode NUMERIC columns as float instead of Decimal
+            dict_rows: return rows as dicts (False: plain tuples, no per-row dict)
             
         Yields:
             Database cursor
@@ -90,7 +150,10 @@ class DatabaseManager:
                 cur.execute("INSERT INTO ...")
         """
         conn = self.get_connection()
-        cur = conn.cursor(cursor_factory=extras.RealDictCursor)
+        cur = conn.cursor(cursor_factory=extras.RealDictCursor if dict_rows else None)
+        
+        if numeric_as_float:
+            psycopg2.extensions.register_type(_DEC2FLOAT, cur)
         
         try:
             yield cur
@@ -104,20 +167,37 @@ class DatabaseManager:
             self.release_connection(conn)
     
     @contextmanager
-    def transaction(self):
+    def transaction(self, isolation: Optional[str] = None):
         """
         Context manager: atomic transaction
         
+        Args:
+            isolation: isolation level for this transaction (e.g. 'SERIALIZABLE');
+                None keeps the server default (READ COMMITTED). Under SERIALIZABLE
+                the caller must be ready to retry on SerializationFailure.
+        
         Yields:
             Database cursor
             
+        Raises:
+            ValueError: unknown isolation level
+            
         Example:
             with db.transaction() as cur:
                 cur.execute("UPDATE wallets ...")
                 cur.execute("INSERT INTO transactions ...")
                 # Auto commit or rollback
         """
+        if isolation is not None and isolation not in _ISOLATION_LEVELS:
+            raise ValueError(f"Unknown isolation level: {isolation}")
+        
         conn = self.get_connection()
+        
+        if isolation is not None:
+            # psycopg2 then opens the transaction with BEGIN ISOLATION LEVEL ...,
+            # instead of an extra SET TRANSACTION round-trip
+            conn.set_session(isolation_level=isolation)
+        
         cur = conn.cursor(cursor_factory=extras.RealDictCursor)
         
         try:
@@ -128,24 +208,38 @@ class DatabaseManager:
             raise e
         finally:
             cur.close()
-            self.release_connection(conn)
+            try:
+                if isolation is not None and not conn.closed:
+                    conn.set_session(isolation_level='DEFAULT')
+            finally:
+                self.release_connection(conn)
     
     def execute_query(
         self,
         query: str,
         params: Optional[Tuple] = None,
-        fetch: bool = True
-    ) -> Optional[List[Dict[str, Any]]]:
+        fetch: Union[bool, str] = True,
+        numeric_as_float: bool = False,
+        prepare: bool = False
+    ) -> Union[List[Dict[str, Any]], Dict[str, Any], List[Tuple], Any, None]:
         """
         Execute a query (with automatic retries)
         
         Args:
             query: SQL query string
             params: query parameters
-            fetch: whether to fetch results
+            fetch: whether to fetch results; 'one' fetches only the first row,
+                'tuples' fetches all rows as plain tuples (for hot iteration paths),
+                'scalar' fetches the first column of the first row
+            numeric_as_float: decode NUMERIC columns as float instead of Decimal
+            prepare: run as a server-side prepared statement (parsed and planned once
+                per pooled connection); %s placeholders must not appear inside literals,
+                and %% escapes are not supported (the statement text reaches PREPARE as is)
             
         Returns:
-            Query results (list of dicts); returns None if fetch=False
+            Query results (list of dicts); with fetch='one', the first row as a dict
+            (None if no rows); with fetch='tuples', a list of tuples; with
+            fetch='scalar', a single value (None if no rows); returns None if fetch=False
             
         Raises:
             Exception: query failed
@@ -155,10 +249,23 @@ class DatabaseManager:
         
         for attempt in range(max_retries):
             try:
-                with self.get_cursor() as cur:
-                    cur.execute(query, params)
+                dict_rows = fetch not in ('tuples', 'scalar')
+                
+                with self.get_cursor(numeric_as_float=numeric_as_float, dict_rows=dict_rows) as cur:
+                    if prepare:
+                        self._execute_prepared(cur, query, params)
+                    else:
+                        cur.execute(query, params)
                     
-                    if fetch:
+                    if fetch == 'tuples':
+                        return cur.fetchall()
+                    elif fetch == 'scalar':
+                        row = cur.fetchone()
+                        return row[0] if row else None
+                    elif fetch == 'one':
+                        row = cur.fetchone()
+                        return dict(row) if row else None
+                    elif fetch:
                         results = cur.fetchall()
                         # Convert to list of dicts
                         return [dict(row) for row in results]
@@ -177,6 +284,113 @@ class DatabaseManager:
                 # Other errors, do not retry
                 raise RuntimeError(f"Database query failed: {e}")
     
+    def execute_prepared(
+        self,
+        cur: cursor,
+        query: str,
+        params: Optional[Union[Tuple, Dict[str, Any]]] = None
+    ):
+        """
+        Run a statement as a server-side prepared statement on an open cursor
+        (e.g. inside transaction()); results are read from the cursor as usual
+        
+        Every parameter must get its type from the statement context (a column
+        comparison, an operator, or an explicit cast): PREPARE cannot infer
+        types for bare parameters in a SELECT list.
+        
+        Args:
+            cur: database cursor
+            query: SQL query string with %s or %(name)s placeholders (not inside
+                literals; no %% escapes, a literal % is written as a single %)
+            params: tuple for %s placeholders, dict for %(name)s placeholders
+        """
+        self._execute_prepared(cur, query, params)
+    
+    def _execute_prepared(
+        self,
+        cur: cursor,
+        query: str,
+        params: Optional[Union[Tuple, Dict[str, Any]]]
+    ):
+        """
+        EXECUTE a query as a prepared statement, PREPAREing it on first use per connection
+        
+        Args:
+            cur: database cursor
+            query: SQL query string (%s or %(name)s placeholders; %% escapes unsupported)
+            params: query parameters (tuple, or dict for named placeholders)
+        """
+        name = _statement_name(query)
+        conn = cur.connection
+        
+        if isinstance(params, dict):
+            # Named placeholders: $n follows the order of first appearance
+            names = list(dict.fromkeys(_NAMED_PLACEHOLDER.findall(query)))
+            params = tuple(params[key] for key in names)
+        else:
+            names = None
+        
+        if name not in conn.prepared:
+            # Rewrite placeholders to PREPARE's positional $1..$n
+            if names is not None:
+                positions = {key: i for i, key in enumerate(names, 1)}
+                positional = _NAMED_PLACEHOLDER.sub(lambda m: f"${positions[m.group(1)]}", query)
+            else:
+                parts = query.split('%s')
+                positional = parts[0] + ''.join(f"${i}{part}" for i, part in enumerate(parts[1:], 1))
+            cur.execute(f"PREPARE {name} AS {positional}")
+            conn.prepared.add(name)
+        
+        if params:
+            cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+        else:
+            cur.execute(f"EXECUTE {name}")
+    
+    def stream_query(
+        self,
+        query: str,
+        params: Optional[Tuple] = None,
+        itersize: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream query results through a server-side (named) cursor
+        
+        Rows are fetched itersize at a time, so memory stays bounded however
+        large the result is. The pooled connection is held until the generator
+        is exhausted or closed.
+        
+        Args:
+            query: SQL query string
+            params: query parameters
+            itersize: rows fetched per network round trip
+            
+        Yields:
+            One row dict at a time
+            
+        Raises:
+            RuntimeError: query failed
+        """
+        conn = self.get_connection()
+        cur = conn.cursor(f"stream_{next(self._stream_ids)}", cursor_factory=extras.RealDictCursor)
+        cur.itersize = itersize
+        
+        try:
+            cur.execute(query, params)
+            for row in cur:
+                yield dict(row)
+        except Exception as e:
+            raise RuntimeError(f"Database stream query failed: {e}")
+        finally:
+            try:
+                cur.close()
+                # Named cursors live inside a transaction: end it before reuse
+                conn.rollback()
+            except psycopg2.Error:
+                # Broken connection: close it so the pool discards it
+                conn.close()
+            finally:
+                self.release_connection(conn)
+    
     def execute_update(
         self,
         query: str,
@@ -199,6 +413,31 @@ class DatabaseManager:
             cur.execute(query, params)
             return cur.rowcount
     
+    def execute_update_returning(
+        self,
+        query: str,
+        params: Optional[Tuple] = None,
+        numeric_as_float: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Execute an INSERT/UPDATE/DELETE ... RETURNING and commit it
+        
+        Args:
+            query: SQL statement with a RETURNING clause
+            params: query parameters
+            numeric_as_float: decode NUMERIC columns as float instead of Decimal
+            
+        Returns:
+            First returned row as a dict (None if no row was affected)
+            
+        Raises:
+            Exception: update failed
+        """
+        with self.get_cursor(commit=True, numeric_as_float=numeric_as_float) as cur:
+            cur.execute(query, params)
+            row = cur.fetchone()
+            return dict(row) if row else None
+    
     def execute_many(
         self,
         query: str,
@@ -221,6 +460,45 @@ class DatabaseManager:
             extras.execute_batch(cur, query, params_list)
             return cur.rowcount
     
+    def execute_values(
+        self,
+        query: str,
+        values: List[Tuple],
+        page_size: int = 1000,
+        template: Optional[str] = None
+    ) -> int:
+        """
+        Execute a multi-row INSERT (or UPDATE ... FROM (VALUES %s)): rows are
+        expanded into one VALUES list per page, so N rows cost one round trip
+        per page_size rows
+        
+        Args:
+            query: SQL statement with a single `VALUES %s` placeholder
+            values: list of row tuples
+            page_size: rows per statement
+            template: per-row snippet, e.g. '(%s, %s::jsonb)' (default: plain %s per column)
+            
+        Returns:
+            Rows affected by the outer statement, summed over pages (e.g. only
+            matched rows for UPDATE ... FROM (VALUES %s); for a writable CTE,
+            the rows touched by its final statement)
+            
+        Raises:
+            Exception: execution failed
+        """
+        if not values:
+            return 0
+        
+        affected = 0
+        with self.get_cursor(commit=True) as cur:
+            # One page per call so each statement's rowcount can be summed
+            for start in range(0, len(values), page_size):
+                page = values[start:start + page_size]
+                extras.execute_values(cur, query, page, template=template, page_size=len(page))
+                affected += cur.rowcount
+        
+        return affected
+    
     def close(self):
         """Close the connection pool"""
         if self.pool:
@@ -243,7 +521,9 @@ def get_database_manager(
     port: int,
     database: str,
     user: str,
-    password: str
+    password: str,
+    minconn: int = 2,
+    maxconn: int = 10
 ) -> DatabaseManager:
     """
     Get the global DatabaseManager singleton
@@ -254,6 +534,8 @@ def get_database_manager(
         database: database name
         user: database user
         password: database password
+        minconn: minimum connections
+        maxconn: maximum connections
         
     Returns:
         DatabaseManager instance
@@ -266,7 +548,9 @@ def get_database_manager(
             port=port,
             database=database,
             user=user,
-            password=password
+            password=password,
+            minconn=minconn,
+            maxconn=maxconn
         )
     
     return _database_manager_instance
@@ -3,11 +3,17 @@ OpenSearch Client
 Write decision vectors to OpenSearch Provisioned and support updating quality_weight
 """
 
-import boto3
-from opensearchpy import OpenSearch, RequestsHttpConnection
-from requests_aws4auth import AWS4Auth
-from typing import List, Dict, Any, Optional
+import logging
+import orjson
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import AWSRequest
+from opensearchpy import OpenSearch, RequestsHttpConnection, helpers
+from opensearchpy.exceptions import SerializationError
+from opensearchpy.serializer import JSONSerializer
+from typing import List, Dict, Any, Optional, Union, Tuple, Sequence
 from datetime import datetime, timezone, timedelta
+from requests.auth import AuthBase
+from .aws_session import get_boto_session
 from .logger import get_logger
 
 # US Eastern Time (ET) - Fixed offset UTC-04:00
@@ -15,6 +21,88 @@ ET_OFFSET = timezone(timedelta(hours=-4))
 
 logger = get_logger()
 
+class OrjsonSerializer(JSONSerializer):
+    """Request/response serializer backed by orjson (numpy arrays serialized natively)"""
+
+    def dumps(self, data: Any) -> str:
+        # Pre-serialized bodies (e.g. _bulk NDJSON) pass through
+        if isinstance(data, str):
+            return data
+
+        try:
+            return orjson.dumps(
+                data,
+                default=self.default,
+                option=orjson.OPT_SERIALIZE_NUMPY
+            ).decode()
+        except (ValueError, TypeError) as e:
+            raise SerializationError(data, e)
+
+    def loads(self, s: Union[str, bytes]) -> Any:
+        try:
+            return orjson.loads(s)
+        except (ValueError, TypeError) as e:
+            raise SerializationError(s, e)
+
+
+class _CachedKeySigV4Auth(SigV4Auth):
+    """SigV4 signer that reuses the derived signing key for the same day and secret"""
+
+    def __init__(self, credentials, service_name: str, region_name: str, key_cache: Dict[Tuple[str, str], bytes]):
+        super().__init__(credentials, service_name, region_name)
+        self._key_cache = key_cache
+
+    def signature(self, string_to_sign: str, request: AWSRequest) -> str:
+        secret_key = self.credentials.secret_key
+        date_stamp = request.context['timestamp'][0:8]
+        cache_key = (secret_key, date_stamp)
+
+        k_signing = self._key_cache.get(cache_key)
+        if k_signing is None:
+            k_date = self._sign(f"AWS4{secret_key}".encode('utf-8'), date_stamp)
+            k_region = self._sign(k_date, self._region_name)
+            k_service = self._sign(k_region, self._service_name)
+            k_signing = self._sign(k_service, 'aws4_request')
+
+            # Only the current (secret, day) key is ever needed
+            self._key_cache.clear()
+            self._key_cache[cache_key] = k_signing
+
+        return self._sign(k_signing, string_to_sign, hex=True)
+
+
+class CachedSigV4Auth(AuthBase):
+    """requests auth hook: SigV4 with refreshable credentials and a cached signing key"""
+
+    def __init__(self, credentials, region: str, service: str = 'es'):
+        """
+        Args:
+            credentials: botocore credentials (refreshable credentials are re-read per request)
+            region: AWS region
+            service: AWS service name ('es' for Provisioned, 'aoss' for Serverless)
+        """
+        self.credentials = credentials
+        self.region = region
+        self.service = service
+        self._key_cache: Dict[Tuple[str, str], bytes] = {}
+
+    def __call__(self, request):
+        aws_request = AWSRequest(method=request.method, url=request.url, data=request.body)
+        signer = _CachedKeySigV4Auth(
+            self.credentials.get_frozen_credentials(),
+            self.service,
+            self.region,
+            self._key_cache
+        )
+
+        # Serverless requires the payload hash header
+        if self.service == 'aoss':
+            aws_request.headers['X-Amz-Content-SHA256'] = signer.payload(aws_request)
+
+        signer.add_auth(aws_request)
+        request.headers.update(dict(aws_request.headers.items()))
+        return request
+
 
 class OpenSearchClient:
     """OpenSearch Provisioned client"""
@@ -24,7 +112,8 @@ class OpenSearchClient:
         collection_endpoint: str,
         index_name: str,
         region: str = 'us-east-1',
-        service: str = 'es'
+        service: str = 'es',
+        pool_maxsize: int = 20
     ):
         """
         Initialize the OpenSearch client
@@ -34,36 +123,39 @@ class OpenSearchClient:
             index_name: index name (ai-investment-decisions)
             region: AWS region
             service: AWS service name ('es' for Provisioned, 'aoss' for Serverless)
+            pool_maxsize: keep-alive HTTPS connections kept open to the domain; should
+                cover the number of threads searching at once (agents x parallel searches)
         """
         self.collection_endpoint = collection_endpoint.replace('https://', '')
         self.index_name = index_name
         self.region = region
 
-        # AWS SigV4 auth
-        credentials = boto3.Session().get_credentials()
-        self.awsauth = AWS4Auth(
-            credentials.access_key,
-            credentials.secret_key,
+        # AWS SigV4 auth (signs each request with the live, auto-refreshing credentials)
+        credentials = get_boto_session().get_credentials()
+        self.awsauth = CachedSigV4Auth(
+            credentials,
             region,
-            service,  # 'es' for Provisioned, 'aoss' for Serverless
-            session_token=credentials.token
+            service  # 'es' for Provisioned, 'aoss' for Serverless
         )
 
-        # Create OpenSearch client
+        # Create OpenSearch client. RequestsHttpConnection holds one requests.Session
+        # whose urllib3 pool keeps connections alive, so only the first request on
+        # each pooled connection pays for the TCP + TLS handshake.
         self.client = OpenSearch(
             hosts=[{'host': self.collection_endpoint, 'port': 443}],
             http_auth=self.awsauth,
             use_ssl=True,
             verify_certs=True,
             connection_class=RequestsHttpConnection,
-            pool_maxsize=20
+            serializer=OrjsonSerializer(),
+            pool_maxsize=pool_maxsize
         )
     
     def index_decision(
         self,
         decision_id: str,
         agent_id: str,
-        decision_embedding: List[float],
+        decision_embedding: Sequence[float],
         reasoning: str,
         decision_type: str,
         symbol: str,
@@ -76,7 +168,7 @@ class OpenSearchClient:
         Args:
             decision_id: decision ID (UUID)
             agent_id: AI ID
-            decision_embedding: 1024-dim vector
+            decision_embedding: 1024-dim vector (list or float32 numpy array)
             reasoning: decision reasoning text
             decision_type: decision type (BUY/SELL/HOLD)
             symbol: stock symbol
@@ -102,28 +194,32 @@ class OpenSearchClient:
                 'created_at': datetime.now(ET_OFFSET).isoformat()
             }
             
-            logger.debug(
-                "Indexing decision to OpenSearch",
-                extra={'details': {
-                    'decision_id': decision_id,
-                    'agent_id': agent_id,
-                    'symbol': symbol,
-                    'decision_type': decision_type
-                }}
-            )
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Indexing decision to OpenSearch",
+                    extra={'details': {
+                        'decision_id': decision_id,
+                        'agent_id': agent_id,
+                        'symbol': symbol,
+                        'decision_type': decision_type
+                    }}
+                )
             
+            # Route by agent_id so an agent's decisions share one shard
             response = self.client.index(
                 index=self.index_name,
-                body=doc
+                body=doc,
+                routing=agent_id
             )
             
-            logger.info(
-                "Decision indexed successfully",
-                extra={'details': {
-                    'decision_id': decision_id,
-                    'opensearch_id': response['_id']
-                }}
-            )
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "Decision indexed successfully",
+                    extra={'details': {
+                        'decision_id': decision_id,
+                        'opensearch_id': response['_id']
+                    }}
+                )
             
             return response
         
@@ -134,10 +230,69 @@ class OpenSearchClient:
             )
             raise RuntimeError(f"Failed to index decision: {e}")
     
+    def bulk_index_decisions(self, decisions: List[Dict[str, Any]]) -> int:
+        """
+        Index multiple decisions in a single _bulk request
+        
+        Args:
+            decisions: list of dicts with the same fields as index_decision()
+                (decision_id, agent_id, decision_embedding, reasoning, decision_type,
+                symbol, optional quality_weight and metadata)
+            
+        Returns:
+            Number of documents indexed
+            
+        Raises:
+            RuntimeError: indexing failed
+        """
+        if not decisions:
+            return 0
+        
+        try:
+            # One timestamp for the whole batch
+            created_at = datetime.now(ET_OFFSET).isoformat()
+            
+            actions = [
+                {
+                    '_index': self.index_name,
+                    '_routing': d['agent_id'],
+                    '_source': {
+                        'decision_id': d['decision_id'],
+                        'agent_id': d['agent_id'],
+                        'decision_embedding': d['decision_embedding'],
+                        'reasoning': d['reasoning'],
+                        'decision_type': d['decision_type'],
+                        'symbol': d['symbol'],
+                        'quality_weight': d.get('quality_weight', 0.5),
+                        'metadata': d.get('metadata') or {},
+                        'created_at': created_at
+                    }
+                }
+                for d in decisions
+            ]
+            
+            success_count, _ = helpers.bulk(self.client, actions)
+            
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "Decisions bulk indexed successfully",
+                    extra={'details': {'count': success_count}}
+                )
+            
+            return success_count
+        
+        except Exception as e:
+            logger.error(
+                "Failed to bulk index decisions",
+                extra={'details': {'count': len(decisions), 'error': str(e)}}
+            )
+            raise RuntimeError(f"Failed to bulk index decisions: {e}")
+    
     def update_quality_weight(
         self,
         decision_id: str,
-        quality_weight: float
+        quality_weight: float,
+        refresh: Union[bool, str] = False
     ) -> Dict[str, Any]:
         """
         Update decision quality weight (evaluated after 30 days)
@@ -145,6 +300,8 @@ class OpenSearchClient:
         Args:
             decision_id: decision ID
             quality_weight: new quality weight (0-1)
+            refresh: refresh policy; pass 'wait_for' only when the caller needs
+                read-your-write, otherwise call flush() once at the end of a batch
             
         Returns:
             OpenSearch response
@@ -153,10 +310,11 @@ class OpenSearchClient:
             RuntimeError: update failed
         """
         try:
-            logger.debug(
-                "Updating quality weight",
-                extra={'details': {'decision_id': decision_id, 'quality_weight': quality_weight}}
-            )
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Updating quality weight",
+                    extra={'details': {'decision_id': decision_id, 'quality_weight': quality_weight}}
+                )
             
             # Query for the document
             search_response = self.client.search(
@@ -172,26 +330,29 @@ class OpenSearchClient:
             if not hits:
                 raise ValueError(f"Decision not found: {decision_id}")
             
-            # Get document ID
+            # Get document ID (and routing; documents indexed before agent_id routing have none)
             doc_id = hits[0]['_id']
+            routing = hits[0].get('_routing')
             
             # Update document
             response = self.client.update(
                 index=self.index_name,
                 id=doc_id,
+                routing=routing,
                 body={
                     'doc': {
                         'quality_weight': quality_weight,
                         'evaluated_at': datetime.now(ET_OFFSET).isoformat()
                     }
                 },
-                refresh=True
+                refresh=refresh
             )
             
-            logger.info(
-                "Quality weight updated successfully",
-                extra={'details': {'decision_id': decision_id, 'quality_weight': quality_weight}}
-            )
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "Quality weight updated successfully",
+                    extra={'details': {'decision_id': decision_id, 'quality_weight': quality_weight}}
+                )
             
             return response
         
@@ -206,7 +367,8 @@ class OpenSearchClient:
         self,
         agent_id: Optional[str] = None,
         symbol: Optional[str] = None,
-        limit: int = 10
+        limit: int = 10,
+        search_after: Optional[List[Any]] = None
     ) -> List[Dict[str, Any]]:
         """
         Search decisions (for testing or debugging)
@@ -215,9 +377,10 @@ class OpenSearchClient:
             agent_id: AI ID (optional)
             symbol: stock symbol (optional)
             limit: number of results to return
+            search_after: '_sort' value of the last decision of the previous page
             
         Returns:
-            List of decisions
+            List of decisions, newest first; each carries a '_sort' key to resume from
         """
         try:
             # Build query
@@ -232,18 +395,29 @@ class OpenSearchClient:
             if not query['bool']['must']:
                 query = {'match_all': {}}
             
+            body = {
+                'query': query,
+                'size': limit,
+                # decision_id breaks ties so search_after pages are stable
+                'sort': [
+                    {'created_at': {'order': 'desc'}},
+                    {'decision_id': {'order': 'asc'}}
+                ]
+            }
+            
+            if search_after:
+                body['search_after'] = search_after
+            
             response = self.client.search(
                 index=self.index_name,
-                body={
-                    'query': query,
-                    'size': limit,
-                    'sort': [{'created_at': {'order': 'desc'}}]
-                }
+                body=body
             )
             
             results = []
             for hit in response['hits']['hits']:
-                results.append(hit['_source'])
+                source = hit['_source']
+                source['_sort'] = hit.get('sort')
+                results.append(source)
             
             return results
         
@@ -280,62 +454,33 @@ class OpenSearchClient:
             ]
         """
         try:
-            logger.debug(
-                "Performing k-NN search",
-                extra={'details': {
-                    'num_results': num_results,
-                    'has_filter': filter_conditions is not None
-                }}
-            )
-
-            # Build k-NN query body
-            search_body = {
-                "size": num_results,
-                "query": {
-                    "knn": {
-                        "decision_embedding": {
-                            "vector": query_vector,
-                            "k": num_results
-                        }
-                    }
-                }
-            }
-
-            # Add filter if provided
-            if filter_conditions:
-                search_body["query"]["knn"]["decision_embedding"]["filter"] = filter_conditions
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Performing k-NN search",
+                    extra={'details': {
+                        'num_results': num_results,
+                        'has_filter': filter_conditions is not None
+                    }}
+                )
 
             # Execute search
             response = self.client.search(
                 index=self.index_name,
-                body=search_body
+                body=self._knn_body(query_vector, filter_conditions, num_results)
             )
 
             # Parse results
-            results = []
-            for hit in response['hits']['hits']:
-                source = hit['_source']
-                results.append({
-                    'content': source.get('reasoning', ''),
-                    'score': hit['_score'],
-                    'metadata': {
-                        'decision_id': source.get('decision_id'),
-                        'agent_id': source.get('agent_id'),
-                        'symbol': source.get('symbol'),
-                        'decision_type': source.get('decision_type'),
-                        'type': source.get('metadata', {}).get('type', ''),
-                        'date': source.get('metadata', {}).get('date', ''),
-                        'created_at': source.get('created_at')
-                    }
-                })
+            results = self._parse_knn_hits(response['hits']['hits'])
 
-            logger.info(
-                f"k-NN search returned {len(results)} results",
-                extra={'details': {
-                    'num_results': len(results),
-                    'avg_score': sum(r['score'] for r in results) / len(results) if results else 0
-                }}
-            )
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "k-NN search returned %d results",
+                    len(results),
+                    extra={'details': {
+                        'num_results': len(results),
+                        'avg_score': sum(r['score'] for r in results) / len(results) if results else 0
+                    }}
+                )
 
             return results
 
@@ -346,6 +491,164 @@ class OpenSearchClient:
             )
             return []
 
+    def knn_multi_search(self, queries: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """
+        Run several k-NN searches in one _msearch request
+
+        Args:
+            queries: list of search specs, each with
+                - query_vector: 1024-dim query vector
+                - filter_conditions: OpenSearch filter (optional)
+                - num_results: number of results to return (default 10)
+
+        Returns:
+            One result list per query, in the same order and format as
+            knn_search(); a query that failed yields []
+        """
+        if not queries:
+            return []
+
+        # NDJSON pairs: header line, then search body
+        body = []
+        for query in queries:
+            body.append({'index': self.index_name})
+            body.append(self._knn_body(
+                query['query_vector'],
+                query.get('filter_conditions'),
+                query.get('num_results', 10)
+            ))
+
+        try:
+            response = self.client.msearch(body=body)
+        except Exception as e:
+            logger.error(
+                "k-NN multi-search failed",
+                extra={'details': {'num_queries': len(queries), 'error': str(e)}}
+            )
+            return [[] for _ in queries]
+
+        results = []
+        for item in response['responses']:
+            if 'error' in item:
+                logger.warning(
+                    "k-NN multi-search query failed",
+                    extra={'details': {'error': str(item['error'])}}
+                )
+                results.append([])
+            else:
+                results.append(self._parse_knn_hits(item['hits']['hits']))
+
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "k-NN multi-search returned %s",
+                [len(r) for r in results],
+                extra={'details': {'num_queries': len(queries)}}
+            )
+
+        return results
+
+    def _knn_body(
+        self,
+        query_vector: List[float],
+        filter_conditions: Optional[Dict[str, Any]],
+        num_results: int
+    ) -> Dict[str, Any]:
+        """
+        Build a k-NN search body
+
+        Args:
+            query_vector: 1024-dim query vector
+            filter_conditions: OpenSearch filter (optional)
+            num_results: number of results to return
+
+        Returns:
+            Search body
+        """
+        search_body = {
+            "size": num_results,
+            "query": {
+                "knn": {
+                    "decision_embedding": {
+                        "vector": query_vector,
+                        "k": num_results
+                    }
+                }
+            }
+        }
+
+        # Add filter if provided
+        if filter_conditions:
+            search_body["query"]["knn"]["decision_embedding"]["filter"] = filter_conditions
+
+        return search_body
+
+    @staticmethod
+    def _parse_knn_hits(hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Convert k-NN hits to RAG results
+
+        Args:
+            hits: response['hits']['hits']
+
+        Returns:
+            [{'content': str, 'score': float, 'metadata': dict}, ...]
+        """
+        results = []
+        for hit in hits:
+            source = hit['_source']
+            results.append({
+                'content': source.get('reasoning', ''),
+                'score': hit['_score'],
+                'metadata': {
+                    'decision_id': source.get('decision_id'),
+                    'agent_id': source.get('agent_id'),
+                    'symbol': source.get('symbol'),
+                    'decision_type': source.get('decision_type'),
+                    'type': source.get('metadata', {}).get('type', ''),
+                    'date': source.get('metadata', {}).get('date', ''),
+                    'created_at': source.get('created_at')
+                }
+            })
+
+        return results
+
+    def flush(self):
+        """
+        Make all pending writes searchable (call once at the end of a batch job)
+        """
+        try:
+            self.client.indices.refresh(index=self.index_name)
+        except Exception as e:
+            logger.warning(
+                "Failed to refresh index",
+                extra={'details': {'index': self.index_name, 'error': str(e)}}
+            )
+
+    def tune_index_settings(
+        self,
+        refresh_interval: str = '5s',
+        translog_flush_threshold: str = '1gb'
+    ) -> Dict[str, Any]:
+        """
+        Apply write-throughput index settings (Provisioned domains only)
+
+        Args:
+            refresh_interval: index.refresh_interval (default 1s in OpenSearch)
+            translog_flush_threshold: index.translog.flush_threshold_size
+
+        Returns:
+            OpenSearch response
+        """
+        return self.client.indices.put_settings(
+            index=self.index_name,
+            body={
+                'index': {
+                    'refresh_interval': refresh_interval,
+                    'translog.flush_threshold_size': translog_flush_threshold
+                }
+            }
+        )
+
     def ping(self) -> bool:
         """
         Test connection
@@ -367,7 +670,8 @@ def get_opensearch_client(
     collection_endpoint: str,
     index_name: str,
     region: str = 'us-east-1',
-    service: str = 'es'
+    service: str = 'es',
+    pool_maxsize: int = 20
 ) -> OpenSearchClient:
     """
     Get global OpenSearchClient singleton
@@ -377,6 +681,7 @@ def get_opensearch_client(
         index_name: index name
         region: AWS region
         service: AWS service name ('es' for Provisioned, 'aoss' for Serverless)
+        pool_maxsize: keep-alive connection pool size (applies when the client is first created)
 
     Returns:
         OpenSearchClient instance
@@ -388,7 +693,8 @@ def get_opensearch_client(
             collection_endpoint=collection_endpoint,
             index_name=index_name,
             region=region,
-            service=service
+            service=service,
+            pool_maxsize=pool_maxsize
         )
 
     return _opensearch_client_instance
@@ -3,9 +3,15 @@ Redis Client
 Manage Redis connections and read real-time stock prices
 """
 
+import atexit
 import redis
-from typing import Optional, Dict, List
+from redis.utils import HIREDIS_AVAILABLE
+from typing import Optional, Dict, List, Tuple, Any
 import ssl
+import time
+from .logger import get_logger
+
+logger = get_logger()
 
 
 class RedisClient:
@@ -19,7 +25,9 @@ class RedisClient:
         use_ssl: bool = True,
         decode_responses: bool = True,
         socket_timeout: int = 5,
-        socket_connect_timeout: int = 5
+        socket_connect_timeout: int = 5,
+        max_connections: int = 32,
+        pool_timeout: int = 5
     ):
         """
         Initialize the Redis client
@@ -32,11 +40,16 @@ class RedisClient:
             decode_responses: whether to auto-decode responses (strings)
             socket_timeout: socket timeout
             socket_connect_timeout: connection timeout
+            max_connections: connection pool size
+            pool_timeout: seconds to wait for a free pooled connection
         """
         self.host = host
         self.port = port
         self.db = db
         
+        # redis-py picks the hiredis C parser automatically when it is installed
+        logger.info(f"Redis reply parser: {'hiredis' if HIREDIS_AVAILABLE else 'pure Python'}")
+        
         # Configure connection parameters
         connection_kwargs = {
             'host': host,
@@ -49,11 +62,53 @@ class RedisClient:
         
         # Configure SSL (for ElastiCache)
         if use_ssl:
-            connection_kwargs['ssl'] = True
+            connection_kwargs['connection_class'] = redis.SSLConnection
             connection_kwargs['ssl_cert_reqs'] = ssl.CERT_NONE  # Do not validate certificate
         
+        # Bounded pool: bursts wait for a free connection instead of opening new sockets
+        self.pool = redis.BlockingConnectionPool(
+            max_connections=max_connections,
+            timeout=pool_timeout,
+            **connection_kwargs
+        )
+        
         # Create Redis connection
-        self.client = redis.StrictRedis(**connection_kwargs)
+        self.client = redis.StrictRedis(connection_pool=self.pool)
+        
+        # Process-local price cache: {symbol: (price, cached_at)}, disabled until enabled
+        self._price_cache: Dict[str, Tuple[float, float]] = {}
+        self._price_cache_ttl: Optional[float] = None
+        self._price_listener = None
+    
+    def enable_local_price_cache(self, ttl: float = 5.0):
+        """
+        Serve get_stock_price from a process-local cache
+        
+        Entries are invalidated by Redis keyspace notifications on stock:price:*
+        (requires notify-keyspace-events to include "K$gx") and expire after ttl
+        seconds regardless, so the cache stays correct if notifications are off.
+        
+        Args:
+            ttl: max age of a cached price in seconds
+        """
+        self._price_cache_ttl = ttl
+        
+        if self._price_listener is None:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            pubsub.psubscribe(**{
+                f"__keyspace@{self.db}__:stock:price:*": self._on_price_event
+            })
+            self._price_listener = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+    
+    def _on_price_event(self, message: Dict[str, Any]):
+        """
+        Keyspace notification handler: drop the changed symbol from the local cache
+        
+        Args:
+            message: pub/sub message (channel "__keyspace@0__:stock:price:NVDA")
+        """
+        symbol = message['channel'].rsplit(':', 1)[-1]
+        self._price_cache.pop(symbol, None)
     
     def ping(self) -> bool:
         """
@@ -127,6 +182,11 @@ class RedisClient:
         Returns:
             Stock price, or None if missing
         """
+        if self._price_cache_ttl is not None:
+            hit = self._price_cache.get(symbol)
+            if hit and time.monotonic() - hit[1] < self._price_cache_ttl:
+                return hit[0]
+        
         key = f"stock:price:{symbol}"
         price_str = self.get(key)
         
@@ -134,9 +194,14 @@ class RedisClient:
             return None
         
         try:
-            return float(price_str)
+            price = float(price_str)
         except (ValueError, TypeError):
             return None
+        
+        if self._price_cache_ttl is not None:
+            self._price_cache[symbol] = (price, time.monotonic())
+        
+        return price
     
     def get_all_stock_prices(self) -> Dict[str, float]:
         """
@@ -148,16 +213,113 @@ class RedisClient:
         keys = self.keys("stock:price:*")
         prices = {}
         
-        for key in keys:
-            # Extract "NVDA" from "stock:price:NVDA"
-            symbol = key.split(':')[-1]
-            price = self.get_stock_price(symbol)
+        if not keys:
+            return prices
+        
+        # Fetch all values in a single MGET reply
+        for key, price_str in zip(keys, self.client.mget(keys)):
+            if price_str is None:
+                continue
+            
+            try:
+                # Extract "NVDA" from "stock:price:NVDA"
+                prices[key.split(':')[-1]] = float(price_str)
+            except (ValueError, TypeError):
+                continue
+        
+        if self._price_cache_ttl is not None:
+            now = time.monotonic()
+            self._price_cache.update({s: (p, now) for s, p in prices.items()})
+        
+        return prices
+    
+    def get_stock_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """
+        Get real-time prices for several symbols in one MGET
+        
+        Args:
+            symbols: stock symbols
+            
+        Returns:
+            {symbol: price} dictionary (missing or invalid prices omitted)
+        """
+        if not symbols:
+            return {}
+        
+        values = self.client.mget([f"stock:price:{symbol}" for symbol in symbols])
+        prices = {}
+        
+        for symbol, price_str in zip(symbols, values):
+            if price_str is None:
+                continue
             
-            if price is not None:
-                prices[symbol] = price
+            try:
+                prices[symbol] = float(price_str)
+            except (ValueError, TypeError):
+                continue
         
         return prices
     
+    def set_stock_prices(self, prices: Dict[str, float], ex: int = 3600) -> List[bool]:
+        """
+        Set several stock prices in one pipelined round-trip
+        
+        Args:
+            prices: {symbol: price} dictionary
+            ex: expiration in seconds (default 1 hour)
+            
+        Returns:
+            Per-symbol SET results
+        """
+        if not prices:
+            return []
+        
+        pipe = self.client.pipeline(transaction=False)
+        
+        for symbol, price in prices.items():
+            pipe.set(f"stock:price:{symbol}", str(price), ex=ex)
+        
+        return pipe.execute()
+    
+    def hmget(self, key: str, fields: List[str]) -> List[Optional[str]]:
+        """
+        Read several fields of a hash in one HMGET
+        
+        Args:
+            key: hash key
+            fields: field names
+            
+        Returns:
+            Values aligned with fields (None for missing fields)
+        """
+        if not fields:
+            return []
+        
+        return self.client.hmget(key, fields)
+    
+    def hset_many(self, key: str, mapping: Dict[str, Any], ex: Optional[int] = None) -> List[Any]:
+        """
+        Write several hash fields (and the hash TTL) in one pipelined round-trip
+        
+        Args:
+            key: hash key
+            mapping: {field: value} dictionary
+            ex: expiration of the whole hash in seconds
+            
+        Returns:
+            Pipeline results
+        """
+        if not mapping:
+            return []
+        
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hset(key, mapping=mapping)
+        
+        if ex:
+            pipe.expire(key, ex)
+        
+        return pipe.execute()
+    
     def set_stock_price(self, symbol: str, price: float, ex: int = 3600) -> bool:
         """
         Set stock price (for testing or data updates)
@@ -175,41 +337,60 @@ class RedisClient:
     
     def close(self):
         """Close connection"""
+        if self._price_listener is not None:
+            self._price_listener.stop()
+            self._price_listener = None
+        
         if self.client:
             self.client.close()
+            # The client does not own an externally built pool: disconnect it explicitly
+            self.pool.disconnect()
+    
+    def __enter__(self) -> 'RedisClient':
+        """Context manager entry"""
+        return self
     
-    def __del__(self):
-        """Destructor: auto-close connection"""
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit: close connection"""
         self.close()
 
 
-# Global singleton (optional)
-_redis_client_instance: Optional[RedisClient] = None
+# Global singletons, one per (host, port, db, use_ssl)
+_redis_clients: Dict[Tuple[str, int, int, bool], RedisClient] = {}
 
 
 def get_redis_client(
     host: str,
     port: int = 6379,
-    use_ssl: bool = True
+    use_ssl: bool = True,
+    db: int = 0,
+    max_connections: int = 32
 ) -> RedisClient:
     """
-    Get global RedisClient singleton
+    Get the global RedisClient singleton for a connection target
     
     Args:
         host: Redis host
         port: Redis port
         use_ssl: whether to use SSL
+        db: database index
+        max_connections: connection pool size (applies when the client is first created)
         
     Returns:
         RedisClient instance
     """
-    global _redis_client_instance
+    key = (host, port, db, use_ssl)
     
-    if _redis_client_instance is None:
-        _redis_client_instance = RedisClient(
+    if key not in _redis_clients:
+        client = RedisClient(
             host=host,
             port=port,
-            use_ssl=use_ssl
+            db=db,
+            use_ssl=use_ssl,
+            max_connections=max_connections
         )
+        # Close explicitly at exit rather than from a GC-driven finalizer
+        atexit.register(client.close)
+        _redis_clients[key] = client
     
-    return _redis_client_instance
+    return _redis_clients[key]
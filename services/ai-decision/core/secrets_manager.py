@@ -4,10 +4,15 @@ Load configs from AWS Secrets Manager with caching and auto refresh
 """
 
 import json
-import boto3
-from typing import Dict, Any, Optional
-from datetime import datetime, timedelta
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Set, Tuple
 from botocore.exceptions import ClientError
+from .aws_session import get_boto_session
+from .logger import get_logger
+
+logger = get_logger()
 
 
 class SecretsManager:
@@ -23,10 +28,15 @@ class SecretsManager:
         """
         self.region = region
         self.cache_ttl = cache_ttl
-        self.client = boto3.client('secretsmanager', region_name=region)
+        self.client = get_boto_session().client('secretsmanager', region_name=region)
+        
+        # Cache: {secret_name: (value, expires_at)}, expires_at on the time.monotonic() clock
+        self._cache: Dict[str, Tuple[Dict[str, Any], float]] = {}
         
-        # Cache: {secret_name: {'value': dict, 'expires_at': datetime}}
-        self._cache: Dict[str, Dict[str, Any]] = {}
+        # Background refresh (stale-while-revalidate)
+        self._refresh_lock = threading.Lock()
+        self._refreshing: Set[str] = set()
+        self._executor: Optional[ThreadPoolExecutor] = None
     
     def get_secret(self, secret_name: str, force_refresh: bool = False) -> Dict[str, Any]:
         """
@@ -44,22 +54,40 @@ class SecretsManager:
             json.JSONDecodeError: Secret content is not valid JSON
         """
         # Check cache
-        if not force_refresh and secret_name in self._cache:
-            cached = self._cache[secret_name]
-            if datetime.now() < cached['expires_at']:
-                return cached['value']
+        hit = None if force_refresh else self._cache.get(secret_name)
+        if hit:
+            value, expires_at = hit
+            now = time.monotonic()
+            
+            # Fresh: serve directly
+            if now < expires_at - self.cache_ttl * 0.2:
+                return value
+            
+            # Soft-expired: serve stale value and refresh in the background
+            if now < expires_at + self.cache_ttl:
+                self._schedule_refresh(secret_name)
+                return value
         
-        # Read from Secrets Manager
+        # Hard-expired or missing: blocking fetch
+        return self._fetch_secret(secret_name)
+    
+    def _fetch_secret(self, secret_name: str) -> Dict[str, Any]:
+        """
+        Read a secret from Secrets Manager and update the cache
+        
+        Args:
+            secret_name: secret name
+            
+        Returns:
+            Secret content (JSON-decoded dictionary)
+        """
         try:
             response = self.client.get_secret_value(SecretId=secret_name)
             secret_string = response['SecretString']
             secret_value = json.loads(secret_string)
             
             # Update cache
-            self._cache[secret_name] = {
-                'value': secret_value,
-                'expires_at': datetime.now() + timedelta(seconds=self.cache_ttl)
-            }
+            self._cache[secret_name] = (secret_value, time.monotonic() + self.cache_ttl)
             
             return secret_value
             
@@ -77,6 +105,42 @@ class SecretsManager:
         except json.JSONDecodeError as e:
             raise ValueError(f"Secret {secret_name} is not valid JSON: {e}")
     
+    def _schedule_refresh(self, secret_name: str):
+        """
+        Submit a background refresh unless one is already in flight
+        
+        Args:
+            secret_name: secret name
+        """
+        with self._refresh_lock:
+            if secret_name in self._refreshing:
+                return
+            self._refreshing.add(secret_name)
+            
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=2,
+                    thread_name_prefix='secrets-refresh'
+                )
+        
+        self._executor.submit(self._refresh, secret_name)
+    
+    def _refresh(self, secret_name: str):
+        """
+        Background refresh task; keeps the stale value on failure
+        
+        Args:
+            secret_name: secret name
+        """
+        try:
+            self._fetch_secret(secret_name)
+        except Exception as e:
+            # Stale value stays valid until hard expiry
+            logger.warning(f"Background refresh of secret {secret_name} failed, keeping cached value: {e}")
+        finally:
+            with self._refresh_lock:
+                self._refreshing.discard(secret_name)
+    
     def clear_cache(self, secret_name: Optional[str] = None):
         """
         Clear cache
@@ -99,10 +163,8 @@ class SecretsManager:
         Returns:
             True if cached and valid
         """
-        if secret_name not in self._cache:
-            return False
-        
-        return datetime.now() < self._cache[secret_name]['expires_at']
+        hit = self._cache.get(secret_name)
+        return hit is not None and hit[1] > time.monotonic()
 
 
 # Global singleton (optional)
@@ -6,233 +6,267 @@ Parse command line arguments and route to appropriate workflow
 
 import sys
 import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import cached_property
 
 from config import get_settings
-from utils import get_et_timestamp_iso
-from core import (
-    get_secrets_manager,
-    get_database_manager,
-    get_redis_client,
-    get_ai_client,
-    get_bedrock_client,
-    get_opensearch_client,
-    get_logger
-)
-from services import (
-    DataCollector,
-    MemoryManager,
-    RAGRetriever,
-    DecisionValidator,
-    PortfolioExecutor,
-    AIOrchestrator
-)
-from workflows import (
-    HourlyNewsAnalysisWorkflow,
-    DailySummaryWorkflow,
-    TradingDecisionWorkflow,
-    WeeklySummaryWorkflow,
-    StockAnalysisWorkflow
-)
+from core import get_logger
+
+# Workflows, services and heavy clients are imported inside the functions that
+# use them so `--help` and single-workflow runs skip unrelated module loading
 
 # Initialize logger
 logger = get_logger()
 
 
-def initialize_services():
+class LazyServices:
     """
-    Initialize all service components
+    Service container that builds each client and business service on first access
     
-    Returns:
-        Dictionary of initialized services
+    Workflows only pay for the clients they actually touch (e.g. hourly news
+    analysis never builds the Bedrock or OpenSearch clients).
     """
-    logger.info("Initializing services...")
     
-    try:
-        # Load configuration
-        settings = get_settings()
-        
-        # Initialize core clients
-        secrets_manager = get_secrets_manager(region=settings.region)
-        
-        db = get_database_manager(
-            host=settings.db_host,
-            port=settings.db_port,
-            database=settings.db_name,
-            user=settings.db_user,
-            password=settings.db_password
+    def __init__(self):
+        """Load configuration; no clients are created yet"""
+        self.settings = get_settings()
+    
+    # ===== Core clients =====
+    
+    @cached_property
+    def secrets_manager(self):
+        from core.secrets_manager import get_secrets_manager
+        return get_secrets_manager(region=self.settings.region)
+    
+    @cached_property
+    def db(self):
+        from core.database import get_database_manager
+        return get_database_manager(
+            host=self.settings.db_host,
+            port=self.settings.db_port,
+            database=self.settings.db_name,
+            user=self.settings.db_user,
+            password=self.settings.db_password,
+            minconn=self.settings.db_pool_min_size,
+            maxconn=self.settings.db_pool_size
         )
-        
-        redis_client = get_redis_client(
-            host=settings.redis_host,
-            port=settings.redis_port,
-            use_ssl=settings.redis_ssl
+    
+    @cached_property
+    def redis(self):
+        from core.redis_client import get_redis_client
+        return get_redis_client(
+            host=self.settings.redis_host,
+            port=self.settings.redis_port,
+            use_ssl=self.settings.redis_ssl,
+            max_connections=self.settings.redis_pool_size
         )
-        
+    
+    @cached_property
+    def ai_client(self):
         # NOTE: ai_client 已弃用，AIOrchestrator 现在为每个 agent 动态创建 client
         # 保留此代码用于向后兼容
-        ai_client = get_ai_client(
-            api_url=settings.baicai_api_url,
-            api_key=settings.baicai_api_key
+        from core.ai_client import get_ai_client
+        return get_ai_client(
+            api_url=self.settings.baicai_api_url,
+            api_key=self.settings.baicai_api_key
         )
-
-        bedrock_client = get_bedrock_client(
-            region=settings.region,
+    
+    @cached_property
+    def bedrock(self):
+        from core.bedrock_client import get_bedrock_client
+        return get_bedrock_client(
+            region=self.settings.region,
             knowledge_base_id=None  # No longer using Knowledge Base
         )
-
-        opensearch_client = get_opensearch_client(
-            collection_endpoint=settings.opensearch_endpoint,
-            index_name=settings.index_name,
-            region=settings.region,
-            service=settings.opensearch_service
+    
+    @cached_property
+    def opensearch(self):
+        from core.opensearch_client import get_opensearch_client
+        return get_opensearch_client(
+            collection_endpoint=self.settings.opensearch_endpoint,
+            index_name=self.settings.index_name,
+            region=self.settings.region,
+            service=self.settings.opensearch_service,
+            pool_maxsize=self.settings.opensearch_pool_size
         )
-
-        # Initialize business services
-        data_collector = DataCollector(db, redis_client)
-        memory_manager = MemoryManager(db)
-        rag_retriever = RAGRetriever(opensearch_client, bedrock_client)
-        decision_validator = DecisionValidator(db)
-        portfolio_executor = PortfolioExecutor(db)
+    
+    # ===== Business services =====
+    
+    @cached_property
+    def data_collector(self):
+        from services.data_collector import DataCollector
+        return DataCollector(self.db, self.redis)
+    
+    @cached_property
+    def memory_manager(self):
+        from services.memory_manager import MemoryManager
+        return MemoryManager(self.db)
+    
+    @cached_property
+    def rag_retriever(self):
+        from services.rag_retriever import RAGRetriever
+        return RAGRetriever(self.opensearch, self.bedrock)
+    
+    @cached_property
+    def decision_validator(self):
+        from services.decision_validator import DecisionValidator
+        return DecisionValidator(self.db)
+    
+    @cached_property
+    def portfolio_executor(self):
+        from services.portfolio_executor import PortfolioExecutor
+        return PortfolioExecutor(self.db)
+    
+    @cached_property
+    def ai_orchestrator(self):
         # AIOrchestrator 不再使用全局 ai_client，每个 agent 使用独立的 API Key
-        ai_orchestrator = AIOrchestrator(db, ai_client=None)
-        
-        logger.info("All services initialized successfully")
-        
-        return {
-            'db': db,
-            'redis': redis_client,
-            'ai_client': ai_client,
-            'bedrock': bedrock_client,
-            'opensearch': opensearch_client,
-            'data_collector': data_collector,
-            'memory_manager': memory_manager,
-            'rag_retriever': rag_retriever,
-            'decision_validator': decision_validator,
-            'portfolio_executor': portfolio_executor,
-            'ai_orchestrator': ai_orchestrator
-        }
+        from services.ai_orchestrator import AIOrchestrator
+        return AIOrchestrator(self.db, ai_client=None)
+
+
+def initialize_services() -> LazyServices:
+    """
+    Create the service container (clients are built lazily on first use)
+    
+    Returns:
+        LazyServices instance
+    """
+    logger.info("Initializing services...")
+    
+    try:
+        services = LazyServices()
+        logger.info("Service container ready (clients initialize on first use)")
+        return services
     
     except Exception as e:
         logger.error(f"Failed to initialize services: {e}")
         raise
 
 
-def run_hourly_news_analysis(services: dict, agent_id: str, test_mode: bool = False) -> bool:
+def run_hourly_news_analysis(services: LazyServices, agent_id: str, test_mode: bool = False) -> bool:
     """
     Run hourly news analysis workflow
 
     Args:
-        services: Initialized services
+        services: Lazily-initialized services
         agent_id: AI agent ID
         test_mode: If True, run without database writes
 
     Returns:
         True if successful
     """
+    from workflows.hourly_news_analysis import HourlyNewsAnalysisWorkflow
+
     logger.info(f"Starting hourly news analysis for {agent_id} (test_mode={test_mode})")
 
     workflow = HourlyNewsAnalysisWorkflow(
-        data_collector=services['data_collector'],
-        memory_manager=services['memory_manager'],
-        ai_orchestrator=services['ai_orchestrator'],
-        db=services['db'],
+        data_collector=services.data_collector,
+        memory_manager=services.memory_manager,
+        ai_orchestrator=services.ai_orchestrator,
+        db=services.db,
         test_mode=test_mode
     )
 
     return workflow.run(agent_id)
 
 
-def run_daily_summary(services: dict, agent_id: str, test_mode: bool = False) -> bool:
+def run_daily_summary(services: LazyServices, agent_id: str, test_mode: bool = False) -> bool:
     """
     Run daily summary workflow
 
     Args:
-        services: Initialized services
+        services: Lazily-initialized services
         agent_id: AI agent ID
         test_mode: If True, run without database/RAG writes
 
     Returns:
         True if successful
     """
+    from workflows.daily_summary import DailySummaryWorkflow
+
     logger.info(f"Starting daily summary for {agent_id} (test_mode={test_mode})")
 
     workflow = DailySummaryWorkflow(
-        data_collector=services['data_collector'],
-        memory_manager=services['memory_manager'],
-        rag_retriever=services['rag_retriever'],
-        ai_orchestrator=services['ai_orchestrator'],
-        bedrock_client=services['bedrock'],
-        opensearch_client=services['opensearch'],
-        db=services['db'],
+        data_collector=services.data_collector,
+        memory_manager=services.memory_manager,
+        rag_retriever=services.rag_retriever,
+        ai_orchestrator=services.ai_orchestrator,
+        bedrock_client=services.bedrock,
+        opensearch_client=services.opensearch,
+        db=services.db,
         test_mode=test_mode
     )
 
     return workflow.run(agent_id)
 
 
-def run_trading_decision(services: dict, agent_id: str, test_mode: bool = False) -> bool:
+def run_trading_decision(services: LazyServices, agent_id: str, test_mode: bool = False) -> bool:
     """
     Run trading decision workflow
 
     Args:
-        services: Initialized services
+        services: Lazily-initialized services
         agent_id: AI agent ID
         test_mode: If True, run without database writes and verbose logging
 
     Returns:
         True if successful
     """
+    from workflows.trading_decision import TradingDecisionWorkflow
+
     logger.info(f"Starting trading decision for {agent_id} (test_mode={test_mode})")
 
     workflow = TradingDecisionWorkflow(
-        data_collector=services['data_collector'],
-        memory_manager=services['memory_manager'],
-        rag_retriever=services['rag_retriever'],
-        decision_validator=services['decision_validator'],
-        portfolio_executor=services['portfolio_executor'],
-        ai_orchestrator=services['ai_orchestrator'],
-        bedrock_client=services['bedrock'],
-        opensearch_client=services['opensearch'],
-        db=services['db'],
+        data_collector=services.data_collector,
+        memory_manager=services.memory_manager,
+        rag_retriever=services.rag_retriever,
+        decision_validator=services.decision_validator,
+        portfolio_executor=services.portfolio_executor,
+        ai_orchestrator=services.ai_orchestrator,
+        bedrock_client=services.bedrock,
+        opensearch_client=services.opensearch,
+        db=services.db,
         test_mode=test_mode
     )
 
     return workflow.run(agent_id)
 
 
-def run_weekly_summary(services: dict, agent_id: str, test_mode: bool = False) -> bool:
+def run_weekly_summary(services: LazyServices, agent_id: str, test_mode: bool = False) -> bool:
     """
     Run weekly stock summary workflow
 
     Args:
-        services: Initialized services
+        services: Lazily-initialized services
         agent_id: AI agent ID
         test_mode: If True, run without database/RAG writes
 
     Returns:
         True if successful
     """
+    from workflows.weekly_summary import WeeklySummaryWorkflow
+
     logger.info(f"Starting weekly summary for {agent_id} (test_mode={test_mode})")
 
     workflow = WeeklySummaryWorkflow(
-        data_collector=services['data_collector'],
-        rag_retriever=services['rag_retriever'],
-        ai_orchestrator=services['ai_orchestrator'],
-        bedrock_client=services['bedrock'],
-        opensearch_client=services['opensearch'],
-        db=services['db'],
+        data_collector=services.data_collector,
+        rag_retriever=services.rag_retriever,
+        ai_orchestrator=services.ai_orchestrator,
+        bedrock_client=services.bedrock,
+        opensearch_client=services.opensearch,
+        db=services.db,
         test_mode=test_mode
     )
 
     return workflow.run(agent_id)
 
 
-def run_stock_analysis(services: dict, agent_id: str, test_mode: bool = False, symbols: list = None) -> bool:
+def run_stock_analysis(services: LazyServices, agent_id: str, test_mode: bool = False, symbols: list = None) -> bool:
     """
     Run stock analysis workflow
 
     Args:
-        services: Initialized services
+        services: Lazily-initialized services
         agent_id: AI agent ID
         test_mode: If True, run without database/RAG writes
         symbols: Optional list of symbols to analyze
@@ -240,14 +274,16 @@ def run_stock_analysis(services: dict, agent_id: str, test_mode: bool = False, s
     Returns:
         True if successful
     """
+    from workflows.stock_analysis import StockAnalysisWorkflow
+
     logger.info(f"Starting stock analysis for {agent_id} (test_mode={test_mode}, symbols={symbols or 'ALL'})")
 
     workflow = StockAnalysisWorkflow(
-        data_collector=services['data_collector'],
-        rag_retriever=services['rag_retriever'],
-        ai_orchestrator=services['ai_orchestrator'],
-        bedrock_client=services['bedrock'],
-        opensearch_client=services['opensearch'],
+        data_collector=services.data_collector,
+        rag_retriever=services.rag_retriever,
+        ai_orchestrator=services.ai_orchestrator,
+        bedrock_client=services.bedrock,
+        opensearch_client=services.opensearch,
         test_mode=test_mode
     )
 
@@ -255,20 +291,39 @@ def run_stock_analysis(services: dict, agent_id: str, test_mode: bool = False, s
     return len(results) > 0
 
 
-def get_enabled_agents(services: dict) -> list:
+def run_refresh_prices_48h(services: LazyServices) -> int:
+    """
+    Refresh the 48h price summaries that workflows read from Redis
+    
+    Args:
+        services: Lazily-initialized services
+        
+    Returns:
+        Exit code (0 = success, 2 = nothing refreshed)
+    """
+    logger.info("Starting 48h price summary refresh")
+    
+    refreshed = services.data_collector.refresh_48h_prices()
+    
+    logger.info(f"Refreshed 48h price summaries for {refreshed} symbols")
+    
+    return 0 if refreshed else 2
+
+
+def get_enabled_agents(services: LazyServices) -> list:
     """
     Get list of enabled AI agents
     
     Args:
-        services: Initialized services
+        services: Lazily-initialized services
         
     Returns:
         List of agent IDs
     """
     query = "SELECT agent_id FROM ai_agents WHERE enabled = TRUE ORDER BY agent_id"
-    results = services['db'].execute_query(query)
+    results = services.db.execute_query(query, fetch='tuples')
     
-    return [r['agent_id'] for r in results] if results else []
+    return [agent_id for agent_id, in results] if results else []
 
 
 def main():
@@ -285,15 +340,15 @@ def main():
             'daily_summary',
             'trading_decision',
             'weekly_summary',
-            'stock_analysis'
+            'stock_analysis',
+            'refresh_prices_48h'
         ],
         help='Workflow to execute'
     )
     
     parser.add_argument(
         '--agent_id',
-        required=True,
-        help='AI agent ID (claude/gpt/gemini/all)'
+        help='AI agent ID (claude/gpt/gemini/all); not used by refresh_prices_48h'
     )
     
     parser.add_argument(
@@ -325,6 +380,11 @@ def main():
 
     args = parser.parse_args()
     
+    if not args.agent_id and args.workflow != 'refresh_prices_48h':
+        parser.error('--agent_id is required for this workflow')
+    
+    from utils import get_et_timestamp_iso
+    
     # Configure logger
     global logger
     logger = get_logger(
@@ -345,6 +405,10 @@ def main():
         # Initialize services
         services = initialize_services()
         
+        # Agent-independent: refresh the shared 48h price summaries once
+        if args.workflow == 'refresh_prices_48h':
+            return run_refresh_prices_48h(services)
+        
         # Determine which agents to run
         if args.agent_id == 'all':
             agent_ids = get_enabled_agents(services)
@@ -372,9 +436,7 @@ def main():
         if args.symbols:
             symbols = [s.strip() for s in args.symbols.split(',') if s.strip()]
 
-        # Execute workflow for each agent
-        success_count = 0
-        for agent_id in agent_ids:
+        def run_for_agent(agent_id: str) -> bool:
             logger.info(f"Executing {args.workflow} for {agent_id}")
 
             try:
@@ -387,16 +449,27 @@ def main():
                     success = workflow_func(services, agent_id)
 
                 if success:
-                    success_count += 1
                     logger.info(f"Workflow completed successfully for {agent_id}")
                 else:
                     logger.error(f"Workflow failed for {agent_id}")
 
+                return bool(success)
+
             except Exception as e:
                 logger.error(
                     f"Workflow execution failed for {agent_id}: {e}",
                     exc_info=True
                 )
+                return False
+
+        # Execute workflow for each agent concurrently (agents share only pooled clients)
+        success_count = 0
+        with ThreadPoolExecutor(max_workers=len(agent_ids)) as executor:
+            futures = [executor.submit(run_for_agent, agent_id) for agent_id in agent_ids]
+
+            for future in as_completed(futures):
+                if future.result():
+                    success_count += 1
         
         # Summary
         logger.info(
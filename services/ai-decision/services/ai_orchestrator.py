@@ -1,15 +1,158 @@
 """
 AI Orchestrator Service
-Orchestrate sequential calls to multiple AIs (Claude → GPT → Gemini)
+Orchestrate concurrent calls to multiple AIs (Claude, GPT, Gemini)
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator, Union
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import OrderedDict
+import copy
+import hashlib
+import re
+import orjson
+import threading
 import time
 from core import DatabaseManager, AIClient, create_context_logger
 from config import get_settings
 
 logger = create_context_logger()
 
+# Process-wide caches shared by all AIOrchestrator instances, so pooled
+# connections and roster lookups survive service re-initialization
+_AI_CLIENT_CACHE: Dict[Tuple[str, str], AIClient] = {}  # {(api_url, api_key_env): AIClient}
+_API_KEY_CACHE: Dict[str, str] = {}  # {api_key_env: api_key}
+_AGENTS_CACHE: Dict[str, Any] = {'agents': None, 'by_id': {}, 'ts': 0.0}
+_AGENTS_TTL = 60.0
+_CACHE_LOCK = threading.Lock()
+
+# Opt-in response cache: {key: (result, expires_at)}, LRU-bounded
+_RESPONSE_CACHE: "OrderedDict[bytes, Tuple[Dict[str, Any], float]]" = OrderedDict()
+_RESPONSE_CACHE_MAX = 256
+
+# Fallback: first-to-last brace span of a response with surrounding prose
+_JSON_OBJ_RE = re.compile(r'\{.*\}', re.DOTALL)
+
+
+def _response_cache_key(agent_id: str, messages: List[Dict[str, str]], temperature: float) -> bytes:
+    """
+    Build the response cache key for an agent call
+
+    Args:
+        agent_id: AI ID
+        messages: message list
+        temperature: temperature parameter
+
+    Returns:
+        16-byte digest
+    """
+    payload = orjson.dumps(messages, option=orjson.OPT_SORT_KEYS)
+    return hashlib.blake2b(
+        payload + f"|{agent_id}|{temperature}".encode(),
+        digest_size=16
+    ).digest()
+
+
+def _get_cached_response(key: bytes) -> Optional[Dict[str, Any]]:
+    """
+    Look up an unexpired cached result
+
+    Args:
+        key: response cache key
+
+    Returns:
+        Copy of the cached result, or None
+    """
+    with _CACHE_LOCK:
+        entry = _RESPONSE_CACHE.get(key)
+        if entry is None:
+            return None
+
+        result, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del _RESPONSE_CACHE[key]
+            return None
+
+        _RESPONSE_CACHE.move_to_end(key)
+        return copy.deepcopy(result)
+
+
+def _store_response(key: bytes, result: Dict[str, Any], ttl: float):
+    """
+    Cache a successful result for ttl seconds (evicting least recently used entries)
+
+    Args:
+        key: response cache key
+        result: call result
+        ttl: time to live (seconds)
+    """
+    with _CACHE_LOCK:
+        _RESPONSE_CACHE[key] = (copy.deepcopy(result), time.monotonic() + ttl)
+        _RESPONSE_CACHE.move_to_end(key)
+        while len(_RESPONSE_CACHE) > _RESPONSE_CACHE_MAX:
+            _RESPONSE_CACHE.popitem(last=False)
+
+
+def _read_first_object(chunks: Iterator[str]) -> Tuple[str, bool]:
+    """
+    Consume streamed text until the first top-level JSON object closes
+
+    Args:
+        chunks: iterator of response text chunks
+
+    Returns:
+        (text consumed so far, whether a complete object was seen)
+    """
+    parts = []
+    depth = 0
+    in_string = False
+    escaped = False
+
+    for chunk in chunks:
+        parts.append(chunk)
+        for ch in chunk:
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif ch == '\\':
+                    escaped = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = depth > 0
+            elif ch == '{':
+                depth += 1
+            elif ch == '}' and depth > 0:
+                depth -= 1
+                if depth == 0:
+                    return ''.join(parts), True
+
+    return ''.join(parts), False
+
+
+def _strip_code_fence(text: str) -> str:
+    """
+    Return the body of the first Markdown code fence, or the text unchanged
+
+    Args:
+        text: AI response text
+
+    Returns:
+        Fence body (language tag line removed)
+    """
+    start = text.find('```')
+    if start == -1:
+        return text
+
+    body_start = text.find('\n', start)
+    if body_start == -1:
+        return text
+
+    end = text.find('\n```', body_start)
+    if end == -1:
+        return text
+
+    return text[body_start + 1:end]
+
 
 class AIOrchestrator:
     """AI orchestration service"""
@@ -25,14 +168,53 @@ class AIOrchestrator:
         self.db = db
         self.ai_client = ai_client  # Kept but no longer used
         self.settings = get_settings()
-        self._client_cache = {}  # Cache AIClient instances: {(api_url, api_key): AIClient}
+
+    def _get_api_key(self, api_key_env: str) -> str:
+        """
+        Resolve an API key once per process (env / Secrets Manager lookup)
+
+        Args:
+            api_key_env: API key variable name
+
+        Returns:
+            API key
+        """
+        with _CACHE_LOCK:
+            api_key = _API_KEY_CACHE.get(api_key_env)
+
+        if api_key is None:
+            api_key = self.settings.get_api_key(api_key_env)
+            with _CACHE_LOCK:
+                _API_KEY_CACHE[api_key_env] = api_key
+
+        return api_key
+
+    @staticmethod
+    def _normalize_url(agent_id: str, api_url: str) -> str:
+        """
+        Normalize an agent API URL: remove a possible /v1/chat/completions suffix
+        (AIClient adds this path automatically, so keeping it would duplicate it)
+
+        Args:
+            agent_id: AI ID (for logging)
+            api_url: API URL as stored in ai_agents
+
+        Returns:
+            Base API URL
+        """
+        api_url = api_url.rstrip('/')
+        if api_url.endswith('/v1/chat/completions'):
+            api_url = api_url[:-len('/v1/chat/completions')]
+            logger.info(f"Normalized API URL for {agent_id}: removed /v1/chat/completions suffix")
+
+        return api_url
 
     def _get_client_for_agent(self, agent: Dict[str, Any]) -> AIClient:
         """
         Get or create an AIClient for the given agent
 
         Args:
-            agent: agent config dict (includes api_url, api_key_env)
+            agent: agent config dict from get_enabled_agents (api_url already normalized)
 
         Returns:
             AIClient instance
@@ -40,36 +222,37 @@ class AIOrchestrator:
         api_url = agent['api_url']
         api_key_env = agent['api_key_env']
 
-        # Normalize API URL: remove possible /v1/chat/completions suffix
-        # AIClient adds this path automatically to avoid duplicates
-        api_url = api_url.rstrip('/')
-        if api_url.endswith('/v1/chat/completions'):
-            api_url = api_url[:-len('/v1/chat/completions')]
-            logger.debug(f"Normalized API URL for {agent['agent_id']}: removed /v1/chat/completions suffix")
+        # Check cache (uses normalized URL)
+        cache_key = (api_url, api_key_env)
+        with _CACHE_LOCK:
+            client = _AI_CLIENT_CACHE.get(cache_key)
 
-        # Get API key
-        api_key = self.settings.get_api_key(api_key_env)
+        if client is not None:
+            return client
 
-        # Check cache (uses normalized URL)
-        cache_key = (api_url, api_key)
-        if cache_key in self._client_cache:
-            return self._client_cache[cache_key]
+        # Create a new client outside the lock, then insert unless another thread won
+        client = AIClient(api_url=api_url, api_key=self._get_api_key(api_key_env))
 
-        # Create a new client and cache it
-        client = AIClient(api_url=api_url, api_key=api_key)
-        self._client_cache[cache_key] = client
+        with _CACHE_LOCK:
+            cached = _AI_CLIENT_CACHE.setdefault(cache_key, client)
 
-        logger.info(f"Created new AIClient for {agent['agent_id']}: {api_url}")
+        if cached is client:
+            logger.info(f"Created new AIClient for {agent['agent_id']}: {api_url}")
 
-        return client
+        return cached
 
     def get_enabled_agents(self) -> List[Dict[str, Any]]:
         """
-        Get enabled AI agents
+        Get enabled AI agents (cached process-wide for _AGENTS_TTL seconds)
         
         Returns:
             List of AIs [{'agent_id': str, 'name': str, 'model': str, ...}, ...]
         """
+        with _CACHE_LOCK:
+            cached = _AGENTS_CACHE['agents']
+            if cached is not None and time.monotonic() - _AGENTS_CACHE['ts'] < _AGENTS_TTL:
+                return cached
+        
         query = """
             SELECT 
                 agent_id,
@@ -91,27 +274,114 @@ class AIOrchestrator:
         """
         
         try:
-            results = self.db.execute_query(query)
+            results = self.db.execute_query(query) or []
             logger.info(f"Found {len(results)} enabled AI agents")
-            return results or []
+            
+            # Normalize once per roster load instead of on every call
+            for agent in results:
+                agent['api_url'] = self._normalize_url(agent['agent_id'], agent['api_url'])
+            
+            by_id = {agent['agent_id']: agent for agent in results}
+            with _CACHE_LOCK:
+                _AGENTS_CACHE['agents'] = results
+                _AGENTS_CACHE['by_id'] = by_id
+                _AGENTS_CACHE['ts'] = time.monotonic()
+            
+            return results
         
         except Exception as e:
             logger.error(f"Failed to get enabled agents: {e}")
             return []
     
+    def _invoke_one(
+        self,
+        agent: Dict[str, Any],
+        messages: List[Dict[str, str]],
+        temperature: float,
+        cache_ttl: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Call a single agent and build its result entry (never raises)
+
+        Args:
+            agent: agent config dict
+            messages: message list
+            temperature: temperature parameter
+            cache_ttl: reuse an identical earlier response for this many seconds (None disables)
+
+        Returns:
+            {'success': bool, 'response': str, 'usage': dict, 'error': str}
+        """
+        agent_id = agent['agent_id']
+        model = agent['model']
+
+        if cache_ttl:
+            cache_key = _response_cache_key(agent_id, messages, temperature)
+            cached = _get_cached_response(cache_key)
+            if cached is not None:
+                logger.info(f"AI response cache hit: {agent_id}")
+                return cached
+
+        logger.info(f"Calling AI: {agent_id} ({model})")
+
+        try:
+            # Get the dedicated client for this agent
+            client = self._get_client_for_agent(agent)
+
+            # Call the AI
+            response = client.call(
+                model=model,
+                messages=messages,
+                temperature=temperature
+            )
+
+            # Extract content
+            content = client.extract_content(response)
+
+            logger.info(
+                f"AI call succeeded: {agent_id}",
+                extra={'details': {'response_length': len(content)}}
+            )
+
+            result = {
+                'success': True,
+                'response': content,
+                'usage': response.get('usage', {}),
+                'error': None
+            }
+
+            if cache_ttl:
+                _store_response(cache_key, result, cache_ttl)
+
+            return result
+
+        except Exception as e:
+            logger.error(
+                f"AI call failed: {agent_id}",
+                extra={'details': {'error': str(e)}}
+            )
+
+            return {
+                'success': False,
+                'response': None,
+                'error': str(e)
+            }
+
     def call_all_agents(
         self,
         messages: List[Dict[str, str]],
         temperature: float = 0.7,
-        delay_between_calls: int = 1
+        delay_between_calls: int = 0,
+        cache_ttl: Optional[float] = None
     ) -> Dict[str, Any]:
         """
-        Call all AIs sequentially (Claude → GPT → Gemini)
+        Call all AIs concurrently (each agent uses its own provider endpoint)
         
         Args:
             messages: message list [{"role": "system", "content": "..."}, ...]
             temperature: temperature parameter
-            delay_between_calls: delay between AI calls (seconds)
+            delay_between_calls: deprecated, ignored (calls no longer run back-to-back)
+            cache_ttl: reuse identical earlier responses for this many seconds (None disables)
             
         Returns:
             {
@@ -126,55 +396,19 @@ class AIOrchestrator:
             logger.error("No enabled AI agents found")
             return {}
         
-        results = {}
-        
-        for agent in agents:
-            agent_id = agent['agent_id']
-            model = agent['model']
-
-            logger.info(f"Calling AI: {agent_id} ({model})")
-
-            try:
-                # Get the dedicated client for this agent
-                client = self._get_client_for_agent(agent)
-
-                # Call the AI
-                response = client.call(
-                    model=model,
-                    messages=messages,
-                    temperature=temperature
-                )
-
-                # Extract content
-                content = client.extract_content(response)
-                
-                results[agent_id] = {
-                    'success': True,
-                    'response': content,
-                    'usage': response.get('usage', {}),
-                    'error': None
-                }
-                
-                logger.info(
-                    f"AI call succeeded: {agent_id}",
-                    extra={'details': {'response_length': len(content)}}
-                )
-            
-            except Exception as e:
-                logger.error(
-                    f"AI call failed: {agent_id}",
-                    extra={'details': {'error': str(e)}}
-                )
-                
-                results[agent_id] = {
-                    'success': False,
-                    'response': None,
-                    'error': str(e)
-                }
+        # Network-bound calls to independent providers: fan out one thread per agent
+        completed = {}
+        with ThreadPoolExecutor(max_workers=len(agents)) as executor:
+            futures = {
+                executor.submit(self._invoke_one, agent, messages, temperature, cache_ttl): agent['agent_id']
+                for agent in agents
+            }
             
-            # Delay (avoid rate limiting)
-            if agent != agents[-1]:  # The last one doesn't need a delay
-                time.sleep(delay_between_calls)
+            for future in as_completed(futures):
+                completed[futures[future]] = future.result()
+        
+        # Keep results in roster order (Claude → GPT → Gemini)
+        results = {agent['agent_id']: completed[agent['agent_id']] for agent in agents}
         
         # Stats
         success_count = sum(1 for r in results.values() if r['success'])
@@ -190,7 +424,8 @@ class AIOrchestrator:
         agent_id: str,
         messages: List[Dict[str, str]],
         temperature: float = 0.7,
-        timeout_multiplier: float = 1.0
+        timeout_multiplier: float = 1.0,
+        cache_ttl: Optional[float] = None
     ) -> Optional[Dict[str, Any]]:
         """
         Call a single AI (uses the agent-specific API key)
@@ -200,32 +435,29 @@ class AIOrchestrator:
             messages: message list
             temperature: temperature parameter
             timeout_multiplier: multiplier for timeout (e.g., 2.0 for batch analysis)
+            cache_ttl: reuse an identical earlier response for this many seconds (None disables)
 
         Returns:
             {'success': bool, 'response': str, 'error': str}
         """
-        # Query AI config (includes api_url and api_key_env)
-        query = """
-            SELECT agent_id, name, model, api_url, api_key_env, enabled
-            FROM ai_agents
-            WHERE agent_id = %s
-        """
-
         try:
-            results = self.db.execute_query(query, (agent_id,))
+            # Look up AI config (includes api_url and api_key_env) in the cached roster
+            self.get_enabled_agents()
+            agent = _AGENTS_CACHE['by_id'].get(agent_id)
 
-            if not results:
-                logger.error(f"AI agent not found: {agent_id}")
-                return None
-
-            agent = results[0]
-
-            if not agent['enabled']:
-                logger.error(f"AI agent is disabled: {agent_id}")
+            if agent is None:
+                logger.error(f"AI agent not found or disabled: {agent_id}")
                 return None
 
             model = agent['model']
 
+            if cache_ttl:
+                cache_key = _response_cache_key(agent_id, messages, temperature)
+                cached = _get_cached_response(cache_key)
+                if cached is not None:
+                    logger.info(f"AI response cache hit: {agent_id}")
+                    return cached
+
             logger.info(f"Calling AI: {agent_id} ({model})")
 
             # Get the dedicated client for this agent
@@ -257,6 +489,9 @@ class AIOrchestrator:
                 extra={'details': {'response_length': len(content)}}
             )
 
+            if cache_ttl:
+                _store_response(cache_key, result, cache_ttl)
+
             return result
 
         except Exception as e:
@@ -271,43 +506,53 @@ class AIOrchestrator:
                 'error': str(e)
             }
     
-    def parse_json_response(self, response: str) -> Optional[Dict[str, Any]]:
+    def parse_json_response(self, response: Union[str, Iterable[str]]) -> Optional[Dict[str, Any]]:
         """
         Parse JSON in an AI response (removing Markdown code fences)
         Uses json_repair as fallback for malformed JSON.
 
         Args:
-            response: AI response text
+            response: AI response text, or a stream of text chunks (e.g. AIClient.call_stream);
+                a stream is parsed as soon as its first JSON object completes
 
         Returns:
             Parsed JSON object, or None on failure
         """
-        import json
-        import re
+        if not isinstance(response, str):
+            chunks = iter(response)
+            text, complete = _read_first_object(chunks)
+
+            if complete:
+                obj_text = text[text.find('{'):]
+                try:
+                    return orjson.loads(obj_text)
+                except orjson.JSONDecodeError:
+                    # Not a clean object: drain the stream and use the full-text path
+                    text += ''.join(chunks)
+
+            response = text
 
-        # Strip Markdown code fences
         response = response.strip()
 
-        # Try removing ```json ... ```
-        match = re.search(r'```json\s*\n(.*?)\n```', response, re.DOTALL)
-        if match:
-            response = match.group(1)
+        # Fast path: well-behaved responses are plain JSON
+        try:
+            return orjson.loads(response)
+        except orjson.JSONDecodeError:
+            pass
 
-        # Try removing ```...```
-        match = re.search(r'```\s*\n(.*?)\n```', response, re.DOTALL)
-        if match:
-            response = match.group(1)
+        # Strip Markdown code fences (```json ... ``` or ``` ... ```)
+        response = _strip_code_fence(response)
 
         try:
-            return json.loads(response)
+            return orjson.loads(response)
 
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             # Fallback 1: try to extract first JSON object substring
-            fallback_match = re.search(r'\{.*\}', response, re.DOTALL)
+            fallback_match = _JSON_OBJ_RE.search(response)
             if fallback_match:
                 try:
-                    return json.loads(fallback_match.group(0))
-                except json.JSONDecodeError:
+                    return orjson.loads(fallback_match.group(0))
+                except orjson.JSONDecodeError:
                     pass
 
             # Fallback 2: try json_repair
@@ -332,41 +577,29 @@ class AIOrchestrator:
     
     def aggregate_responses(
         self,
-        results: Dict[str, Any],
+        results: Union[Dict[str, Any], Iterable[Dict[str, Any]]],
         aggregation_method: str = 'majority'
     ) -> Optional[str]:
         """
         Aggregate responses from multiple AIs (optional feature)
         
         Args:
-            results: AI call results
+            results: AI call results (dict from call_all_agents, or any iterable of result entries)
             aggregation_method: aggregation method (majority/consensus/weighted)
             
         Returns:
             Aggregated response
         """
-        successful_responses = [
-            r['response'] for r in results.values()
-            if r['success'] and r['response']
-        ]
-        
-        if not successful_responses:
-            return None
+        if isinstance(results, dict):
+            results = results.values()
         
-        if aggregation_method == 'majority':
-            # Simple majority (placeholder, not fully implemented)
-            return successful_responses[0]
+        # majority / consensus / weighted are placeholders (not fully implemented):
+        # every method currently resolves to the first successful response, so stop there
+        for r in results:
+            if r.get('success') and r.get('response'):
+                return r['response']
         
-        elif aggregation_method == 'consensus':
-            # Consensus check (placeholder, not fully implemented)
-            return successful_responses[0]
-        
-        elif aggregation_method == 'weighted':
-            # Weighted average (placeholder, not fully implemented)
-            return successful_responses[0]
-        
-        else:
-            return successful_responses[0]
+        return None
     
     def get_agent_statistics(self, agent_id: str) -> Dict[str, Any]:
         """
@@ -378,36 +611,33 @@ class AIOrchestrator:
         Returns:
             Statistics dictionary
         """
-        # Query trade statistics
+        # Trade statistics and cash balance in one round trip
+        # (an index on transactions(agent_id, action) keeps this an index scan)
         query = """
             SELECT 
                 COUNT(*) as total_trades,
                 COUNT(CASE WHEN action = 'BUY' THEN 1 END) as buy_count,
                 COUNT(CASE WHEN action = 'SELL' THEN 1 END) as sell_count,
                 SUM(CASE WHEN action = 'BUY' THEN total_amount ELSE 0 END) as total_bought,
-                SUM(CASE WHEN action = 'SELL' THEN total_amount ELSE 0 END) as total_sold
+                SUM(CASE WHEN action = 'SELL' THEN total_amount ELSE 0 END) as total_sold,
+                (SELECT cash_balance FROM wallets WHERE agent_id = %s) as cash_balance
             FROM transactions
             WHERE agent_id = %s
         """
         
         try:
-            results = self.db.execute_query(query, (agent_id,))
+            results = self.db.execute_query(query, (agent_id, agent_id))
             
             if not results:
                 return {}
             
-            stats = results[0]
-            
-            # Query current assets
-            wallet_query = """
-                SELECT cash_balance FROM wallets WHERE agent_id = %s
-            """
-            wallet_results = self.db.execute_query(wallet_query, (agent_id,))
+            stats = dict(results[0])
             
-            if wallet_results:
-                stats['cash_balance'] = float(wallet_results[0]['cash_balance'])
+            cash_balance = stats.pop('cash_balance')
+            if cash_balance is not None:
+                stats['cash_balance'] = float(cash_balance)
             
-            return dict(stats)
+            return stats
         
         except Exception as e:
             logger.error(f"Failed to get agent statistics: {e}")
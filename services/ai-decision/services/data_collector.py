@@ -3,13 +3,233 @@ Data Collector Service
 Collect news, earnings, stock prices, and related data
 """
 
-from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional, Tuple, Iterator, Callable
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import math
+import threading
+import time
+import orjson
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
 from core import DatabaseManager, RedisClient, create_context_logger
 from utils import get_et_now, ET_OFFSET
 
 logger = create_context_logger()
 
+# Fixed-shape hot queries, run as prepared statements: the text is the statement
+# key, so intervals are typed parameters rather than values spliced into literals
+_Q_POSITIONS = """
+    SELECT 
+        symbol,
+        quantity,
+        average_cost,
+        current_value,
+        unrealized_pnl,
+        position_type,
+        first_buy_date,
+        updated_at
+    FROM positions
+    WHERE agent_id = %s
+      AND quantity > 0
+    ORDER BY symbol
+"""
+
+_Q_DAILY_REVIEWS = """
+    SELECT 
+        review_date,
+        portfolio_value,
+        daily_pnl,
+        total_pnl,
+        transactions_count,
+        review_content
+    FROM daily_reviews
+    WHERE agent_id = %s
+      AND review_date > CURRENT_DATE - (%s * INTERVAL '1 day')
+    ORDER BY review_date DESC
+"""
+
+_Q_HOURLY_NEWS_ANALYSIS = """
+    SELECT
+        news_id,
+        analysis,
+        sentiment,
+        mentioned_stocks,
+        impact_prediction,
+        confidence_score::text AS confidence_score,
+        created_at
+    FROM hourly_news_analysis
+    WHERE agent_id = %s
+      AND created_at > NOW() - (%s * INTERVAL '1 hour')
+"""
+
+_Q_UNANALYZED_NEWS = """
+    SELECT
+        n.news_id,
+        n.title,
+        n.content,
+        n.source,
+        n.url,
+        n.published_at,
+        n.fetched_at,
+        n.category,
+        n.related_stocks,
+        n.classification,
+        n.sentiment,
+        n.sentiment_score
+    FROM news_articles n
+    LEFT JOIN hourly_news_analysis h
+        ON h.news_id = n.news_id
+       AND h.agent_id = %s
+    WHERE n.fetched_at > NOW() - (%s * INTERVAL '1 hour')
+      AND n.is_duplicate = FALSE
+      AND n.classification != 'irrelevant'
+      AND h.news_id IS NULL
+"""
+
+# get_agent_snapshot: date/timestamp columns per section (restored from JSON strings)
+_SNAPSHOT_TEMPORAL_FIELDS = {
+    'positions': ('first_buy_date', 'updated_at'),
+    'transactions': ('executed_at',),
+    'daily_reviews': ('review_date',),
+    'news_analysis': ('created_at',),
+}
+
+# get_agent_snapshot: NUMERIC columns per section (selected as text, restored as Decimal)
+_SNAPSHOT_DECIMAL_FIELDS = {
+    'positions': ('average_cost', 'current_value', 'unrealized_pnl'),
+    'transactions': ('quantity', 'price', 'total_amount'),
+    'daily_reviews': ('portfolio_value', 'daily_pnl', 'total_pnl'),
+    'news_analysis': ('confidence_score',),
+}
+
+# 48h summaries only move hourly: reuse them within a cycle.
+# refresh_48h_prices() keeps them in one Redis hash (field per symbol)
+PRICE_CHANGES_HASH_KEY = "prices48h"
+PRICE_CHANGES_CACHE_TTL = 600
+
+# The stock universe changes only when the ingest pipeline edits `stocks`
+STOCK_LIST_CACHE_TTL = 600
+STOCK_TYPES = ('stock', 'market_index', 'etf')
+MARKET_INDICES_CACHE_KEY = "market_indices"
+
+# S&P 500, VIX, Vanguard S&P 500 ETF, Gold ETF (Yahoo Finance format for indices)
+MARKET_INDICES_FALLBACK = ('^GSPC', '^VIX', 'VOO', 'GLD')
+
+# Process-local copies of the Redis-cached lists: warm processes skip the round trip.
+# Expired entries are kept as a last resort when both Redis and Postgres fail
+LOCAL_CACHE_TTL = 300
+_LOCAL_CACHE: Dict[str, Tuple[Any, float]] = {}
+_LOCAL_CACHE_LOCK = threading.Lock()
+
+
+def _local_cache_get(key: str, allow_stale: bool = False) -> Optional[Any]:
+    """
+    Look up a process-local cached value
+
+    Args:
+        key: cache key (same as the Redis key)
+        allow_stale: also return an expired value
+
+    Returns:
+        Cached value, or None
+    """
+    with _LOCAL_CACHE_LOCK:
+        entry = _LOCAL_CACHE.get(key)
+
+    if entry is None:
+        return None
+
+    value, expires_at = entry
+    if not allow_stale and time.monotonic() >= expires_at:
+        return None
+
+    # Shallow copy: callers may extend the list they receive
+    return list(value)
+
+
+def _local_cache_set(key: str, value: Any, ttl: int):
+    """
+    Store a value in the process-local cache
+
+    Args:
+        key: cache key (same as the Redis key)
+        value: value to cache
+        ttl: expiration in seconds (capped at LOCAL_CACHE_TTL)
+    """
+    # Shallow copy: the caller still holds (and may extend) the list it stored
+    value = list(value)
+    with _LOCAL_CACHE_LOCK:
+        _LOCAL_CACHE[key] = (value, time.monotonic() + min(ttl, LOCAL_CACHE_TTL))
+
+
+def _restore_temporal(row: Dict[str, Any], fields: tuple) -> Dict[str, Any]:
+    """
+    Convert date/timestamp columns of a JSON-built row back from ISO strings
+
+    Args:
+        row: row decoded from row_to_json / json_agg output
+        fields: date/timestamp column names
+
+    Returns:
+        The same row, with those columns as date/datetime objects
+    """
+    for field in fields:
+        value = row.get(field)
+        if value:
+            row[field] = date.fromisoformat(value) if len(value) == 10 else datetime.fromisoformat(value)
+
+    return row
+
+
+def _restore_decimal(row: Dict[str, Any], fields: tuple) -> Dict[str, Any]:
+    """
+    Convert NUMERIC columns of a JSON-built row back from text (selected as
+    `col::text` so JSON decoding does not round them through float)
+
+    Args:
+        row: row decoded from row_to_json / json_agg output
+        fields: NUMERIC column names
+
+    Returns:
+        The same row, with those columns as Decimal objects
+    """
+    for field in fields:
+        value = row.get(field)
+        if value is not None:
+            row[field] = Decimal(value)
+
+    return row
+
+
+def _stats_48h(prices: List[float]) -> Tuple[float, float, float, float, float, float]:
+    """
+    Summarize a symbol's hourly price series
+
+    Volatility is the population standard deviation relative to the mean, in
+    percent. It is computed in float with math.fsum: statistics.pstdev does
+    exact Fraction arithmetic and is ~20x slower for no benefit at 2 decimals.
+
+    Args:
+        prices: hourly prices, oldest first (at least 2)
+
+    Returns:
+        (first, last, high, low, change_pct, volatility)
+    """
+    n = len(prices)
+    first_price = prices[0]
+    latest_price = prices[-1]
+
+    change_pct = ((latest_price - first_price) / first_price) * 100 if first_price > 0 else 0.0
+
+    mean_price = math.fsum(prices) / n
+    if mean_price > 0:
+        variance = math.fsum((p - mean_price) * (p - mean_price) for p in prices) / n
+        volatility = math.sqrt(variance) / mean_price * 100
+    else:
+        volatility = 0.0
+
+    return first_price, latest_price, max(prices), min(prices), change_pct, volatility
+
 
 class DataCollector:
     """Data collection service"""
@@ -25,6 +245,69 @@ class DataCollector:
         self.db = db
         self.redis = redis_client
 
+    def _cache_get(self, key: str) -> Optional[Any]:
+        """
+        Read a cached JSON value, process-local copy first, then Redis
+        (cache errors count as a miss)
+
+        Args:
+            key: Redis key
+
+        Returns:
+            Cached value, or None on miss
+        """
+        value = _local_cache_get(key)
+        if value is not None:
+            return value
+
+        try:
+            raw = self.redis.get(key)
+            if not raw:
+                return None
+
+            value = orjson.loads(raw)
+            _local_cache_set(key, value, LOCAL_CACHE_TTL)
+            return value
+        except Exception as e:
+            logger.warning(f"Failed to read cache {key}: {e}")
+            return None
+
+    def _cache_set(self, key: str, value: Any, ttl: int):
+        """
+        Cache a JSON-serializable value in Redis (errors are logged and ignored)
+
+        Args:
+            key: Redis key
+            value: value to cache
+            ttl: expiration in seconds
+        """
+        _local_cache_set(key, value, ttl)
+
+        try:
+            self.redis.set(key, orjson.dumps(value, default=str), ex=ttl)
+        except Exception as e:
+            logger.warning(f"Failed to write cache {key}: {e}")
+
+    def invalidate_stock_list(self):
+        """
+        Drop cached stock lists and market indices (call after editing the stocks table;
+        other processes keep their local copies for up to LOCAL_CACHE_TTL)
+        """
+        with _LOCAL_CACHE_LOCK:
+            _LOCAL_CACHE.clear()
+
+        try:
+            # The key set is finite, so no KEYS scan of the shared Redis is needed
+            keys = [
+                self._stock_list_key(enabled_only, stock_type)
+                for stock_type in STOCK_TYPES
+                for enabled_only in (True, False)
+            ]
+            deleted = self.redis.delete(MARKET_INDICES_CACHE_KEY, *keys)
+            logger.info(f"Invalidated {deleted} cached stock lists and market indices")
+        except Exception as e:
+            logger.warning(f"Failed to invalidate stock list cache: {e}")
+
     def fetch_all(self, query: str, params: Optional[tuple] = None) -> List[Dict[str, Any]]:
         """
         Execute query and fetch all results
@@ -55,14 +338,92 @@ class DataCollector:
             Single result dictionary, or None if no results
         """
         try:
-            results = self.db.execute_query(query, params, fetch=True)
-            if results and len(results) > 0:
-                return results[0]
-            return None
+            # Read only the first row (cursor.fetchone, no full result list)
+            return self.db.execute_query(query, params, fetch='one')
         except Exception as e:
             logger.error(f"Failed to fetch one: {e}")
             return None
 
+    def fetch_json_rows(
+        self,
+        query: str,
+        params: Optional[tuple],
+        order_by: str,
+        temporal_fields: tuple = (),
+        decimal_fields: tuple = (),
+        prepare: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetch a large result as one server-built JSON array instead of row by row
+        (one value for the driver to transfer, decoded once with orjson)
+
+        Args:
+            query: SQL query string (wrapped as a subquery)
+            params: Query parameters
+            order_by: ordering of the aggregated rows (e.g. 'published_at DESC')
+            temporal_fields: date/timestamp columns to convert back from ISO strings
+            decimal_fields: NUMERIC columns selected as `col::text`, converted back to
+                Decimal (a bare NUMERIC would decode as float)
+            prepare: run as a server-side prepared statement (see DatabaseManager.execute_query)
+
+        Returns:
+            List of result dictionaries
+
+        Raises:
+            RuntimeError: query failed
+        """
+        wrapped = f"SELECT json_agg(t ORDER BY {order_by})::text AS rows FROM ({query}) t"
+        results = self.db.execute_query(wrapped, params, prepare=prepare)
+
+        if not results or not results[0]['rows']:
+            return []
+
+        rows = orjson.loads(results[0]['rows'])
+        if temporal_fields:
+            for row in rows:
+                _restore_temporal(row, temporal_fields)
+        if decimal_fields:
+            for row in rows:
+                _restore_decimal(row, decimal_fields)
+
+        return rows
+
+    def batch_fetch(self, queries: List[Tuple[str, Optional[tuple]]]) -> List[List[Dict[str, Any]]]:
+        """
+        Run independent SELECTs concurrently on pooled connections, so their
+        round trips overlap instead of adding up
+
+        Args:
+            queries: [(query, params), ...]
+
+        Returns:
+            One result list per query, in input order ([] for a failed query)
+        """
+        if len(queries) <= 1:
+            return [self.fetch_all(query, params) for query, params in queries]
+
+        with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+            futures = [executor.submit(self.fetch_all, query, params) for query, params in queries]
+            return [future.result() for future in futures]
+
+    def gather(self, calls: Dict[str, Callable[[], Any]]) -> Dict[str, Any]:
+        """
+        Run independent lookups concurrently (each on its own pooled connection)
+        so their round trips overlap: wall time is the slowest call, not the sum
+
+        Args:
+            calls: {name: zero-argument callable}
+
+        Returns:
+            {name: result}; an exception from any call is re-raised
+        """
+        if len(calls) <= 1:
+            return {name: call() for name, call in calls.items()}
+
+        with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+            futures = {name: executor.submit(call) for name, call in calls.items()}
+            return {name: future.result() for name, future in futures.items()}
+
     def execute_query(self, query: str, params: Optional[tuple] = None):
         """
         Execute a non-SELECT query (INSERT/UPDATE/DELETE)
@@ -77,6 +438,26 @@ class DataCollector:
             logger.error(f"Failed to execute query: {e}")
             raise
     
+    def execute_values(self, query: str, values: List[Tuple], page_size: int = 1000) -> int:
+        """
+        Insert many rows with one multi-row statement per page
+        (use instead of calling execute_query in a loop, e.g. when saving
+        hourly_news_analysis rows)
+
+        Args:
+            query: SQL string with a single `VALUES %s` placeholder
+            values: Row tuples
+            page_size: Rows per statement
+
+        Returns:
+            Number of rows affected
+        """
+        try:
+            return self.db.execute_values(query, values, page_size=page_size)
+        except Exception as e:
+            logger.error(f"Failed to execute batch insert: {e}")
+            raise
+    
     def collect_news(
         self,
         hours: int = 1,
@@ -109,7 +490,7 @@ class DataCollector:
                 related_stocks,
                 classification
             FROM news_articles
-            WHERE published_at > NOW() - INTERVAL '%s hours'
+            WHERE published_at > NOW() - (%s * INTERVAL '1 hour')
               AND is_duplicate = FALSE
               AND classification != 'irrelevant'
         """
@@ -125,10 +506,13 @@ class DataCollector:
             query += " AND category = ANY(%s)"
             params.append(categories)
         
-        query += " ORDER BY published_at DESC"
-        
         try:
-            results = self.db.execute_query(query, tuple(params))
+            results = self.fetch_json_rows(
+                query, tuple(params),
+                order_by='published_at DESC',
+                temporal_fields=('published_at',),
+                prepare=True
+            )
             logger.info(f"Collected {len(results)} news articles")
             return results or []
         
@@ -203,12 +587,10 @@ class DataCollector:
         
         try:
             if symbols:
-                prices = {}
+                # One MGET round-trip instead of a GET per symbol
+                prices = self.redis.get_stock_prices(symbols)
                 for symbol in symbols:
-                    price = self.redis.get_stock_price(symbol)
-                    if price is not None:
-                        prices[symbol] = price
-                    else:
+                    if symbol not in prices:
                         logger.warning(f"Price not found for {symbol}")
             else:
                 prices = self.redis.get_all_stock_prices()
@@ -230,13 +612,97 @@ class DataCollector:
         
         Args:
             enabled_only: return only enabled stocks
-            stock_type: stock type (stock/index/etf)
+            stock_type: stock type (stock/market_index/etf)
         
         Returns:
             Stock list [{'symbol': str, 'name': str, 'sector': str, ...}, ...]
         """
         logger.info("Fetching stock list")
         
+        cache_key = self._stock_list_key(enabled_only, stock_type)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            logger.info(f"Found {len(cached)} stocks (cached)")
+            return cached
+        
+        query, params = self._stock_list_query(enabled_only, stock_type)
+        
+        try:
+            results = self.db.execute_query(query, params)
+            logger.info(f"Found {len(results)} stocks")
+            if results:
+                self._cache_set(cache_key, results, STOCK_LIST_CACHE_TTL)
+            return results or []
+        
+        except Exception as e:
+            logger.error(f"Failed to get stock list: {e}")
+            return _local_cache_get(cache_key, allow_stale=True) or []
+    
+    def get_stock_lists(
+        self,
+        stock_types: List[str],
+        enabled_only: bool = True
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Get the stock lists for several types in one batch_fetch
+        
+        Args:
+            stock_types: stock types (stock/market_index/etf)
+            enabled_only: return only enabled stocks
+        
+        Returns:
+            {stock_type: stock list}
+        """
+        logger.info(f"Fetching stock lists: {stock_types}")
+        
+        lists = {}
+        missing = []
+        
+        for stock_type in stock_types:
+            cached = self._cache_get(self._stock_list_key(enabled_only, stock_type))
+            if cached is not None:
+                lists[stock_type] = cached
+            else:
+                missing.append(stock_type)
+        
+        if missing:
+            results = self.batch_fetch([
+                self._stock_list_query(enabled_only, stock_type) for stock_type in missing
+            ])
+            
+            for stock_type, result in zip(missing, results):
+                lists[stock_type] = result
+                if result:
+                    self._cache_set(self._stock_list_key(enabled_only, stock_type), result, STOCK_LIST_CACHE_TTL)
+        
+        return {stock_type: lists[stock_type] for stock_type in stock_types}
+    
+    @staticmethod
+    def _stock_list_key(enabled_only: bool, stock_type: str) -> str:
+        """
+        Build the Redis key for a cached stock list
+        
+        Args:
+            enabled_only: return only enabled stocks
+            stock_type: stock type
+        
+        Returns:
+            Redis key
+        """
+        return f"stock_list:{stock_type}:{'enabled' if enabled_only else 'all'}"
+    
+    @staticmethod
+    def _stock_list_query(enabled_only: bool, stock_type: str) -> Tuple[str, tuple]:
+        """
+        Build the get_stock_list query
+        
+        Args:
+            enabled_only: return only enabled stocks
+            stock_type: stock type
+        
+        Returns:
+            (query, params)
+        """
         query = """
             SELECT 
                 symbol,
@@ -248,21 +714,13 @@ class DataCollector:
             FROM stocks
             WHERE type = %s
         """
-        params = [stock_type]
         
         if enabled_only:
             query += " AND enabled = TRUE"
         
         query += " ORDER BY symbol"
         
-        try:
-            results = self.db.execute_query(query, tuple(params))
-            logger.info(f"Found {len(results)} stocks")
-            return results or []
-        
-        except Exception as e:
-            logger.error(f"Failed to get stock list: {e}")
-            return []
+        return query, (stock_type,)
     
     def get_positions(self, agent_id: str) -> List[Dict[str, Any]]:
         """
@@ -276,24 +734,8 @@ class DataCollector:
         """
         logger.info(f"Fetching positions for {agent_id}")
         
-        query = """
-            SELECT 
-                symbol,
-                quantity,
-                average_cost,
-                current_value,
-                unrealized_pnl,
-                position_type,
-                first_buy_date,
-                updated_at
-            FROM positions
-            WHERE agent_id = %s
-              AND quantity > 0
-            ORDER BY symbol
-        """
-        
         try:
-            results = self.db.execute_query(query, (agent_id,))
+            results = self.db.execute_query(_Q_POSITIONS, (agent_id,), prepare=True)
             logger.info(f"Found {len(results)} positions")
             return results or []
         
@@ -305,40 +747,57 @@ class DataCollector:
         self,
         agent_id: str,
         days: int = 7,
-        limit: int = 50
+        limit: int = 50,
+        before: Optional[datetime] = None
     ) -> List[Dict[str, Any]]:
         """
-        Get recent transactions
+        Get recent transactions (newest first, keyset-paginated)
         
         Args:
             agent_id: AI ID
             days: last N days
             limit: number of records to return
+            before: only transactions executed before this time; pass the last
+                executed_at of the previous page to fetch the next one
             
         Returns:
             List of transactions
         """
         logger.info(f"Fetching recent transactions for {agent_id}")
         
+        # Served by idx_tx_agent_exec (agent_id, executed_at DESC): an index seek
+        # plus `limit` rows, see DB_Architecture.md
         query = """
             SELECT 
                 symbol,
                 action,
-                quantity,
-                price,
-                total_amount,
+                quantity::text AS quantity,
+                price::text AS price,
+                total_amount::text AS total_amount,
                 reason,
                 position_type,
                 executed_at
             FROM transactions
             WHERE agent_id = %s
-              AND executed_at > NOW() - INTERVAL '%s days'
-            ORDER BY executed_at DESC
-            LIMIT %s
+              AND executed_at > NOW() - (%s * INTERVAL '1 day')
         """
+        params = [agent_id, days]
+        
+        if before is not None:
+            query += " AND executed_at < %s"
+            params.append(before)
+        
+        query += " ORDER BY executed_at DESC LIMIT %s"
+        params.append(limit)
         
         try:
-            results = self.db.execute_query(query, (agent_id, days, limit))
+            results = self.fetch_json_rows(
+                query, tuple(params),
+                order_by='executed_at DESC',
+                temporal_fields=('executed_at',),
+                decimal_fields=('quantity', 'price', 'total_amount'),
+                prepare=True
+            )
             logger.info(f"Found {len(results)} transactions")
             return results or []
         
@@ -363,22 +822,8 @@ class DataCollector:
         """
         logger.info(f"Fetching daily reviews for {agent_id}")
         
-        query = """
-            SELECT 
-                review_date,
-                portfolio_value,
-                daily_pnl,
-                total_pnl,
-                transactions_count,
-                review_content
-            FROM daily_reviews
-            WHERE agent_id = %s
-              AND review_date > CURRENT_DATE - INTERVAL '%s days'
-            ORDER BY review_date DESC
-        """
-        
         try:
-            results = self.db.execute_query(query, (agent_id, days))
+            results = self.db.execute_query(_Q_DAILY_REVIEWS, (agent_id, days), prepare=True)
             logger.info(f"Found {len(results)} daily reviews")
             return results or []
         
@@ -403,23 +848,14 @@ class DataCollector:
         """
         logger.info(f"Fetching hourly news analysis for {agent_id}")
 
-        query = """
-            SELECT
-                news_id,
-                analysis,
-                sentiment,
-                mentioned_stocks,
-                impact_prediction,
-                confidence_score,
-                created_at
-            FROM hourly_news_analysis
-            WHERE agent_id = %s
-              AND created_at > NOW() - INTERVAL '%s hours'
-            ORDER BY created_at DESC
-        """
-
         try:
-            results = self.db.execute_query(query, (agent_id, hours))
+            results = self.fetch_json_rows(
+                _Q_HOURLY_NEWS_ANALYSIS, (agent_id, hours),
+                order_by='created_at DESC',
+                temporal_fields=('created_at',),
+                decimal_fields=('confidence_score',),
+                prepare=True
+            )
             logger.info(f"Found {len(results)} news analysis records")
             return results or []
 
@@ -427,6 +863,109 @@ class DataCollector:
             logger.error(f"Failed to get hourly news analysis: {e}")
             return []
 
+    def get_agent_snapshot(
+        self,
+        agent_id: str,
+        days: int = 7,
+        hours: int = 24,
+        limit: int = 50,
+        include_reviews: bool = False
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Get positions, recent transactions, hourly news analysis and (optionally)
+        daily reviews in one database round trip (same rows as the individual getters)
+
+        Args:
+            agent_id: AI ID
+            days: last N days (transactions and daily reviews)
+            hours: last N hours (news analysis)
+            limit: max transactions to return
+            include_reviews: also fetch daily reviews (left empty otherwise)
+
+        Returns:
+            {'positions': [...], 'transactions': [...], 'daily_reviews': [...], 'news_analysis': [...]}
+        """
+        logger.info(f"Fetching agent snapshot for {agent_id}")
+
+        # NUMERIC columns are selected as text so row_to_json does not turn them
+        # into JSON numbers (restored as Decimal below). Each branch numbers its
+        # rows: UNION ALL alone does not preserve the CTEs' order.
+        rev_cte = rev_select = ""
+        params = [agent_id, agent_id, days, limit]
+        if include_reviews:
+            rev_cte = """
+            rev AS (
+                SELECT review_date, portfolio_value::text AS portfolio_value,
+                       daily_pnl::text AS daily_pnl, total_pnl::text AS total_pnl,
+                       transactions_count, review_content
+                FROM daily_reviews
+                WHERE agent_id = %s
+                  AND review_date > CURRENT_DATE - (%s * INTERVAL '1 day')
+            ),"""
+            rev_select = """
+            UNION ALL
+            SELECT 'daily_reviews', row_number() OVER (ORDER BY review_date DESC), row_to_json(rev) FROM rev"""
+            params += [agent_id, days]
+        params += [agent_id, hours]
+
+        query = f"""
+            WITH pos AS (
+                SELECT symbol, quantity, average_cost::text AS average_cost,
+                       current_value::text AS current_value,
+                       unrealized_pnl::text AS unrealized_pnl,
+                       position_type, first_buy_date, updated_at
+                FROM positions
+                WHERE agent_id = %s
+                  AND quantity > 0
+            ),
+            txn AS (
+                SELECT symbol, action, quantity::text AS quantity, price::text AS price,
+                       total_amount::text AS total_amount, reason,
+                       position_type, executed_at
+                FROM transactions
+                WHERE agent_id = %s
+                  AND executed_at > NOW() - (%s * INTERVAL '1 day')
+                ORDER BY executed_at DESC
+                LIMIT %s
+            ),{rev_cte}
+            news AS (
+                SELECT news_id, analysis, sentiment, mentioned_stocks, impact_prediction,
+                       confidence_score::text AS confidence_score, created_at
+                FROM hourly_news_analysis
+                WHERE agent_id = %s
+                  AND created_at > NOW() - (%s * INTERVAL '1 hour')
+            )
+            SELECT 'positions' AS kind, row_number() OVER (ORDER BY symbol) AS ord,
+                   row_to_json(pos) AS row
+            FROM pos
+            UNION ALL
+            SELECT 'transactions', row_number() OVER (ORDER BY executed_at DESC), row_to_json(txn) FROM txn{rev_select}
+            UNION ALL
+            SELECT 'news_analysis', row_number() OVER (ORDER BY created_at DESC), row_to_json(news) FROM news
+            ORDER BY kind, ord
+        """
+
+        snapshot = {kind: [] for kind in _SNAPSHOT_TEMPORAL_FIELDS}
+
+        try:
+            results = self.db.execute_query(query, tuple(params))
+
+            for r in results or []:
+                row = _restore_temporal(r['row'], _SNAPSHOT_TEMPORAL_FIELDS[r['kind']])
+                snapshot[r['kind']].append(_restore_decimal(row, _SNAPSHOT_DECIMAL_FIELDS[r['kind']]))
+
+            logger.info(
+                f"Agent snapshot: {len(snapshot['positions'])} positions, "
+                f"{len(snapshot['transactions'])} transactions, "
+                f"{len(snapshot['daily_reviews'])} daily reviews, "
+                f"{len(snapshot['news_analysis'])} news analysis records"
+            )
+            return snapshot
+
+        except Exception as e:
+            logger.error(f"Failed to get agent snapshot: {e}")
+            return snapshot
+
     def collect_unanalyzed_news(
         self,
         agent_id: str,
@@ -450,35 +989,13 @@ class DataCollector:
         """
         logger.info(f"Collecting unanalyzed news for {agent_id} from last {hours} hours")
 
-        query = """
-            SELECT
-                n.news_id,
-                n.title,
-                n.content,
-                n.source,
-                n.url,
-                n.published_at,
-                n.fetched_at,
-                n.category,
-                n.related_stocks,
-                n.classification,
-                n.sentiment,
-                n.sentiment_score
-            FROM news_articles n
-            WHERE n.fetched_at > NOW() - INTERVAL '%s hours'
-              AND n.is_duplicate = FALSE
-              AND n.classification != 'irrelevant'
-              AND NOT EXISTS (
-                  SELECT 1
-                  FROM hourly_news_analysis h
-                  WHERE h.news_id = n.news_id
-                    AND h.agent_id = %s
-              )
-            ORDER BY n.fetched_at DESC
-        """
-
         try:
-            results = self.db.execute_query(query, (hours, agent_id))
+            results = self.fetch_json_rows(
+                _Q_UNANALYZED_NEWS, (agent_id, hours),
+                order_by='fetched_at DESC',
+                temporal_fields=('published_at', 'fetched_at'),
+                prepare=True
+            )
             logger.info(f"Collected {len(results)} unanalyzed news articles")
             return results or []
 
@@ -486,6 +1003,32 @@ class DataCollector:
             logger.error(f"Failed to collect unanalyzed news: {e}")
             return []
     
+    def iter_unanalyzed_news(
+        self,
+        agent_id: str,
+        hours: float = 4.0,
+        itersize: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream unanalyzed news (same rows and order as collect_unanalyzed_news)
+        for consumers that process one article at a time
+
+        Args:
+            agent_id: AI ID
+            hours: time window (hours)
+            itersize: rows fetched per round trip
+
+        Yields:
+            One news article at a time
+        """
+        logger.info(f"Streaming unanalyzed news for {agent_id} from last {hours} hours")
+
+        yield from self.db.stream_query(
+            _Q_UNANALYZED_NEWS + " ORDER BY n.fetched_at DESC",
+            (agent_id, hours),
+            itersize=itersize
+        )
+
     def calculate_portfolio_value(
         self,
         agent_id: str
@@ -502,26 +1045,13 @@ class DataCollector:
         logger.info(f"Calculating portfolio value for {agent_id}")
         
         try:
-            # Get positions
-            positions = self.get_positions(agent_id)
+            totals = self._portfolio_totals(agent_id)
             
-            # Get wallet
-            wallet_query = """
-                SELECT cash_balance, long_term_cash, short_term_cash
-                FROM wallets
-                WHERE agent_id = %s
-            """
-            wallet_result = self.db.execute_query(wallet_query, (agent_id,))
-            
-            if not wallet_result:
+            if totals is None:
                 logger.warning(f"Wallet not found for {agent_id}")
                 return {'total_value': 0.0, 'cash': 0.0, 'stocks': 0.0}
             
-            wallet = wallet_result[0]
-            cash_balance = float(wallet['cash_balance'])
-            
-            # Calculate position value
-            stocks_value = sum(float(p['current_value']) for p in positions)
+            cash_balance, stocks_value = totals
             
             return {
                 'total_value': cash_balance + stocks_value,
@@ -533,6 +1063,33 @@ class DataCollector:
             logger.error(f"Failed to calculate portfolio value: {e}")
             return {'total_value': 0.0, 'cash': 0.0, 'stocks': 0.0}
 
+    def _portfolio_totals(self, agent_id: str) -> Optional[Tuple[float, float]]:
+        """
+        Get cash balance and summed position value, aggregated in SQL
+        (no position rows are shipped to Python)
+        
+        Args:
+            agent_id: AI ID
+            
+        Returns:
+            (cash, stocks), or None if the wallet does not exist
+        """
+        query = """
+            SELECT
+                w.cash_balance,
+                COALESCE((
+                    SELECT SUM(p.current_value)
+                    FROM positions p
+                    WHERE p.agent_id = %s
+                      AND p.quantity > 0
+                ), 0) AS stocks_value
+            FROM wallets w
+            WHERE w.agent_id = %s
+        """
+        rows = self.db.execute_query(query, (agent_id, agent_id), fetch='tuples', numeric_as_float=True)
+        
+        return rows[0] if rows else None
+
     def get_price_changes_48h(self, symbols: List[str]) -> Dict[str, Dict]:
         """
         Query DynamoDB for 48h price history (hourly data points)
@@ -541,6 +1098,9 @@ class DataCollector:
         - Data collection frequency: Hourly (48 data points expected)
         - Calculate accurate high/low and change percentage
 
+        Summaries kept fresh in the Redis hash by refresh_48h_prices() are
+        served with one HMGET; only symbols missing from it hit DynamoDB.
+
         Args:
             symbols: List of stock symbols to query
 
@@ -558,14 +1118,127 @@ class DataCollector:
         """
         logger.info(f"Fetching 48h price changes for {len(symbols)} symbols")
 
+        if not symbols:
+            return {}
+
+        results = self._read_price_changes_hash(symbols)
+        missing = [symbol for symbol in symbols if symbol not in results]
+
+        if results:
+            logger.info(f"Serving 48h price changes for {len(results)} symbols from Redis")
+
+        if missing:
+            fetched = self._query_price_changes_48h(missing)
+            self._write_price_changes_hash(fetched)
+            results.update(fetched)
+
+        # Keep input symbol order (symbols whose client setup failed are omitted)
+        return {symbol: results[symbol] for symbol in symbols if symbol in results}
+
+    def refresh_48h_prices(self, symbols: Optional[List[str]] = None) -> int:
+        """
+        Recompute 48h summaries for the whole universe and store them in Redis
+
+        Meant to run on a schedule (every few minutes) so that workflows read
+        the summaries from the hash instead of querying DynamoDB.
+
+        Args:
+            symbols: symbols to refresh (default: enabled stocks, ETFs and market indices)
+
+        Returns:
+            Number of symbols written to the hash
+        """
+        if symbols is None:
+            lists = self.get_stock_lists(['stock', 'etf'])
+            symbols = [s['symbol'] for stocks in lists.values() for s in stocks]
+            symbols += self.get_market_indices()
+            symbols = list(dict.fromkeys(symbols))
+
+        logger.info(f"Refreshing 48h price summaries for {len(symbols)} symbols")
+
+        return self._write_price_changes_hash(self._query_price_changes_48h(symbols))
+
+    def _read_price_changes_hash(self, symbols: List[str]) -> Dict[str, Dict]:
+        """
+        Read fresh 48h summaries from the Redis hash (cache errors count as misses)
+
+        Args:
+            symbols: stock symbols
+
+        Returns:
+            {symbol: summary} for symbols with a fresh entry
+        """
+        try:
+            values = self.redis.hmget(PRICE_CHANGES_HASH_KEY, symbols)
+        except Exception as e:
+            logger.warning(f"Failed to read {PRICE_CHANGES_HASH_KEY}: {e}")
+            return {}
+
+        # The hash TTL is renewed on every write: check each entry's own age
+        oldest = get_et_now().timestamp() - PRICE_CHANGES_CACHE_TTL
+        results = {}
+
+        for symbol, raw in zip(symbols, values):
+            if not raw:
+                continue
+
+            try:
+                entry = orjson.loads(raw)
+            except orjson.JSONDecodeError:
+                continue
+
+            if entry.get('refreshed_at', 0) >= oldest:
+                results[symbol] = entry['stats']
+
+        return results
+
+    def _write_price_changes_hash(self, results: Dict[str, Dict]) -> int:
+        """
+        Store 48h summaries in the Redis hash (failed symbols are skipped so they are retried)
+
+        Args:
+            results: {symbol: summary}
+
+        Returns:
+            Number of symbols written
+        """
+        refreshed_at = get_et_now().timestamp()
+        mapping = {
+            symbol: orjson.dumps({'refreshed_at': refreshed_at, 'stats': stats})
+            for symbol, stats in results.items()
+            if 'error' not in stats
+        }
+
         try:
-            import boto3
-            from boto3.dynamodb.conditions import Key
-            from decimal import Decimal
+            self.redis.hset_many(PRICE_CHANGES_HASH_KEY, mapping, ex=PRICE_CHANGES_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"Failed to write {PRICE_CHANGES_HASH_KEY}: {e}")
+            return 0
+
+        return len(mapping)
+
+    def _query_price_changes_48h(self, symbols: List[str]) -> Dict[str, Dict]:
+        """
+        Query DynamoDB for 48h summaries, one concurrent Query per symbol
 
-            # Initialize DynamoDB client
-            dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
-            table = dynamodb.Table('StockPrices')
+        Args:
+            symbols: stock symbols
+
+        Returns:
+            {symbol: summary} in input order (empty if the client cannot be created)
+        """
+        try:
+            from botocore.config import Config
+            from core import get_boto_session
+
+            # Low-level clients are thread-safe (resources are not): share one
+            # across the workers, with a connection pool sized to match
+            max_workers = min(16, len(symbols))
+            dynamodb = get_boto_session().client(
+                'dynamodb',
+                region_name='us-east-1',
+                config=Config(max_pool_connections=max_workers)
+            )
 
             # Use ET timezone for timestamp calculations
             now = get_et_now()
@@ -574,53 +1247,20 @@ class DataCollector:
 
             results = {}
 
-            for symbol in symbols:
-                try:
-                    # Query ALL hourly data from last 48 hours
-                    response = table.query(
-                        KeyConditionExpression=Key('symbol').eq(symbol) &
-                                             Key('timestamp').between(timestamp_48h_ago, timestamp_now),
-                        ScanIndexForward=True  # Ascending order
-                    )
-
-                    items = response.get('Items', [])
-
-                    if len(items) >= 2:
-                        # StockPriceFetcher stores data with 'price' field, not OHLC
-                        # Convert Decimal to float for calculations
-                        prices = [float(item['price']) for item in items]
-                        first_price = prices[0]
-                        latest_price = prices[-1]
-
-                        # Calculate high/low over ALL 48h data points
-                        high_48h = max(prices)
-                        low_48h = min(prices)
-
-                        # Calculate percentage change
-                        change_pct = ((latest_price - first_price) / first_price) * 100 if first_price > 0 else 0.0
-
-                        results[symbol] = {
-                            'current_price': latest_price,
-                            'price_48h_ago': first_price,
-                            'change_pct': round(change_pct, 2),
-                            'high_48h': high_48h,
-                            'low_48h': low_48h,
-                            'data_points': len(items),
-                            'volatility': round(((high_48h - low_48h) / low_48h) * 100, 2) if low_48h > 0 else 0.0
-                        }
-                    else:
-                        # Insufficient data
-                        logger.warning(f"Insufficient price data for {symbol} (only {len(items)} points)")
-                        results[symbol] = {
-                            'current_price': float(items[-1]['price']) if items else None,
-                            'change_pct': 0.0,
-                            'data_points': len(items),
-                            'insufficient_data': True
-                        }
-
-                except Exception as e:
-                    logger.error(f"Failed to fetch price data for {symbol}: {e}")
-                    results[symbol] = {'error': str(e)}
+            # Each query is one network round trip: overlap them instead of running back-to-back
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {
+                    executor.submit(
+                        self._fetch_one_symbol_48h, dynamodb, symbol, timestamp_48h_ago, timestamp_now
+                    ): symbol
+                    for symbol in symbols
+                }
+
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+
+            # Keep input symbol order
+            results = {symbol: results[symbol] for symbol in symbols}
 
             avg_points = sum(r.get('data_points', 0) for r in results.values()) / len(results) if results else 0
             logger.info(f"Fetched 48h price data for {len(results)} symbols "
@@ -632,6 +1272,74 @@ class DataCollector:
             logger.error(f"Failed to initialize DynamoDB client: {e}")
             return {}
 
+    def _fetch_one_symbol_48h(
+        self,
+        dynamodb,
+        symbol: str,
+        t_from: int,
+        t_to: int
+    ) -> Dict[str, Any]:
+        """
+        Query one symbol's hourly StockPrices items and summarize them (never raises)
+
+        Args:
+            dynamodb: low-level DynamoDB client
+            symbol: stock symbol
+            t_from: window start (epoch seconds)
+            t_to: window end (epoch seconds)
+
+        Returns:
+            Per-symbol result dict (see get_price_changes_48h)
+        """
+        try:
+            # Query ALL hourly data from last 48 hours
+            response = dynamodb.query(
+                TableName='StockPrices',
+                KeyConditionExpression='symbol = :symbol AND #ts BETWEEN :t_from AND :t_to',
+                ExpressionAttributeNames={'#ts': 'timestamp'},
+                # Only the fields used below: cuts response payload
+                ProjectionExpression='#ts, price',
+                ExpressionAttributeValues={
+                    ':symbol': {'S': symbol},
+                    ':t_from': {'N': str(t_from)},
+                    ':t_to': {'N': str(t_to)}
+                },
+                ScanIndexForward=True  # Ascending order
+            )
+
+            items = response.get('Items', [])
+
+            if len(items) >= 2:
+                # StockPriceFetcher stores data with 'price' field, not OHLC
+                # Low-level items carry numbers as strings: {'price': {'N': '123.45'}}
+                prices = [float(item['price']['N']) for item in items]
+
+                # High/low over ALL 48h data points, change and volatility in one place
+                first_price, latest_price, high_48h, low_48h, change_pct, volatility = _stats_48h(prices)
+
+                return {
+                    'current_price': latest_price,
+                    'price_48h_ago': first_price,
+                    'change_pct': round(change_pct, 2),
+                    'high_48h': high_48h,
+                    'low_48h': low_48h,
+                    'data_points': len(items),
+                    'volatility': round(volatility, 2)
+                }
+
+            # Insufficient data
+            logger.warning(f"Insufficient price data for {symbol} (only {len(items)} points)")
+            return {
+                'current_price': float(items[-1]['price']['N']) if items else None,
+                'change_pct': 0.0,
+                'data_points': len(items),
+                'insufficient_data': True
+            }
+
+        except Exception as e:
+            logger.error(f"Failed to fetch price data for {symbol}: {e}")
+            return {'error': str(e)}
+
     def get_recent_earnings_reports(
         self,
         symbols: Optional[List[str]] = None,
@@ -649,23 +1357,10 @@ class DataCollector:
         """
         logger.info(f"Fetching recent earnings reports (last {days} days)")
 
-        query = """
-            SELECT symbol, report_type, fiscal_year, fiscal_quarter,
-                   filing_date, summary_en, extraction_status
-            FROM financial_reports
-            WHERE extraction_status = 'completed'
-              AND filing_date >= CURRENT_DATE - INTERVAL '%s days'
-        """
-        params = [days]
-
-        if symbols:
-            query += " AND symbol = ANY(%s)"
-            params.append(symbols)
-
-        query += " ORDER BY filing_date DESC"
+        query, params = self._recent_earnings_query(symbols, days)
 
         try:
-            results = self.db.execute_query(query, tuple(params))
+            results = self.db.execute_query(query, params)
             logger.info(f"Found {len(results)} recent earnings reports")
             return results or []
 
@@ -692,6 +1387,82 @@ class DataCollector:
         """
         logger.info("Fetching latest earnings reports for all symbols")
 
+        query, params = self._latest_earnings_query(symbols)
+
+        try:
+            results = self.db.execute_query(query, params)
+            logger.info(f"Found {len(results)} latest earnings reports")
+            return results or []
+
+        except Exception as e:
+            logger.error(f"Failed to get latest earnings reports: {e}")
+            return []
+
+    def get_earnings_overview(
+        self,
+        symbols: Optional[List[str]] = None,
+        days: int = 7
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Get recent and latest earnings reports in one batch_fetch
+
+        Args:
+            symbols: Optional list to filter specific symbols
+            days: Lookback period for recent reports (default 7 days)
+
+        Returns:
+            (get_recent_earnings_reports result, get_latest_earnings_reports result)
+        """
+        logger.info(f"Fetching earnings overview (recent: last {days} days, latest per symbol)")
+
+        recent, latest = self.batch_fetch([
+            self._recent_earnings_query(symbols, days),
+            self._latest_earnings_query(symbols)
+        ])
+
+        logger.info(f"Found {len(recent)} recent / {len(latest)} latest earnings reports")
+        return recent, latest
+
+    @staticmethod
+    def _recent_earnings_query(symbols: Optional[List[str]], days: int) -> Tuple[str, tuple]:
+        """
+        Build the get_recent_earnings_reports query
+
+        Args:
+            symbols: Optional list to filter specific symbols
+            days: Lookback period
+
+        Returns:
+            (query, params)
+        """
+        query = """
+            SELECT symbol, report_type, fiscal_year, fiscal_quarter,
+                   filing_date, summary_en, extraction_status
+            FROM financial_reports
+            WHERE extraction_status = 'completed'
+              AND filing_date >= CURRENT_DATE - (%s * INTERVAL '1 day')
+        """
+        params = [days]
+
+        if symbols:
+            query += " AND symbol = ANY(%s)"
+            params.append(symbols)
+
+        query += " ORDER BY filing_date DESC"
+
+        return query, tuple(params)
+
+    @staticmethod
+    def _latest_earnings_query(symbols: Optional[List[str]]) -> Tuple[str, Optional[tuple]]:
+        """
+        Build the get_latest_earnings_reports query
+
+        Args:
+            symbols: Optional list to filter specific symbols
+
+        Returns:
+            (query, params)
+        """
         # Use DISTINCT ON to get latest report per symbol
         query = """
             SELECT DISTINCT ON (symbol)
@@ -705,18 +1476,11 @@ class DataCollector:
             query += " AND symbol = ANY(%s)"
             params = (symbols,)
         else:
-            params = ()
+            params = None
 
         query += " ORDER BY symbol, filing_date DESC"
 
-        try:
-            results = self.db.execute_query(query, params if params else None)
-            logger.info(f"Found {len(results)} latest earnings reports")
-            return results or []
-
-        except Exception as e:
-            logger.error(f"Failed to get latest earnings reports: {e}")
-            return []
+        return query, params
 
     def get_market_indices(self) -> List[str]:
         """
@@ -730,8 +1494,13 @@ class DataCollector:
         """
         logger.info("Fetching market indices and ETFs")
 
+        cached = self._cache_get(MARKET_INDICES_CACHE_KEY)
+        if cached:
+            logger.info(f"Found {len(cached)} market indices/ETFs (cached)")
+            return cached
+
         query = """
-            SELECT symbol, type, name
+            SELECT symbol
             FROM stocks
             WHERE type IN ('market_index', 'etf')
               AND enabled = TRUE
@@ -744,22 +1513,30 @@ class DataCollector:
         """
 
         try:
-            results = self.db.execute_query(query, None)
+            results = self.db.execute_query(query, None, fetch='tuples')
 
             if results:
-                symbols = [r['symbol'] for r in results]
+                symbols = [symbol for symbol, in results]
                 logger.info(f"Found {len(symbols)} market indices/ETFs from database: {symbols}")
+                self._cache_set(MARKET_INDICES_CACHE_KEY, symbols, STOCK_LIST_CACHE_TTL)
                 return symbols
             else:
                 # Fallback: Use major market indices (Yahoo Finance format with ^) + major ETFs
                 logger.warning("No indices found in database, using hardcoded fallback")
-                fallback_symbols = ['^GSPC', '^VIX', 'VOO', 'GLD']  # S&P 500, VIX, Vanguard S&P 500 ETF, Gold ETF
+                fallback_symbols = list(MARKET_INDICES_FALLBACK)
                 logger.info(f"Using fallback symbols: {fallback_symbols}")
                 return fallback_symbols
 
         except Exception as e:
             logger.error(f"Failed to get market indices: {e}")
+
+            # Prefer the last list we loaded over the hardcoded one
+            stale = _local_cache_get(MARKET_INDICES_CACHE_KEY, allow_stale=True)
+            if stale:
+                logger.info(f"Using last known market indices due to error: {stale}")
+                return stale
+
             # Fallback to major market indicators
-            fallback_symbols = ['^GSPC', '^VIX', 'VOO', 'GLD']
+            fallback_symbols = list(MARKET_INDICES_FALLBACK)
             logger.info(f"Using fallback symbols due to error: {fallback_symbols}")
             return fallback_symbols
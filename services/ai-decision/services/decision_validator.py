@@ -3,17 +3,45 @@ Decision Validator Service
 Validate trading decisions against 6 investment rules
 """
 
-from typing import Dict, Any, Tuple, List, Optional
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+import orjson
+from typing import Dict, Any, Tuple, List, Optional, FrozenSet
 from datetime import datetime, date
 from core import DatabaseManager, create_context_logger
 from utils import get_et_today
 
 logger = create_context_logger()
 
+# Most violations written per INSERT by the background writer, and how long
+# it waits for more rows before writing a partial batch
+VIOLATION_BATCH_SIZE = 100
+VIOLATION_FLUSH_INTERVAL = 0.05
+
+# validate_decision_cached reuses a result this long, for at most this many decisions
+VALIDATION_CACHE_TTL = 2.0
+VALIDATION_CACHE_MAX = 10000
+
+# position_type -> (wallet column, violation type, account label)
+_CASH_ACCOUNTS = {
+    'LONG_TERM': ('long_term_cash', 'INSUFFICIENT_LONG_TERM_CASH', 'long-term'),
+    'SHORT_TERM': ('short_term_cash', 'INSUFFICIENT_SHORT_TERM_CASH', 'short-term'),
+}
+
 
 class DecisionValidator:
     """Trading decision validator"""
 
+    # Allowed trading pool, shared by all instances: enabled tickers change rarely
+    _pool_cache: Optional[FrozenSet[str]] = None
+    _pool_cache_ts: float = 0.0
+    _pool_ttl: float = 60.0
+    _pool_lock = threading.Lock()
+
     def __init__(self, db: DatabaseManager, test_mode: bool = False):
         """
         Initialize the validator
@@ -24,6 +52,89 @@ class DecisionValidator:
         """
         self.db = db
         self.test_mode = test_mode
+        
+        # Violation rows are written off the validation path by a daemon thread
+        self._violation_q: "queue.Queue[Tuple]" = queue.Queue()
+        self._violation_writer = threading.Thread(
+            target=self._write_violations, name="violation-writer", daemon=True
+        )
+        self._violation_writer.start()
+        # Daemon threads die with the process: drain what is queued first
+        atexit.register(self.flush)
+        
+        # validate_decision_cached: decision key -> (result, expires_at)
+        self._result_cache: "OrderedDict[Tuple, Tuple[Tuple[bool, Optional[str], Optional[str]], float]]" = OrderedDict()
+        self._result_cache_lock = threading.Lock()
+    
+    def invalidate(self, agent_id: str):
+        """
+        Drop cached validation results of an agent (call after its wallet/state changes)
+        
+        Args:
+            agent_id: AI ID
+        """
+        with self._result_cache_lock:
+            for key in [key for key in self._result_cache if key[0] == agent_id]:
+                del self._result_cache[key]
+    
+    def flush(self):
+        """Block until every queued violation has been written (or failed)"""
+        self._violation_q.join()
+    
+    def log_violations_bulk(self, rows: List[Tuple]) -> int:
+        """
+        Insert many violation rows with multi-row INSERTs (one per page of 500)
+        
+        Args:
+            rows: (agent_id, violation_type, attempted_action JSON, detection_method,
+                severity, notes) tuples
+            
+        Returns:
+            Number of rows written
+            
+        Raises:
+            RuntimeError: insert failed
+        """
+        query = """
+            INSERT INTO compliance_violations (
+                agent_id,
+                violation_type,
+                attempted_action,
+                detection_method,
+                severity,
+                notes
+            ) VALUES %s
+        """
+        
+        return self.db.execute_values(
+            query, rows, page_size=500, template="(%s, %s, %s::jsonb, %s, %s, %s)"
+        )
+    
+    def _write_violations(self):
+        """
+        Writer thread: insert queued violations, flushing when a batch fills
+        or VIOLATION_FLUSH_INTERVAL passes after its first row
+        """
+        while True:
+            rows = [self._violation_q.get()]
+            deadline = time.monotonic() + VIOLATION_FLUSH_INTERVAL
+            
+            while len(rows) < VIOLATION_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    rows.append(self._violation_q.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            try:
+                self.log_violations_bulk(rows)
+            except Exception as e:
+                logger.error(f"Failed to log {len(rows)} violations: {e}")
+            finally:
+                for _ in rows:
+                    self._violation_q.task_done()
     
     def validate_decision(
         self,
@@ -48,15 +159,155 @@ class DecisionValidator:
             - violation_type: violation type (e.g., INVALID_STOCK)
             - reason: violation reason
         """
-        logger.info(
-            f"Validating decision for {agent_id}",
-            extra={'details': {
-                'decision_type': decision.get('decision_type'),
-                'symbol': decision.get('symbol'),
-                'position_type': decision.get('position_type')
-            }}
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Validating decision for %s",
+                agent_id,
+                extra={'details': {
+                    'decision_type': decision.get('decision_type'),
+                    'symbol': decision.get('symbol'),
+                    'position_type': decision.get('position_type')
+                }}
+            )
+        
+        # Rule 1 needs no data when the symbol is missing
+        if not decision.get('symbol'):
+            result = (False, 'MISSING_SYMBOL', 'Missing stock symbol')
+            self._log_violation(agent_id, decision, result[1], result[2])
+            return result
+        
+        # Everything the rules read, in one round trip
+        try:
+            context = self._fetch_validation_context(agent_id, decision['symbol'])
+        except Exception as e:
+            logger.error(f"Failed to fetch validation context: {e}")
+            result = (False, 'VALIDATION_ERROR', f'Validation failed: {e}')
+            self._log_violation(agent_id, decision, result[1], result[2])
+            return result
+        
+        return self._check_rules(agent_id, decision, context)
+    
+    def validate_decision_cached(
+        self,
+        agent_id: str,
+        decision: Dict[str, Any]
+    ) -> Tuple[bool, Optional[str], Optional[str]]:
+        """
+        validate_decision, reusing the result for an identical decision
+        validated within VALIDATION_CACHE_TTL seconds (backtests, simulations)
+        
+        Args:
+            agent_id: AI ID
+            decision: decision dictionary (see validate_decision)
+            
+        Returns:
+            (is_valid, violation_type, reason)
+        """
+        key = (
+            agent_id,
+            decision.get('symbol'),
+            decision.get('decision_type'),
+            decision.get('position_type'),
+            round(decision.get('quantity') or 0),
+            round(decision.get('price') or 0.0, 4)
         )
         
+        with self._result_cache_lock:
+            entry = self._result_cache.get(key)
+            if entry is not None and time.monotonic() >= entry[1]:
+                del self._result_cache[key]
+                entry = None
+            elif entry is not None:
+                self._result_cache.move_to_end(key)
+        
+        if entry is not None:
+            result = entry[0]
+            # Each attempt is still a violation on record
+            if not result[0]:
+                self._log_violation(agent_id, decision, result[1], result[2])
+            return result
+        
+        result = self.validate_decision(agent_id, decision)
+        
+        # Errors are transient: retry them next time
+        if result[1] != 'VALIDATION_ERROR':
+            with self._result_cache_lock:
+                self._result_cache[key] = (result, time.monotonic() + VALIDATION_CACHE_TTL)
+                self._result_cache.move_to_end(key)
+                while len(self._result_cache) > VALIDATION_CACHE_MAX:
+                    self._result_cache.popitem(last=False)
+        
+        return result
+    
+    def validate_batch(
+        self,
+        items: List[Tuple[str, Dict[str, Any]]]
+    ) -> List[Tuple[bool, Optional[str], Optional[str]]]:
+        """
+        Validate several (agent_id, decision) pairs with one context query
+        
+        All contexts are read before any check runs, so each decision is
+        validated against the state before the batch (not after earlier
+        decisions in it execute).
+        
+        Args:
+            items: (agent_id, decision) pairs
+            
+        Returns:
+            (is_valid, violation_type, reason) per item, in input order
+        """
+        logger.info("Validating %s decisions", len(items))
+        
+        results: List[Optional[Tuple[bool, Optional[str], Optional[str]]]] = [None] * len(items)
+        pending = []
+        # One calendar date for the whole batch
+        today = get_et_today()
+        
+        for i, (agent_id, decision) in enumerate(items):
+            if decision.get('symbol'):
+                pending.append(i)
+            else:
+                results[i] = (False, 'MISSING_SYMBOL', 'Missing stock symbol')
+                self._log_violation(agent_id, decision, results[i][1], results[i][2])
+        
+        try:
+            contexts = self._fetch_validation_contexts(
+                [(items[i][0], items[i][1]['symbol']) for i in pending]
+            )
+        except Exception as e:
+            logger.error(f"Failed to fetch validation contexts: {e}")
+            contexts = None
+        
+        for n, i in enumerate(pending):
+            agent_id, decision = items[i]
+            
+            if contexts is None:
+                results[i] = (False, 'VALIDATION_ERROR', 'Validation failed: context unavailable')
+                self._log_violation(agent_id, decision, results[i][1], results[i][2])
+            else:
+                results[i] = self._check_rules(agent_id, decision, contexts[n], today)
+        
+        return results
+    
+    def _check_rules(
+        self,
+        agent_id: str,
+        decision: Dict[str, Any],
+        context: Dict[str, Any],
+        today: Optional[date] = None
+    ) -> Tuple[bool, Optional[str], Optional[str]]:
+        """
+        Run the rule checks against a pre-fetched context, logging the first violation
+        
+        Args:
+            agent_id: AI ID
+            decision: decision dictionary
+            context: validation context (see _fetch_validation_contexts)
+            today: current ET date (computed if omitted)
+            
+        Returns:
+            (is_valid, violation_type, reason)
+        """
         # Rule 1: stock pool check
         result = self._validate_stock_pool(decision)
         if not result[0]:
@@ -64,20 +315,20 @@ class DecisionValidator:
             return result
         
         # Rule 2: trade count check
-        result = self._validate_trade_quota(agent_id, decision)
+        result = self._validate_trade_quota(agent_id, decision, context)
         if not result[0]:
             self._log_violation(agent_id, decision, result[1], result[2])
             return result
         
         # Rule 3: wallet balance check
-        result = self._validate_wallet_balance(agent_id, decision)
+        result = self._validate_wallet_balance(agent_id, decision, context)
         if not result[0]:
             self._log_violation(agent_id, decision, result[1], result[2])
             return result
         
         # Rule 4: wash trade check (SELL only)
         if decision.get('decision_type') == 'SELL':
-            result = self._validate_wash_trade(agent_id, decision)
+            result = self._validate_wash_trade(agent_id, decision, context, today)
             if not result[0]:
                 self._log_violation(agent_id, decision, result[1], result[2])
                 return result
@@ -85,6 +336,98 @@ class DecisionValidator:
         logger.info("Decision validation passed")
         return (True, None, None)
     
+    def _fetch_validation_context(self, agent_id: str, symbol: str) -> Dict[str, Any]:
+        """
+        Fetch the stock pool flag, trade quota, wallet and position in one query
+        
+        Args:
+            agent_id: AI ID
+            symbol: stock symbol
+            
+        Returns:
+            Context dict (see _fetch_validation_contexts)
+            
+        Raises:
+            RuntimeError: query failed
+        """
+        return self._fetch_validation_contexts([(agent_id, symbol)])[0]
+    
+    def _fetch_validation_contexts(self, pairs: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """
+        Fetch validation contexts for several (agent_id, symbol) pairs in one query
+        
+        Args:
+            pairs: (agent_id, symbol) pairs
+            
+        Returns:
+            One context dict per pair, in input order; has_state/has_wallet/
+            has_position flag missing rows (the stock pool comes from _get_allowed_pool)
+            
+        Raises:
+            RuntimeError: query failed
+        """
+        if not pairs:
+            return []
+        
+        query = """
+            SELECT
+                q.idx,
+                a.agent_id IS NOT NULL AS has_state,
+                a.monthly_trade_quota,
+                w.agent_id IS NOT NULL AS has_wallet,
+                w.long_term_cash::float8 AS long_term_cash,
+                w.short_term_cash::float8 AS short_term_cash,
+                p.agent_id IS NOT NULL AS has_position,
+                p.position_type,
+                p.first_buy_date
+            FROM unnest(%s::text[], %s::text[]) WITH ORDINALITY AS q(agent_id, symbol, idx)
+            LEFT JOIN ai_state a ON a.agent_id = q.agent_id
+            LEFT JOIN wallets w ON w.agent_id = q.agent_id
+            LEFT JOIN positions p ON p.agent_id = q.agent_id AND p.symbol = q.symbol
+            ORDER BY q.idx
+        """
+        
+        agent_ids = [agent_id for agent_id, _ in pairs]
+        symbols = [symbol for _, symbol in pairs]
+        
+        # Same text on every call: parsed and planned once per pooled connection
+        return self.db.execute_query(query, (agent_ids, symbols), prepare=True)
+    
+    def _get_allowed_pool(self) -> FrozenSet[str]:
+        """
+        Get the enabled, tradable symbols (stocks and ETFs), cached for _pool_ttl seconds
+        
+        Returns:
+            Set of allowed symbols
+            
+        Raises:
+            RuntimeError: query failed and no set was ever loaded
+        """
+        cls = DecisionValidator
+        
+        with cls._pool_lock:
+            if cls._pool_cache is not None and time.monotonic() - cls._pool_cache_ts < cls._pool_ttl:
+                return cls._pool_cache
+            
+            query = """
+                SELECT symbol FROM stocks
+                WHERE enabled = TRUE AND type IN ('stock', 'etf')
+            """
+            
+            try:
+                rows = self.db.execute_query(query, fetch='tuples', prepare=True)
+            except Exception as e:
+                if cls._pool_cache is None:
+                    raise
+                # Keep validating against the last known pool
+                logger.warning(f"Failed to refresh stock pool, using cached set: {e}")
+                return cls._pool_cache
+            
+            cls._pool_cache = frozenset(symbol for symbol, in rows)
+            cls._pool_cache_ts = time.monotonic()
+            
+            return cls._pool_cache
+    
     def _validate_stock_pool(self, decision: Dict[str, Any]) -> Tuple[bool, Optional[str], Optional[str]]:
         """
         Rule 1: stocks/ETFs must be in the allowed trading pool
@@ -100,15 +443,8 @@ class DecisionValidator:
         if not symbol:
             return (False, 'MISSING_SYMBOL', 'Missing stock symbol')
 
-        query = """
-            SELECT symbol, type FROM stocks
-            WHERE symbol = %s AND enabled = TRUE AND type IN ('stock', 'etf')
-        """
-
         try:
-            results = self.db.execute_query(query, (symbol,))
-
-            if not results:
+            if symbol not in self._get_allowed_pool():
                 return (False, 'INVALID_STOCK', f'{symbol} is not in the allowed trading pool (only enabled stocks and ETFs are tradable)')
 
             return (True, None, None)
@@ -117,48 +453,48 @@ class DecisionValidator:
             logger.error(f"Failed to validate stock pool: {e}")
             return (False, 'VALIDATION_ERROR', f'Validation failed: {e}')
     
-    def _validate_trade_quota(self, agent_id: str, decision: Dict[str, Any]) -> Tuple[bool, Optional[str], Optional[str]]:
+    def _validate_trade_quota(
+        self,
+        agent_id: str,
+        decision: Dict[str, Any],
+        context: Dict[str, Any]
+    ) -> Tuple[bool, Optional[str], Optional[str]]:
         """
         Rule 2: monthly trades < 5
 
         Args:
             agent_id: AI ID
             decision: decision dictionary
+            context: validation context (see _fetch_validation_contexts)
 
         Returns:
             (is_valid, violation_type, reason)
         """
-        query = """
-            SELECT monthly_trade_quota FROM ai_state
-            WHERE agent_id = %s
-        """
-
-        try:
-            results = self.db.execute_query(query, (agent_id,))
+        if not context['has_state']:
+            return (False, 'STATE_NOT_FOUND', f'AI state not found: {agent_id}')
 
-            if not results:
-                return (False, 'STATE_NOT_FOUND', f'AI state not found: {agent_id}')
+        quota = context['monthly_trade_quota'] or {}
+        used = quota.get('used', 0)
+        limit = quota.get('limit', 5)
 
-            quota = results[0]['monthly_trade_quota']
-            used = quota.get('used', 0)
-            limit = quota.get('limit', 5)
-
-            if used >= limit:
-                return (False, 'TRADE_QUOTA_EXCEEDED', f'Monthly trade quota reached ({used}/{limit})')
-
-            return (True, None, None)
+        if used >= limit:
+            return (False, 'TRADE_QUOTA_EXCEEDED', f'Monthly trade quota reached ({used}/{limit})')
 
-        except Exception as e:
-            logger.error(f"Failed to validate trade quota: {e}")
-            return (False, 'VALIDATION_ERROR', f'Validation failed: {e}')
+        return (True, None, None)
     
-    def _validate_wallet_balance(self, agent_id: str, decision: Dict[str, Any]) -> Tuple[bool, Optional[str], Optional[str]]:
+    def _validate_wallet_balance(
+        self,
+        agent_id: str,
+        decision: Dict[str, Any],
+        context: Dict[str, Any]
+    ) -> Tuple[bool, Optional[str], Optional[str]]:
         """
         Rule 3: check wallet balance based on position_type
         
         Args:
             agent_id: AI ID
             decision: decision dictionary
+            context: validation context (see _fetch_validation_contexts)
             
         Returns:
             (is_valid, violation_type, reason)
@@ -177,91 +513,66 @@ class DecisionValidator:
         if not position_type:
             return (False, 'MISSING_POSITION_TYPE', 'Missing account type (LONG_TERM/SHORT_TERM)')
         
-        # Query wallet
-        query = """
-            SELECT long_term_cash, short_term_cash FROM wallets
-            WHERE agent_id = %s
-        """
+        if not context['has_wallet']:
+            return (False, 'WALLET_NOT_FOUND', f'Wallet not found: {agent_id}')
         
         try:
-            results = self.db.execute_query(query, (agent_id,))
-            
-            if not results:
-                return (False, 'WALLET_NOT_FOUND', f'Wallet not found: {agent_id}')
-            
-            wallet = results[0]
-            long_term_cash = float(wallet['long_term_cash'])
-            short_term_cash = float(wallet['short_term_cash'])
-            
-            # Check balance for the corresponding account
-            if position_type == 'LONG_TERM':
-                if total_amount > long_term_cash:
-                    return (False, 'INSUFFICIENT_LONG_TERM_CASH', 
-                            f'Insufficient long-term balance: need ${total_amount:.2f}, available ${long_term_cash:.2f}')
-            
-            elif position_type == 'SHORT_TERM':
-                if total_amount > short_term_cash:
-                    return (False, 'INSUFFICIENT_SHORT_TERM_CASH', 
-                            f'Insufficient short-term balance: need ${total_amount:.2f}, available ${short_term_cash:.2f}')
-            
-            else:
-                return (False, 'INVALID_POSITION_TYPE', f'Invalid account type: {position_type}')
-            
-            return (True, None, None)
-
-        except Exception as e:
-            logger.error(f"Failed to validate wallet balance: {e}")
-            return (False, 'VALIDATION_ERROR', f'Validation failed: {e}')
+            cash_field, violation_type, label = _CASH_ACCOUNTS[position_type]
+        except KeyError:
+            return (False, 'INVALID_POSITION_TYPE', f'Invalid account type: {position_type}')
+        
+        # Check balance for the corresponding account
+        available = context[cash_field]
+        
+        if total_amount > available:
+            return (False, violation_type,
+                    f'Insufficient {label} balance: need ${total_amount:.2f}, available ${available:.2f}')
+        
+        return (True, None, None)
 
-    def _validate_wash_trade(self, agent_id: str, decision: Dict[str, Any]) -> Tuple[bool, Optional[str], Optional[str]]:
+    def _validate_wash_trade(
+        self,
+        agent_id: str,
+        decision: Dict[str, Any],
+        context: Dict[str, Any],
+        today: Optional[date] = None
+    ) -> Tuple[bool, Optional[str], Optional[str]]:
         """
         Rule 5: wash trade check (long-term account cannot sell within 30 days of the first buy)
         
         Args:
             agent_id: AI ID
             decision: decision dictionary
+            context: validation context (see _fetch_validation_contexts)
+            today: current ET date (computed if omitted)
             
         Returns:
             (is_valid, violation_type, reason)
         """
         symbol = decision.get('symbol')
         
-        # Query positions
-        query = """
-            SELECT position_type, first_buy_date FROM positions
-            WHERE agent_id = %s AND symbol = %s
-        """
+        if not context['has_position']:
+            return (False, 'POSITION_NOT_FOUND', f'Position not found: {symbol}')
         
-        try:
-            results = self.db.execute_query(query, (agent_id, symbol))
-            
-            if not results:
-                return (False, 'POSITION_NOT_FOUND', f'Position not found: {symbol}')
-            
-            position = results[0]
-            position_type = position['position_type']
-            first_buy_date = position['first_buy_date']
+        position_type = context['position_type']
+        first_buy_date = context['first_buy_date']
+        
+        # Only check long-term accounts
+        if position_type == 'LONG_TERM':
+            if not first_buy_date:
+                return (False, 'MISSING_FIRST_BUY_DATE', f'Missing first buy date: {symbol}')
             
-            # Only check long-term accounts
-            if position_type == 'LONG_TERM':
-                if not first_buy_date:
-                    return (False, 'MISSING_FIRST_BUY_DATE', f'Missing first buy date: {symbol}')
-                
-                # Calculate holding days (use ET timezone)
-                if isinstance(first_buy_date, str):
-                    first_buy_date = datetime.strptime(first_buy_date, '%Y-%m-%d').date()
+            # Calculate holding days (use ET timezone)
+            if isinstance(first_buy_date, str):
+                first_buy_date = datetime.strptime(first_buy_date, '%Y-%m-%d').date()
 
-                holding_days = (get_et_today() - first_buy_date).days
-                
-                if holding_days < 30:
-                    return (False, 'WASH_TRADE_VIOLATION', 
-                            f'Long-term holding period is under 30 days: {symbol} (held {holding_days} days)')
+            holding_days = ((today or get_et_today()) - first_buy_date).days
             
-            return (True, None, None)
+            if holding_days < 30:
+                return (False, 'WASH_TRADE_VIOLATION', 
+                        f'Long-term holding period is under 30 days: {symbol} (held {holding_days} days)')
         
-        except Exception as e:
-            logger.error(f"Failed to validate wash trade: {e}")
-            return (False, 'VALIDATION_ERROR', f'Validation failed: {e}')
+        return (True, None, None)
     
     def _log_violation(
         self,
@@ -271,7 +582,7 @@ class DecisionValidator:
         reason: str
     ):
         """
-        Log a violation to the database
+        Log a violation to the database (asynchronously; see flush)
 
         Args:
             agent_id: AI ID
@@ -289,46 +600,31 @@ class DecisionValidator:
             logger.info("TEST MODE: Skipping violation logging to database")
             return
 
-        import json
-
-        query = """
-            INSERT INTO compliance_violations (
-                agent_id,
-                violation_type,
-                attempted_action,
-                detection_method,
-                severity,
-                notes
-            ) VALUES (%s, %s, %s::jsonb, %s, %s, %s)
-        """
-
-        try:
-            self.db.execute_update(
-                query,
-                (
-                    agent_id,
-                    violation_type,
-                    json.dumps(decision),
-                    'PRE_EXECUTION_CHECK',
-                    'blocked',
-                    reason
-                )
-            )
-
-        except Exception as e:
-            logger.error(f"Failed to log violation: {e}")
+        # Queued: the writer thread inserts it, off the validation path
+        self._violation_q.put((
+            agent_id,
+            violation_type,
+            orjson.dumps(decision, default=str).decode(),
+            'PRE_EXECUTION_CHECK',
+            'blocked',
+            reason
+        ))
     
     def get_recent_violations(
         self,
         agent_id: str,
-        days: int = 7
+        days: int = 7,
+        limit: int = 1000
     ) -> List[Dict[str, Any]]:
         """
         Get recent violation records
         
+        Served by idx_violations_agent_detected (see DB_Architecture.md)
+        
         Args:
             agent_id: AI ID
             days: last N days
+            limit: maximum records returned
             
         Returns:
             List of violation records
@@ -343,12 +639,16 @@ class DecisionValidator:
                 detected_at
             FROM compliance_violations
             WHERE agent_id = %s
-              AND detected_at > NOW() - INTERVAL '%s days'
+              AND detected_at > NOW() - (%s * INTERVAL '1 day')
             ORDER BY detected_at DESC
+            LIMIT %s
         """
         
+        # Include violations still queued for the writer thread
+        self.flush()
+        
         try:
-            results = self.db.execute_query(query, (agent_id, days))
+            results = self.db.execute_query(query, (agent_id, days, limit), prepare=True)
             return results or []
         
         except Exception as e:
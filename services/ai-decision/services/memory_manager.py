@@ -3,12 +3,49 @@ Memory Manager Service
 Manage AI state, key events, wallets, and other structured memories
 """
 
-from typing import Dict, Any, Optional, List
+import copy
+import threading
+import time
+import orjson
+from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime
 from core import DatabaseManager, create_context_logger
 
 logger = create_context_logger()
 
+# load_ai_state results are reused this long (writes through this manager invalidate)
+AI_STATE_CACHE_TTL = 5.0
+
+# Columns update_ai_state may change, in _UPDATE_AI_STATE_QUERY parameter order
+_AI_STATE_FIELDS = (
+    'portfolio_summary',
+    'investment_thesis',
+    'market_view',
+    'weekly_trade_quota',
+    'monthly_trade_quota',
+    'long_term_allocation',
+    'cash_ratio',
+    'estimated_tokens',
+)
+_AI_STATE_JSONB_FIELDS = {'portfolio_summary', 'weekly_trade_quota', 'monthly_trade_quota'}
+
+# Same SQL text on every call, so the server can reuse its plan
+_UPDATE_AI_STATE_QUERY = """
+    UPDATE ai_state
+    SET portfolio_summary = COALESCE(%s::jsonb, portfolio_summary),
+        investment_thesis = COALESCE(%s, investment_thesis),
+        market_view = COALESCE(%s, market_view),
+        weekly_trade_quota = COALESCE(%s::jsonb, weekly_trade_quota),
+        monthly_trade_quota = COALESCE(%s::jsonb, monthly_trade_quota),
+        long_term_allocation = COALESCE(%s, long_term_allocation),
+        cash_ratio = COALESCE(%s, cash_ratio),
+        estimated_tokens = COALESCE(%s, estimated_tokens),
+        state_version = state_version + 1,
+        last_updated = CURRENT_TIMESTAMP
+    WHERE agent_id = %s
+      AND (%s::int IS NULL OR state_version = %s)
+"""
+
 
 class MemoryManager:
     """AI memory management service"""
@@ -21,6 +58,18 @@ class MemoryManager:
             db: database manager
         """
         self.db = db
+        self._state_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._state_cache_lock = threading.Lock()
+    
+    def invalidate(self, agent_id: str):
+        """
+        Drop the cached AI state of an agent (call after writing ai_state elsewhere)
+        
+        Args:
+            agent_id: AI ID
+        """
+        with self._state_cache_lock:
+            self._state_cache.pop(agent_id, None)
     
     def load_ai_state(self, agent_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -31,8 +80,16 @@ class MemoryManager:
             
         Returns:
             AI state dictionary; returns None if missing
+            (served from a per-instance cache for AI_STATE_CACHE_TTL seconds)
         """
-        logger.info(f"Loading AI state for {agent_id}")
+        with self._state_cache_lock:
+            entry = self._state_cache.get(agent_id)
+        
+        if entry is not None and time.monotonic() - entry[0] < AI_STATE_CACHE_TTL:
+            # Copy: callers may modify the state they receive
+            return copy.deepcopy(entry[1])
+        
+        logger.info("Loading AI state for %s", agent_id)
         
         query = """
             SELECT
@@ -59,13 +116,101 @@ class MemoryManager:
                 return self._initialize_ai_state(agent_id)
             
             state = results[0]
-            logger.info(f"Loaded AI state (version: {state['state_version']})")
+            logger.info("Loaded AI state (version: %s)", state['state_version'])
+            
+            with self._state_cache_lock:
+                self._state_cache[agent_id] = (time.monotonic(), copy.deepcopy(state))
+            
             return state
         
         except Exception as e:
             logger.error(f"Failed to load AI state: {e}")
             return None
     
+    def prefetch_agent_context(self, agent_id: str) -> Dict[str, Any]:
+        """
+        Load AI state, wallet and open positions in one query
+        
+        Rows are built as JSON by Postgres, so numbers arrive as float and
+        dates/timestamps as ISO strings (unlike load_ai_state/get_wallet).
+        A missing state is initialized as in load_ai_state.
+        
+        Args:
+            agent_id: AI ID
+            
+        Returns:
+            {'state': dict, 'wallet': dict or None, 'positions': [dict, ...]}
+            
+        Raises:
+            RuntimeError: query failed
+        """
+        logger.info("Prefetching AI state, wallet and positions for %s", agent_id)
+        
+        query = """
+            SELECT
+                (
+                    SELECT row_to_json(s) FROM (
+                        SELECT
+                            agent_id,
+                            portfolio_summary,
+                            investment_thesis,
+                            market_view,
+                            weekly_trade_quota,
+                            monthly_trade_quota,
+                            long_term_allocation,
+                            cash_ratio,
+                            state_version,
+                            estimated_tokens,
+                            last_updated
+                        FROM ai_state
+                        WHERE agent_id = %s
+                    ) s
+                ) AS state,
+                (
+                    SELECT row_to_json(w) FROM (
+                        SELECT
+                            cash_balance,
+                            long_term_cash,
+                            short_term_cash,
+                            reserved_cash,
+                            total_invested,
+                            total_withdrawn,
+                            last_transaction_at,
+                            updated_at
+                        FROM wallets
+                        WHERE agent_id = %s
+                    ) w
+                ) AS wallet,
+                (
+                    SELECT COALESCE(json_agg(p ORDER BY p.symbol), '[]'::json) FROM (
+                        SELECT
+                            symbol,
+                            quantity,
+                            average_cost,
+                            current_value,
+                            unrealized_pnl,
+                            position_type,
+                            first_buy_date,
+                            updated_at
+                        FROM positions
+                        WHERE agent_id = %s
+                          AND quantity > 0
+                    ) p
+                ) AS positions
+        """
+        
+        context = self.db.execute_query(query, (agent_id, agent_id, agent_id), fetch='one')
+        
+        if context['state'] is None:
+            logger.warning(f"AI state not found for {agent_id}, initializing...")
+            context['state'] = self._initialize_ai_state(agent_id)
+        
+        if context['wallet'] is None:
+            logger.warning(f"Wallet not found for {agent_id}")
+        
+        logger.info("Prefetched agent context (%s positions)", len(context['positions']))
+        return context
+    
     def _initialize_ai_state(self, agent_id: str) -> Dict[str, Any]:
         """
         Initialize AI state (first use)
@@ -76,7 +221,7 @@ class MemoryManager:
         Returns:
             Initialized state dictionary
         """
-        logger.info(f"Initializing AI state for {agent_id}")
+        logger.info("Initializing AI state for %s", agent_id)
         
         initial_state = {
             'agent_id': agent_id,
@@ -103,26 +248,23 @@ class MemoryManager:
                 cash_ratio,
                 state_version,
                 estimated_tokens
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ) VALUES (
+                %s,
+                '{}'::jsonb,
+                '',
+                '',
+                jsonb_build_object('used', 0, 'limit', 5, 'week', NULL),
+                jsonb_build_object('used', 0, 'limit', 5, 'month', NULL),
+                0.0,
+                100.0,
+                1,
+                0
+            )
             ON CONFLICT (agent_id) DO NOTHING
         """
 
         try:
-            self.db.execute_update(
-                query,
-                (
-                    agent_id,
-                    '{}',
-                    '',
-                    '',
-                    '{"used": 0, "limit": 5, "week": null}',
-                    '{"used": 0, "limit": 5, "month": null}',
-                    0.0,
-                    100.0,
-                    1,
-                    0
-                )
-            )
+            self.db.execute_update(query, (agent_id,))
             logger.info("AI state initialized successfully")
             return initial_state
         
@@ -142,48 +284,34 @@ class MemoryManager:
         Args:
             agent_id: AI ID
             updates: fields to update {'portfolio_summary': {...}, ...}
+                (None values leave the column unchanged)
             current_version: current version (for optimistic locking, optional)
             
         Returns:
             True if the update succeeds
         """
-        logger.info(f"Updating AI state for {agent_id}")
+        logger.info("Updating AI state for %s", agent_id)
         
-        # Build SET clause
-        set_clauses = []
+        unknown = set(updates) - set(_AI_STATE_FIELDS)
+        if unknown:
+            logger.error(f"Cannot update unknown AI state fields: {sorted(unknown)}")
+            return False
+        
+        # One fixed statement for every update: None leaves a column unchanged
         params = []
         
-        for key, value in updates.items():
-            if key in ['portfolio_summary', 'weekly_trade_quota', 'monthly_trade_quota']:
-                # JSONB fields
-                import json
-                set_clauses.append(f"{key} = %s::jsonb")
-                params.append(json.dumps(value))
-            else:
-                set_clauses.append(f"{key} = %s")
-                params.append(value)
-        
-        # Increment version
-        set_clauses.append("state_version = state_version + 1")
-        set_clauses.append("last_updated = CURRENT_TIMESTAMP")
-        
-        # WHERE condition
-        where_clause = "agent_id = %s"
-        params.append(agent_id)
-        
-        # Optimistic locking
-        if current_version is not None:
-            where_clause += " AND state_version = %s"
-            params.append(current_version)
+        for key in _AI_STATE_FIELDS:
+            value = updates.get(key)
+            if value is not None and key in _AI_STATE_JSONB_FIELDS:
+                value = orjson.dumps(value, default=str).decode()
+            params.append(value)
         
-        query = f"""
-            UPDATE ai_state
-            SET {', '.join(set_clauses)}
-            WHERE {where_clause}
-        """
+        params.extend([agent_id, current_version, current_version])
+        query = _UPDATE_AI_STATE_QUERY
         
         try:
             rowcount = self.db.execute_update(query, tuple(params))
+            self.invalidate(agent_id)
             
             if rowcount == 0:
                 if current_version is not None:
@@ -202,20 +330,25 @@ class MemoryManager:
     def get_key_events(
         self,
         agent_id: str,
-        limit: int = 20
+        limit: int = 20,
+        before: Optional[datetime] = None
     ) -> List[Dict[str, Any]]:
         """
-        Get key events (latest N entries)
+        Get key events (latest N entries, keyset-paginated)
         
         Args:
             agent_id: AI ID
             limit: number of events to return
+            before: only events created before this time; pass the last
+                created_at of the previous page to fetch the next one
             
         Returns:
             List of key events
         """
-        logger.info(f"Loading key events for {agent_id}")
+        logger.info("Loading key events for %s", agent_id)
         
+        # Served by idx_key_events_agent_created: an index seek plus `limit` rows
+        # at any page depth (no OFFSET)
         query = """
             SELECT 
                 event_type,
@@ -228,13 +361,19 @@ class MemoryManager:
                 created_at
             FROM key_events
             WHERE agent_id = %s
-            ORDER BY created_at DESC
-            LIMIT %s
         """
+        params = [agent_id]
+        
+        if before is not None:
+            query += " AND created_at < %s"
+            params.append(before)
+        
+        query += " ORDER BY created_at DESC LIMIT %s"
+        params.append(limit)
         
         try:
-            results = self.db.execute_query(query, (agent_id, limit))
-            logger.info(f"Loaded {len(results)} key events")
+            results = self.db.execute_query(query, tuple(params))
+            logger.info("Loaded %s key events", len(results))
             return results or []
         
         except Exception as e:
@@ -266,39 +405,54 @@ class MemoryManager:
         Returns:
             True if the event is appended successfully
         """
-        logger.info(f"Appending key event for {agent_id}: {event_type}")
+        logger.info("Appending key event for %s: %s", agent_id, event_type)
         
-        import json
+        keep = 20
         
+        # Insert and trim to the most recent events in one statement. All parts
+        # of the statement see the same snapshot: the new row is invisible to
+        # `ranked`, so keep - 1 existing events survive alongside it
         query = """
-            INSERT INTO key_events (
-                agent_id,
-                event_type,
-                symbol,
-                event_date,
-                description,
-                context,
-                impact,
-                estimated_tokens
-            ) VALUES (%s, %s, %s, CURRENT_DATE, %s, %s::jsonb, %s, %s)
+            WITH inserted AS (
+                INSERT INTO key_events (
+                    agent_id,
+                    event_type,
+                    symbol,
+                    event_date,
+                    description,
+                    context,
+                    impact,
+                    estimated_tokens
+                ) VALUES (%s, %s, %s, CURRENT_DATE, %s, %s::jsonb, %s, %s)
+                RETURNING id
+            ),
+            ranked AS (
+                SELECT id, row_number() OVER (ORDER BY created_at DESC) AS rn
+                FROM key_events
+                WHERE agent_id = %s
+            )
+            DELETE FROM key_events
+            WHERE id IN (SELECT id FROM ranked WHERE rn > %s)
         """
         
         try:
-            self.db.execute_update(
+            rowcount = self.db.execute_update(
                 query,
                 (
                     agent_id,
                     event_type,
                     symbol,
                     description,
-                    json.dumps(context or {}),
+                    orjson.dumps(context or {}, default=str).decode(),
                     impact,
-                    estimated_tokens
+                    estimated_tokens,
+                    agent_id,
+                    keep - 1
                 )
             )
             
-            # Keep the most recent 20 events
-            self._cleanup_old_events(agent_id, keep=20)
+            if rowcount > 0:
+                logger.info("Cleaned up %s old events", rowcount)
             
             logger.info("Key event appended successfully")
             return True
@@ -307,29 +461,106 @@ class MemoryManager:
             logger.error(f"Failed to append key event: {e}")
             return False
     
+    def append_key_events_bulk(self, events: List[Dict[str, Any]], keep: int = 20) -> bool:
+        """
+        Append many key events (any agents) and prune each agent to its latest
+        `keep` events, with one statement per page of 500 events
+        
+        Args:
+            events: dicts with agent_id, event_type, symbol, description and
+                optional context, impact, estimated_tokens (as in append_key_event)
+            keep: number of events to keep per agent
+            
+        Returns:
+            True if the events are appended successfully
+        """
+        if not events:
+            return True
+        
+        logger.info("Appending %s key events", len(events))
+        
+        # New rows are invisible to `ranked` (same snapshot): keep only
+        # keep - n existing events for an agent that receives n new ones
+        query = f"""
+            WITH inserted AS (
+                INSERT INTO key_events (
+                    agent_id,
+                    event_type,
+                    symbol,
+                    event_date,
+                    description,
+                    context,
+                    impact,
+                    estimated_tokens
+                ) VALUES %s
+                RETURNING agent_id
+            ),
+            added AS (
+                SELECT agent_id, count(*) AS n FROM inserted GROUP BY agent_id
+            ),
+            ranked AS (
+                SELECT
+                    k.id,
+                    a.n,
+                    row_number() OVER (PARTITION BY k.agent_id ORDER BY k.created_at DESC) AS rn
+                FROM key_events k
+                JOIN added a ON a.agent_id = k.agent_id
+            )
+            DELETE FROM key_events
+            WHERE id IN (SELECT id FROM ranked WHERE rn > {int(keep)} - n)
+        """
+        
+        rows = [
+            (
+                event['agent_id'],
+                event['event_type'],
+                event.get('symbol'),
+                event['description'],
+                orjson.dumps(event.get('context') or {}, default=str).decode(),
+                event.get('impact'),
+                event.get('estimated_tokens', 100)
+            )
+            for event in events
+        ]
+        
+        try:
+            self.db.execute_values(
+                query, rows, page_size=500,
+                template="(%s, %s, %s, CURRENT_DATE, %s, %s::jsonb, %s, %s)"
+            )
+            logger.info("Key events appended successfully")
+            return True
+        
+        except Exception as e:
+            logger.error(f"Failed to append key events: {e}")
+            return False
+    
     def _cleanup_old_events(self, agent_id: str, keep: int = 20):
         """
-        Clean up old events, keeping the latest N
+        Clean up old events, keeping the latest N (maintenance only:
+        append_key_event trims in the same statement as its insert)
         
         Args:
             agent_id: AI ID
             keep: number of events to keep
         """
+        # One ranked pass over the agent's events (idx_key_events_agent_created)
         query = """
             DELETE FROM key_events
-            WHERE agent_id = %s
-              AND id NOT IN (
-                  SELECT id FROM key_events
-                  WHERE agent_id = %s
-                  ORDER BY created_at DESC
-                  LIMIT %s
-              )
+            WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, row_number() OVER (ORDER BY created_at DESC) AS rn
+                    FROM key_events
+                    WHERE agent_id = %s
+                ) t
+                WHERE rn > %s
+            )
         """
         
         try:
-            rowcount = self.db.execute_update(query, (agent_id, agent_id, keep))
+            rowcount = self.db.execute_update(query, (agent_id, keep))
             if rowcount > 0:
-                logger.info(f"Cleaned up {rowcount} old events")
+                logger.info("Cleaned up %s old events", rowcount)
         
         except Exception as e:
             logger.error(f"Failed to cleanup old events: {e}")
@@ -344,7 +575,7 @@ class MemoryManager:
         Returns:
             Wallet information dictionary
         """
-        logger.info(f"Loading wallet for {agent_id}")
+        logger.info("Loading wallet for %s", agent_id)
         
         query = """
             SELECT 
@@ -368,7 +599,7 @@ class MemoryManager:
                 return None
             
             wallet = results[0]
-            logger.info(f"Loaded wallet (balance: ${wallet['cash_balance']})")
+            logger.info("Loaded wallet (balance: $%s)", wallet['cash_balance'])
             return wallet
         
         except Exception as e:
@@ -381,7 +612,7 @@ class MemoryManager:
         cash_change: float = 0.0,
         long_term_change: float = 0.0,
         short_term_change: float = 0.0
-    ) -> bool:
+    ) -> Optional[Dict[str, float]]:
         """
         Update wallet balances
         
@@ -392,9 +623,10 @@ class MemoryManager:
             short_term_change: change to the short-term account
             
         Returns:
-            True if the update succeeds
+            New {'cash_balance', 'long_term_cash', 'short_term_cash'} (no follow-up
+            get_wallet needed); None if the wallet is missing or the update fails
         """
-        logger.info(f"Updating wallet for {agent_id}")
+        logger.info("Updating wallet for %s", agent_id)
         
         query = """
             UPDATE wallets
@@ -405,24 +637,26 @@ class MemoryManager:
                 last_transaction_at = CURRENT_TIMESTAMP,
                 updated_at = CURRENT_TIMESTAMP
             WHERE agent_id = %s
+            RETURNING cash_balance, long_term_cash, short_term_cash
         """
         
         try:
-            rowcount = self.db.execute_update(
+            balances = self.db.execute_update_returning(
                 query,
-                (cash_change, long_term_change, short_term_change, agent_id)
+                (cash_change, long_term_change, short_term_change, agent_id),
+                numeric_as_float=True
             )
             
-            if rowcount == 0:
+            if balances is None:
                 logger.warning(f"Wallet not found for {agent_id}")
-                return False
+                return None
             
             logger.info("Wallet updated successfully")
-            return True
+            return balances
         
         except Exception as e:
             logger.error(f"Failed to update wallet: {e}")
-            return False
+            return None
     
     def get_weekly_trade_quota(self, agent_id: str) -> Dict[str, Any]:
         """
@@ -434,12 +668,9 @@ class MemoryManager:
         Returns:
             {'used': int, 'limit': int, 'week': str}
         """
-        state = self.load_ai_state(agent_id)
-        
-        if not state:
-            return {'used': 0, 'limit': 5, 'week': None}
-        
-        return state.get('weekly_trade_quota', {'used': 0, 'limit': 5, 'week': None})
+        return self._load_trade_quota(
+            agent_id, 'weekly_trade_quota', {'used': 0, 'limit': 5, 'week': None}
+        )
     
     def reset_weekly_trade_quota(self, agent_id: str, week: str) -> bool:
         """
@@ -452,15 +683,9 @@ class MemoryManager:
         Returns:
             True if the reset succeeds
         """
-        logger.info(f"Resetting weekly trade quota for {agent_id} (week: {week})")
+        logger.info("Resetting weekly trade quota for %s (week: %s)", agent_id, week)
 
-        new_quota = {
-            'used': 0,
-            'limit': 5,
-            'week': week
-        }
-
-        return self.update_ai_state(agent_id, {'weekly_trade_quota': new_quota})
+        return self._reset_trade_quota(agent_id, 'weekly_trade_quota', 'week', week)
 
     def get_monthly_trade_quota(self, agent_id: str) -> Dict[str, Any]:
         """
@@ -472,12 +697,31 @@ class MemoryManager:
         Returns:
             {'used': int, 'limit': int, 'month': str}
         """
-        state = self.load_ai_state(agent_id)
+        return self._load_trade_quota(
+            agent_id, 'monthly_trade_quota', {'used': 0, 'limit': 5, 'month': None}
+        )
 
-        if not state:
-            return {'used': 0, 'limit': 5, 'month': None}
+    def _load_trade_quota(self, agent_id: str, column: str, default: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Read one quota column of ai_state (instead of loading the whole state)
 
-        return state.get('monthly_trade_quota', {'used': 0, 'limit': 5, 'month': None})
+        Args:
+            agent_id: AI ID
+            column: weekly_trade_quota or monthly_trade_quota (never user input)
+            default: quota returned when the state or column is missing
+
+        Returns:
+            Quota dictionary
+        """
+        query = f"SELECT {column} FROM ai_state WHERE agent_id = %s"
+
+        try:
+            quota = self.db.execute_query(query, (agent_id,), fetch='scalar')
+            return quota if quota is not None else default
+
+        except Exception as e:
+            logger.error(f"Failed to load {column}: {e}")
+            return default
 
     def reset_monthly_trade_quota(self, agent_id: str, month: str) -> bool:
         """
@@ -490,12 +734,51 @@ class MemoryManager:
         Returns:
             True if the reset succeeds
         """
-        logger.info(f"Resetting monthly trade quota for {agent_id} (month: {month})")
+        logger.info("Resetting monthly trade quota for %s (month: %s)", agent_id, month)
 
-        new_quota = {
-            'used': 0,
-            'limit': 5,
-            'month': month
-        }
+        return self._reset_trade_quota(agent_id, 'monthly_trade_quota', 'month', month)
 
-        return self.update_ai_state(agent_id, {'monthly_trade_quota': new_quota})
+    def _reset_trade_quota(
+        self,
+        agent_id: str,
+        column: str,
+        period_key: str,
+        period: str,
+        limit: int = 5
+    ) -> bool:
+        """
+        Reset a quota column to {'used': 0, 'limit': limit, period_key: period},
+        building the JSONB server-side
+
+        Args:
+            agent_id: AI ID
+            column: weekly_trade_quota or monthly_trade_quota (never user input)
+            period_key: 'week' or 'month'
+            period: period identifier
+            limit: trade limit
+
+        Returns:
+            True if the reset succeeds
+        """
+        query = f"""
+            UPDATE ai_state
+            SET {column} = jsonb_build_object('used', 0, 'limit', %s::int, '{period_key}', %s::text),
+                state_version = state_version + 1,
+                last_updated = CURRENT_TIMESTAMP
+            WHERE agent_id = %s
+        """
+
+        try:
+            rowcount = self.db.execute_update(query, (limit, period, agent_id))
+            self.invalidate(agent_id)
+
+            if rowcount == 0:
+                logger.warning(f"AI state not found for {agent_id}")
+                return False
+
+            logger.info("AI state updated successfully")
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to reset {column}: {e}")
+            return False
@@ -3,14 +3,65 @@ Portfolio Executor Service
 Execute trades atomically and update positions, wallets, and transaction records
 """
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, date
+import io
+import logging
+import random
+import time
 import uuid
+import orjson
+from psycopg2 import errors
 from core import DatabaseManager, create_context_logger
 from utils import get_et_today
 
 logger = create_context_logger()
 
+# Trades run SERIALIZABLE; a serialization failure or deadlock is retried
+# with jittered exponential backoff starting at TRADE_RETRY_DELAY seconds
+TRADE_MAX_ATTEMPTS = 3
+TRADE_RETRY_DELAY = 0.05
+
+# update_position_values: price maps larger than this are COPYed into a temp
+# table instead of being sent as a VALUES list
+PRICE_COPY_THRESHOLD = 200
+
+# Shared tail of the BUY/SELL writable CTEs. {source} is the preceding CTE and
+# must RETURN agent_id; {position_type} is the row field (BUY) or the column of
+# the position that was sold (SELL). Inserted rows arrive as one jsonb parameter
+# expanded by jsonb_populate_record, so every value is typed by the table
+# itself, which PREPARE needs for values in a SELECT list.
+_BUMP_TRADE_QUOTA_CTE = """quota AS (
+                UPDATE ai_state
+                SET
+                    monthly_trade_quota = jsonb_set(
+                        monthly_trade_quota,
+                        '{{used}}',
+                        to_jsonb(COALESCE((monthly_trade_quota->>'used')::int, 0) + 1)
+                    ),
+                    last_updated = CURRENT_TIMESTAMP
+                WHERE agent_id IN (SELECT agent_id FROM {source})
+            )"""
+
+_INSERT_TRANSACTION_SQL = """INSERT INTO transactions (
+                agent_id,
+                symbol,
+                action,
+                quantity,
+                price,
+                total_amount,
+                reason,
+                position_type,
+                decision_id,
+                market_context
+            )
+            SELECT
+                r.agent_id, r.symbol, r.action, r.quantity, r.price,
+                r.total_amount, r.reason, {position_type}, r.decision_id,
+                r.market_context
+            FROM {source}, jsonb_populate_record(NULL::transactions, %(transaction)s::jsonb) r
+            RETURNING id"""
+
 
 class PortfolioExecutor:
     """Portfolio executor"""
@@ -47,45 +98,61 @@ class PortfolioExecutor:
         Returns:
             True if the trade succeeds
         """
-        logger.info(
-            f"Executing trade for {agent_id}",
-            extra={'details': {
-                'decision_type': decision.get('decision_type'),
-                'symbol': decision.get('symbol'),
-                'quantity': decision.get('quantity'),
-                'position_type': decision.get('position_type')
-            }}
-        )
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                f"Executing trade for {agent_id}",
+                extra={'details': {
+                    'decision_type': decision.get('decision_type'),
+                    'symbol': decision.get('symbol'),
+                    'quantity': decision.get('quantity'),
+                    'position_type': decision.get('position_type')
+                }}
+            )
         
         decision_type = decision.get('decision_type')
         
-        try:
-            with self.db.transaction() as cur:
-                if decision_type == 'BUY':
-                    success = self._execute_buy(cur, agent_id, decision)
-                elif decision_type == 'SELL':
-                    success = self._execute_sell(cur, agent_id, decision)
-                else:
-                    logger.error(f"Invalid decision type: {decision_type}")
-                    return False
-                
-                if not success:
-                    raise Exception("Trade execution failed")
-                
-                # Update trade count
-                self._update_trade_quota(cur, agent_id)
+        for attempt in range(TRADE_MAX_ATTEMPTS):
+            try:
+                with self.db.transaction(isolation='SERIALIZABLE') as cur:
+                    if decision_type == 'BUY':
+                        success = self._execute_buy(cur, agent_id, decision)
+                    elif decision_type == 'SELL':
+                        success = self._execute_sell(cur, agent_id, decision)
+                    else:
+                        logger.error(f"Invalid decision type: {decision_type}")
+                        return False
+                    
+                    if not success:
+                        raise Exception("Trade execution failed")
+                    
+                    logger.info("Trade executed successfully")
+                    return True
+            
+            except (errors.SerializationFailure, errors.DeadlockDetected) as e:
+                # A concurrent trade touched the same rows; the transaction was
+                # rolled back as a whole, so it is safe to run it again
+                if attempt < TRADE_MAX_ATTEMPTS - 1:
+                    logger.warning(
+                        "Trade conflict for %s (attempt %d/%d), retrying",
+                        agent_id, attempt + 1, TRADE_MAX_ATTEMPTS
+                    )
+                    time.sleep(TRADE_RETRY_DELAY * (2 ** attempt) * (1 + random.random()))
+                    continue
                 
-                logger.info("Trade executed successfully")
-                return True
-        
-        except Exception as e:
-            logger.error(f"Failed to execute trade: {e}")
-            return False
+                logger.error(f"Failed to execute trade after {TRADE_MAX_ATTEMPTS} attempts: {e}")
+                return False
+            
+            except Exception as e:
+                logger.error(f"Failed to execute trade: {e}")
+                return False
     
     def _execute_buy(self, cur, agent_id: str, decision: Dict[str, Any]) -> bool:
         """
         Execute a buy operation
         
+        The wallet debit, position upsert, trade quota bump and transaction
+        record run as one writable CTE, so the whole trade is a single round-trip.
+        
         Args:
             cur: database cursor
             agent_id: AI ID
@@ -94,50 +161,36 @@ class PortfolioExecutor:
         Returns:
             True if the operation succeeds
         """
-        symbol = decision['symbol']
-        quantity = decision['quantity']
-        price = decision['price']
         position_type = decision['position_type']
-        total_amount = quantity * price
-        
-        # 1. Check if a position already exists
-        cur.execute("""
-            SELECT quantity, average_cost, position_type, first_buy_date
-            FROM positions
-            WHERE agent_id = %s AND symbol = %s
-        """, (agent_id, symbol))
-        
-        existing_position = cur.fetchone()
-        
-        if existing_position:
-            # Update position (add to existing)
-            old_quantity = existing_position['quantity']
-            old_avg_cost = float(existing_position['average_cost'])
-            old_position_type = existing_position['position_type']
-            first_buy_date = existing_position['first_buy_date']
-            
-            # Ensure position_type matches
-            if old_position_type != position_type:
-                logger.error(f"Position type mismatch: {old_position_type} vs {position_type}")
-                return False
-            
-            new_quantity = old_quantity + quantity
-            new_avg_cost = (old_quantity * old_avg_cost + total_amount) / new_quantity
-            
-            cur.execute("""
-                UPDATE positions
+        params = self._trade_params(agent_id, decision, 'BUY')
+        params['position'] = orjson.dumps({
+            'symbol': decision['symbol'],
+            'quantity': decision['quantity'],
+            'average_cost': decision['price'],
+            'position_type': position_type,
+            'first_buy_date': get_et_today()
+        }).decode()
+        
+        # The debit is guarded by the balance check in the same statement, so a
+        # concurrent trade cannot spend the cash between validation and here.
+        # Each later step reads the RETURNING rows of the previous one: a failed
+        # debit or a position type mismatch leaves no transaction row behind.
+        cash_column = 'long_term_cash' if position_type == 'LONG_TERM' else 'short_term_cash'
+        
+        self.db.execute_prepared(cur, f"""
+            WITH debited AS (
+                UPDATE wallets
                 SET 
-                    quantity = %s,
-                    average_cost = %s,
+                    cash_balance = cash_balance - %(total_amount)s,
+                    {cash_column} = {cash_column} - %(total_amount)s,
+                    total_invested = total_invested + %(total_amount)s,
+                    last_transaction_at = CURRENT_TIMESTAMP,
                     updated_at = CURRENT_TIMESTAMP
-                WHERE agent_id = %s AND symbol = %s
-            """, (new_quantity, new_avg_cost, agent_id, symbol))
-        
-        else:
-            # Create new position (use ET timezone for first_buy_date)
-            first_buy_date = get_et_today()
-
-            cur.execute("""
+                WHERE agent_id = %(agent_id)s
+                  AND {cash_column} >= %(total_amount)s
+                RETURNING agent_id
+            ),
+            upserted AS (
                 INSERT INTO positions (
                     agent_id,
                     symbol,
@@ -145,36 +198,30 @@ class PortfolioExecutor:
                     average_cost,
                     position_type,
                     first_buy_date
-                ) VALUES (%s, %s, %s, %s, %s, %s)
-            """, (agent_id, symbol, quantity, price, position_type, first_buy_date))
-        
-        # 2. Update wallet (deduct cash from the corresponding account)
-        if position_type == 'LONG_TERM':
-            cur.execute("""
-                UPDATE wallets
-                SET 
-                    cash_balance = cash_balance - %s,
-                    long_term_cash = long_term_cash - %s,
-                    total_invested = total_invested + %s,
-                    last_transaction_at = CURRENT_TIMESTAMP,
-                    updated_at = CURRENT_TIMESTAMP
-                WHERE agent_id = %s
-            """, (total_amount, total_amount, total_amount, agent_id))
-        
-        else:  # SHORT_TERM
-            cur.execute("""
-                UPDATE wallets
-                SET 
-                    cash_balance = cash_balance - %s,
-                    short_term_cash = short_term_cash - %s,
-                    total_invested = total_invested + %s,
-                    last_transaction_at = CURRENT_TIMESTAMP,
+                )
+                SELECT d.agent_id, r.symbol, r.quantity, r.average_cost, r.position_type, r.first_buy_date
+                FROM debited d, jsonb_populate_record(NULL::positions, %(position)s::jsonb) r
+                ON CONFLICT (agent_id, symbol) DO UPDATE SET
+                    quantity = positions.quantity + EXCLUDED.quantity,
+                    average_cost = (positions.quantity * positions.average_cost
+                                    + EXCLUDED.quantity * EXCLUDED.average_cost)
+                                   / (positions.quantity + EXCLUDED.quantity),
                     updated_at = CURRENT_TIMESTAMP
-                WHERE agent_id = %s
-            """, (total_amount, total_amount, total_amount, agent_id))
-        
-        # 3. Record the transaction
-        self._record_transaction(cur, agent_id, decision, 'BUY', total_amount)
+                WHERE positions.position_type = EXCLUDED.position_type
+                RETURNING agent_id
+            ),
+            {_BUMP_TRADE_QUOTA_CTE.format(source='upserted')}
+            {_INSERT_TRANSACTION_SQL.format(source='upserted', position_type='r.position_type')}
+        """, params)
+        
+        if cur.fetchone() is None:
+            # Whatever the debit did is rolled back by the caller
+            logger.error(
+                "BUY %s rejected: insufficient %s for $%.2f, wallet not found, "
+                "or existing position is not %s",
+                decision['symbol'], cash_column, params['total_amount'], position_type
+            )
+            return False
         
         return True
     
@@ -182,6 +229,9 @@ class PortfolioExecutor:
         """
         Execute a sell operation
         
+        The position update (or delete when it reaches zero), wallet credit,
+        trade quota bump and transaction record run as one writable CTE.
+        
         Args:
             cur: database cursor
             agent_id: AI ID
@@ -190,151 +240,104 @@ class PortfolioExecutor:
         Returns:
             True if the operation succeeds
         """
-        symbol = decision['symbol']
-        quantity = decision['quantity']
-        price = decision['price']
-        total_amount = quantity * price
-        
-        # 1. Query current position
-        cur.execute("""
-            SELECT quantity, average_cost, position_type
-            FROM positions
-            WHERE agent_id = %s AND symbol = %s
-        """, (agent_id, symbol))
-        
-        position = cur.fetchone()
-        
-        if not position:
-            logger.error(f"Position not found: {symbol}")
-            return False
+        params = self._trade_params(agent_id, decision, 'SELL')
         
-        current_quantity = position['quantity']
-        position_type = position['position_type']
-        
-        if quantity > current_quantity:
-            logger.error(f"Insufficient quantity: trying to sell {quantity}, have {current_quantity}")
-            return False
-        
-        # 2. Update position
-        new_quantity = current_quantity - quantity
-        
-        if new_quantity > 0:
-            # Partial sell
-            cur.execute("""
+        # Exactly one of reduced/closed matches when the position covers the
+        # quantity; neither does when it is missing or too small. The credit
+        # goes to the account of the position type being sold.
+        self.db.execute_prepared(cur, f"""
+            WITH reduced AS (
                 UPDATE positions
                 SET 
-                    quantity = %s,
+                    quantity = quantity - %(quantity)s,
                     updated_at = CURRENT_TIMESTAMP
-                WHERE agent_id = %s AND symbol = %s
-            """, (new_quantity, agent_id, symbol))
-        
-        else:
-            # Sell all shares and delete the position
-            cur.execute("""
+                WHERE agent_id = %(agent_id)s AND symbol = %(symbol)s
+                  AND quantity > %(quantity)s
+                RETURNING position_type
+            ),
+            closed AS (
                 DELETE FROM positions
-                WHERE agent_id = %s AND symbol = %s
-            """, (agent_id, symbol))
-        
-        # 3. Update wallet (add cash to the corresponding account)
-        if position_type == 'LONG_TERM':
-            cur.execute("""
-                UPDATE wallets
-                SET 
-                    cash_balance = cash_balance + %s,
-                    long_term_cash = long_term_cash + %s,
-                    total_withdrawn = total_withdrawn + %s,
-                    last_transaction_at = CURRENT_TIMESTAMP,
-                    updated_at = CURRENT_TIMESTAMP
-                WHERE agent_id = %s
-            """, (total_amount, total_amount, total_amount, agent_id))
-        
-        else:  # SHORT_TERM
-            cur.execute("""
+                WHERE agent_id = %(agent_id)s AND symbol = %(symbol)s
+                  AND quantity = %(quantity)s
+                RETURNING position_type
+            ),
+            sold AS (
+                SELECT position_type FROM reduced
+                UNION ALL
+                SELECT position_type FROM closed
+            ),
+            credited AS (
                 UPDATE wallets
                 SET 
-                    cash_balance = cash_balance + %s,
-                    short_term_cash = short_term_cash + %s,
-                    total_withdrawn = total_withdrawn + %s,
+                    cash_balance = cash_balance + %(total_amount)s,
+                    long_term_cash = long_term_cash + CASE
+                        WHEN sold.position_type = 'LONG_TERM' THEN %(total_amount)s ELSE 0 END,
+                    short_term_cash = short_term_cash + CASE
+                        WHEN sold.position_type = 'LONG_TERM' THEN 0 ELSE %(total_amount)s END,
+                    total_withdrawn = total_withdrawn + %(total_amount)s,
                     last_transaction_at = CURRENT_TIMESTAMP,
                     updated_at = CURRENT_TIMESTAMP
-                WHERE agent_id = %s
-            """, (total_amount, total_amount, total_amount, agent_id))
-        
-        # 4. Record the transaction
-        decision_with_type = {**decision, 'position_type': position_type}
-        self._record_transaction(cur, agent_id, decision_with_type, 'SELL', total_amount)
+                FROM sold
+                WHERE wallets.agent_id = %(agent_id)s
+                RETURNING wallets.agent_id, sold.position_type
+            ),
+            {_BUMP_TRADE_QUOTA_CTE.format(source='credited')}
+            {_INSERT_TRANSACTION_SQL.format(source='credited', position_type='credited.position_type')}
+        """, params)
+        
+        if cur.fetchone() is None:
+            logger.error(
+                "SELL %s rejected: position not found or holds fewer than %s shares",
+                decision['symbol'], decision['quantity']
+            )
+            return False
         
         return True
     
-    def _record_transaction(
+    def _trade_params(
         self,
-        cur,
         agent_id: str,
         decision: Dict[str, Any],
-        action: str,
-        total_amount: float
-    ):
+        action: str
+    ) -> Dict[str, Any]:
         """
-        Record a transaction to the transactions table
+        Build the named parameters shared by the BUY and SELL statements
         
         Args:
-            cur: database cursor
             agent_id: AI ID
             decision: decision dictionary
             action: BUY/SELL
-            total_amount: total transaction amount
+            
+        Returns:
+            Parameter dictionary for DatabaseManager.execute_prepared; 'transaction'
+            is the transactions row as JSON
         """
-        import json
-        
         decision_id = decision.get('decision_id')
         if not decision_id:
             decision_id = str(uuid.uuid4())
         
-        cur.execute("""
-            INSERT INTO transactions (
-                agent_id,
-                symbol,
-                action,
-                quantity,
-                price,
-                total_amount,
-                reason,
-                position_type,
-                decision_id,
-                market_context
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s::jsonb)
-        """, (
-            agent_id,
-            decision['symbol'],
-            action,
-            decision['quantity'],
-            decision['price'],
-            total_amount,
-            decision.get('reasoning', ''),
-            decision.get('position_type'),
-            decision_id,
-            json.dumps(decision.get('market_context', {}))
-        ))
-    
-    def _update_trade_quota(self, cur, agent_id: str):
-        """
-        Update monthly trade count
-
-        Args:
-            cur: database cursor
-            agent_id: AI ID
-        """
-        cur.execute("""
-            UPDATE ai_state
-            SET
-                monthly_trade_quota = jsonb_set(
-                    monthly_trade_quota,
-                    '{used}',
-                    (COALESCE((monthly_trade_quota->>'used')::int, 0) + 1)::text::jsonb
-                ),
-                last_updated = CURRENT_TIMESTAMP
-            WHERE agent_id = %s
-        """, (agent_id,))
+        total_amount = decision['quantity'] * decision['price']
+        
+        transaction = {
+            'agent_id': agent_id,
+            'symbol': decision['symbol'],
+            'action': action,
+            'quantity': decision['quantity'],
+            'price': decision['price'],
+            'total_amount': total_amount,
+            'reason': decision.get('reasoning', ''),
+            'position_type': decision.get('position_type'),
+            'decision_id': decision_id,
+            'market_context': decision.get('market_context', {})
+        }
+        
+        return {
+            'agent_id': agent_id,
+            'symbol': decision['symbol'],
+            'quantity': decision['quantity'],
+            'total_amount': total_amount,
+            'transaction': orjson.dumps(transaction, default=str).decode()
+        }
     
     def update_position_values(
         self,
@@ -353,47 +356,29 @@ class PortfolioExecutor:
         """
         logger.info(f"Updating position values for {agent_id}")
         
+        # Symbols without a price (or not held) simply find no join partner,
+        # so the held positions are priced in one statement per page
+        rows = [
+            (agent_id, symbol, price)
+            for symbol, price in current_prices.items()
+            if price is not None
+        ]
+        
         query = """
-            SELECT symbol, quantity, average_cost FROM positions
-            WHERE agent_id = %s
+            UPDATE positions p
+            SET 
+                current_value = p.quantity * v.price,
+                unrealized_pnl = p.quantity * (v.price - p.average_cost),
+                updated_at = CURRENT_TIMESTAMP
+            FROM (VALUES %s) AS v(agent_id, symbol, price)
+            WHERE p.agent_id = v.agent_id AND p.symbol = v.symbol
         """
         
         try:
-            positions = self.db.execute_query(query, (agent_id,))
-            
-            if not positions:
-                return True
-            
-            for position in positions:
-                symbol = position['symbol']
-                quantity = position['quantity']
-                average_cost = float(position['average_cost'])
-                
-                # Get the current price
-                current_price = current_prices.get(symbol)
-                
-                if current_price is None:
-                    logger.warning(f"Price not found for {symbol}, skipping")
-                    continue
-                
-                # Calculate market value and PnL
-                current_value = quantity * current_price
-                unrealized_pnl = current_value - (quantity * average_cost)
-                
-                # Update the position record
-                update_query = """
-                    UPDATE positions
-                    SET 
-                        current_value = %s,
-                        unrealized_pnl = %s,
-                        updated_at = CURRENT_TIMESTAMP
-                    WHERE agent_id = %s AND symbol = %s
-                """
-                
-                self.db.execute_update(
-                    update_query,
-                    (current_value, unrealized_pnl, agent_id, symbol)
-                )
+            if len(rows) > PRICE_COPY_THRESHOLD:
+                self._update_position_values_copy(agent_id, rows)
+            else:
+                self.db.execute_values(query, rows, template='(%s, %s, %s::numeric)')
             
             logger.info("Position values updated successfully")
             return True
@@ -401,3 +386,33 @@ class PortfolioExecutor:
         except Exception as e:
             logger.error(f"Failed to update position values: {e}")
             return False
+    
+    def _update_position_values_copy(self, agent_id: str, rows: List[Tuple[str, str, float]]):
+        """
+        Price positions from a large price map: COPY it into a temp table,
+        then join once
+        
+        Args:
+            agent_id: AI ID
+            rows: (agent_id, symbol, price) tuples
+        """
+        buf = io.StringIO(''.join(f"{symbol}\t{price}\n" for _, symbol, price in rows))
+        
+        with self.db.transaction() as cur:
+            # Dropped at commit (and with the transaction on rollback)
+            cur.execute("""
+                CREATE TEMP TABLE _position_prices (
+                    symbol TEXT PRIMARY KEY,
+                    price NUMERIC
+                ) ON COMMIT DROP
+            """)
+            cur.copy_expert("COPY _position_prices (symbol, price) FROM STDIN", buf)
+            cur.execute("""
+                UPDATE positions p
+                SET 
+                    current_value = p.quantity * v.price,
+                    unrealized_pnl = p.quantity * (v.price - p.average_cost),
+                    updated_at = CURRENT_TIMESTAMP
+                FROM _position_prices v
+                WHERE p.agent_id = %s AND p.symbol = v.symbol
+            """, (agent_id,))
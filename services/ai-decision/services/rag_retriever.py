@@ -3,11 +3,35 @@ RAG Retriever Service
 Retrieve similar historical decisions using OpenSearch k-NN
 """
 
-from typing import List, Dict, Any, Optional
+from collections import OrderedDict
+from itertools import chain
+from typing import List, Dict, Any, Optional, Tuple
+import hashlib
+import heapq
+import logging
+import threading
 from core import BedrockClient, OpenSearchClient, create_context_logger
 
 logger = create_context_logger()
 
+# Query embeddings kept per retriever (LRU). Free-form queries repeat within a
+# decision (all-agents + self search); templated stock queries depend only on
+# (kind, symbol, days) and get their own cache so one-off texts cannot evict them
+EMBEDDING_CACHE_MAX = 2048
+TEMPLATE_EMBEDDING_CACHE_MAX = 8192
+
+# Templated stock queries (agent_id only goes into the filter)
+STOCK_MEMORIES_QUERY = """
+Retrieve my previous analysis and decisions about {symbol}.
+I want to understand:
+- My past investment thesis on this company
+- Previous trading decisions and their outcomes
+- Key events and news I analyzed before
+- My sentiment evolution over time
+"""
+DAILY_SUMMARIES_QUERY = "Retrieve my daily stock summaries for {symbol} over the past {days} days."
+WEEKLY_SUMMARY_QUERY = "Retrieve my latest weekly stock summary for {symbol}."
+
 
 class RAGRetriever:
     """RAG retrieval service"""
@@ -22,6 +46,81 @@ class RAGRetriever:
         """
         self.opensearch = opensearch_client
         self.bedrock = bedrock_client
+        
+        # blake2b(query text) -> embedding; (kind, symbol, days) -> embedding
+        self._embedding_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._template_embedding_cache: "OrderedDict[Tuple, List[float]]" = OrderedDict()
+        self._embedding_lock = threading.Lock()
+    
+    def _embed(self, text: str, template_key: Optional[Tuple] = None) -> List[float]:
+        """
+        Generate a query embedding, reusing a cached one for identical text
+        
+        Args:
+            text: query text
+            template_key: (kind, symbol, days) for templated queries; cached
+                separately from free-form text
+            
+        Returns:
+            Embedding vector
+            
+        Raises:
+            RuntimeError: embedding generation failed
+        """
+        if template_key is not None:
+            cache, key, limit = self._template_embedding_cache, template_key, TEMPLATE_EMBEDDING_CACHE_MAX
+        else:
+            cache, limit = self._embedding_cache, EMBEDDING_CACHE_MAX
+            key = hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+        
+        with self._embedding_lock:
+            vector = cache.get(key)
+            if vector is not None:
+                cache.move_to_end(key)
+                return vector
+        
+        vector = self.bedrock.generate_embedding(text)
+        
+        with self._embedding_lock:
+            cache[key] = vector
+            cache.move_to_end(key)
+            if len(cache) > limit:
+                cache.popitem(last=False)
+        
+        return vector
+    
+    def _knn(
+        self,
+        query_vector: List[float],
+        filter_conditions: Optional[Dict[str, Any]],
+        num_results: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Run a k-NN search for an already computed query vector
+        
+        Args:
+            query_vector: query embedding
+            filter_conditions: OpenSearch filter (None for no filter)
+            num_results: number of results to return
+            
+        Returns:
+            Similar decisions [{'content': str, 'score': float, 'metadata': dict}, ...]
+        """
+        results = self.opensearch.knn_search(
+            query_vector=query_vector,
+            filter_conditions=filter_conditions,
+            num_results=num_results
+        )
+        
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                f"Retrieved {len(results)} similar decisions",
+                extra={'details': {
+                    'avg_score': sum(r['score'] for r in results) / len(results) if results else 0
+                }}
+            )
+        
+        return results
     
     def retrieve_similar_decisions(
         self,
@@ -45,10 +144,11 @@ class RAGRetriever:
         Returns:
             Similar decisions [{'content': str, 'score': float, 'metadata': dict}, ...]
         """
-        logger.info(
-            f"Retrieving similar decisions for {context.get('agent_id')}",
-            extra={'details': {'num_results': num_results, 'filter_by_agent': filter_by_agent}}
-        )
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                f"Retrieving similar decisions for {context.get('agent_id')}",
+                extra={'details': {'num_results': num_results, 'filter_by_agent': filter_by_agent}}
+            )
         
         # Build query text
         query_text = self._build_query_text(context)
@@ -56,7 +156,7 @@ class RAGRetriever:
         # Retrieve
         try:
             # Generate query embedding
-            query_vector = self.bedrock.generate_embedding(query_text)
+            query_vector = self._embed(query_text)
 
             # Build filter
             filter_conditions = None
@@ -64,20 +164,7 @@ class RAGRetriever:
                 filter_conditions = {'term': {'agent_id': context.get('agent_id')}}
 
             # k-NN search
-            results = self.opensearch.knn_search(
-                query_vector=query_vector,
-                filter_conditions=filter_conditions,
-                num_results=num_results
-            )
-
-            logger.info(
-                f"Retrieved {len(results)} similar decisions",
-                extra={'details': {
-                    'avg_score': sum(r['score'] for r in results) / len(results) if results else 0
-                }}
-            )
-
-            return results
+            return self._knn(query_vector, filter_conditions, num_results)
 
         except Exception as e:
             logger.error(f"Failed to retrieve similar decisions: {e}")
@@ -93,49 +180,46 @@ class RAGRetriever:
         Returns:
             Query text
         """
-        parts = []
+        # One string per section, each ending in a newline so that joining
+        # with "\n" leaves a blank line between sections
+        parts: List[str] = []
         
         # Market environment
         market_env = context.get('market_environment', {})
         if market_env:
-            parts.append("current market environment:")
-            parts.append(f"- S&P 500 trend: {market_env.get('sp500_trend', 'UNKNOWN')}")
-            parts.append(f"- VIX level: {market_env.get('vix_level', 'UNKNOWN')}")
-            
-            if 'sector_rotation' in market_env:
-                parts.append(f"- sector rotation: {market_env['sector_rotation']}")
-            
-            parts.append("")
+            rotation = (
+                f"- sector rotation: {market_env['sector_rotation']}\n"
+                if 'sector_rotation' in market_env else ""
+            )
+            parts.append(
+                "current market environment:\n"
+                f"- S&P 500 trend: {market_env.get('sp500_trend', 'UNKNOWN')}\n"
+                f"- VIX level: {market_env.get('vix_level', 'UNKNOWN')}\n"
+                f"{rotation}"
+            )
         
         # Current positions
         portfolio = context.get('portfolio', [])
         if portfolio:
-            parts.append("my current portfolio:")
-            for position in portfolio:
-                symbol = position.get('symbol')
-                quantity = position.get('quantity')
-                position_type = position.get('position_type', 'UNKNOWN')
-                parts.append(f"- {symbol}: {quantity} shares ({position_type})")
-            parts.append("")
+            parts.append("my current portfolio:\n" + "".join(
+                f"- {p.get('symbol')}: {p.get('quantity')} shares ({p.get('position_type', 'UNKNOWN')})\n"
+                for p in portfolio
+            ))
         
         # Stock under consideration
         considering = context.get('considering_symbol')
         if considering:
-            parts.append(f"I am considering trading stock {considering}")
-            parts.append("")
+            parts.append(f"I am considering trading stock {considering}\n")
         
         # Recent news summary
         recent_news = context.get('recent_news')
         if recent_news:
-            parts.append("recent relevant news summary:")
-            parts.append(recent_news)
-            parts.append("")
+            parts.append(f"recent relevant news summary:\n{recent_news}\n")
         
         # Current task
         task = context.get('task')
         if task:
-            parts.append(f"current task: {task}")
-            parts.append("")
+            parts.append(f"current task: {task}\n")
         
         return "\n".join(parts)
     
@@ -202,34 +286,40 @@ class RAGRetriever:
             'task': f"decision to trade or not {symbol}"
         }
         
-        # Retrieve historical decisions from all AIs (learn from others)
-        all_results = self.retrieve_similar_decisions(
-            context=context,
-            num_results=num_results,
-            filter_by_agent=False
-        )
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                f"Retrieving similar decisions for {agent_id}",
+                extra={'details': {'num_results': num_results, 'symbol': symbol}}
+            )
         
-        # Retrieve this AI's own history (self-reflection)
-        self_results = self.retrieve_similar_decisions(
-            context=context,
-            num_results=5,
-            filter_by_agent=True
-        )
+        # Both searches share one query embedding
+        try:
+            query_vector = self._embed(self._build_query_text(context))
+        except Exception as e:
+            logger.error(f"Failed to retrieve similar decisions: {e}")
+            return []
         
-        # Merge results (deduplicate)
-        combined = []
-        seen_ids = set()
+        # Historical decisions from all AIs (learn from others)
+        all_results = self._knn(query_vector, None, num_results)
         
-        for result in all_results + self_results:
-            decision_id = result.get('metadata', {}).get('decision_id')
-            if decision_id and decision_id not in seen_ids:
-                combined.append(result)
-                seen_ids.add(decision_id)
+        # This AI's own history (self-reflection). Own decisions missing from a
+        # full all-agents page score below every result on it, so they could
+        # never make the merged top num_results: the filtered search can only
+        # contribute when the index returned fewer hits than requested.
+        self_results = []
+        if len(all_results) < num_results:
+            self_results = self._knn(query_vector, {'term': {'agent_id': agent_id}}, 5)
         
-        # Sort by similarity
-        combined.sort(key=lambda x: x['score'], reverse=True)
-
-        return combined[:num_results]
+        # Merge results (deduplicate by decision_id, first occurrence wins)
+        by_id: Dict[str, Dict[str, Any]] = {}
+        
+        for result in chain(all_results, self_results):
+            decision_id = (result.get('metadata') or {}).get('decision_id')
+            if decision_id and decision_id not in by_id:
+                by_id[decision_id] = result
+        
+        # Top results by similarity (same order as a stable descending sort)
+        return heapq.nlargest(num_results, by_id.values(), key=lambda x: x['score'])
 
     def format_results_for_prompt(
         self,
@@ -288,34 +378,17 @@ class RAGRetriever:
         Returns:
             Historical memories [{'content': str, 'score': float, 'metadata': dict}, ...]
         """
-        logger.info(
-            f"Retrieving stock memories for {agent_id} - {symbol}",
-            extra={'details': {'symbol': symbol, 'num_results': num_results}}
-        )
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                f"Retrieving stock memories for {agent_id} - {symbol}",
+                extra={'details': {'symbol': symbol, 'num_results': num_results}}
+            )
 
-        # Build query text: historical analysis and decisions for the specific stock
-        query_text = f"""
-Retrieve my previous analysis and decisions about {symbol}.
-I want to understand:
-- My past investment thesis on this company
-- Previous trading decisions and their outcomes
-- Key events and news I analyzed before
-- My sentiment evolution over time
-"""
+        query_text, filter_conditions, template_key = self._stock_memories_query(agent_id, symbol)
 
         try:
             # Generate query embedding
-            query_vector = self.bedrock.generate_embedding(query_text)
-
-            # Build filter: agent_id + symbol
-            filter_conditions = {
-                'bool': {
-                    'must': [
-                        {'term': {'agent_id': agent_id}},
-                        {'term': {'symbol': symbol}}
-                    ]
-                }
-            }
+            query_vector = self._embed(query_text, template_key)
 
             # k-NN search
             results = self.opensearch.knn_search(
@@ -324,12 +397,13 @@ I want to understand:
                 num_results=num_results
             )
 
-            logger.info(
-                f"Retrieved {len(results)} stock memories for {symbol}",
-                extra={'details': {
-                    'avg_score': sum(r['score'] for r in results) / len(results) if results else 0
-                }}
-            )
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    f"Retrieved {len(results)} stock memories for {symbol}",
+                    extra={'details': {
+                        'avg_score': sum(r['score'] for r in results) / len(results) if results else 0
+                    }}
+                )
 
             return results
 
@@ -356,27 +430,17 @@ I want to understand:
         Returns:
             List of summaries with metadata
         """
-        logger.info(
-            f"Retrieving recent STOCK_DAILY_SUMMARY memories for {symbol}",
-            extra={'details': {'symbol': symbol, 'days': days, 'num_results': num_results}}
-        )
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                f"Retrieving recent STOCK_DAILY_SUMMARY memories for {symbol}",
+                extra={'details': {'symbol': symbol, 'days': days, 'num_results': num_results}}
+            )
 
-        query_text = f"Retrieve my daily stock summaries for {symbol} over the past {days} days."
+        query_text, filter_conditions, template_key = self._daily_summaries_query(agent_id, symbol, days)
 
         try:
             # Generate query embedding
-            query_vector = self.bedrock.generate_embedding(query_text)
-
-            # Build filter: agent + symbol + type
-            filter_conditions = {
-                'bool': {
-                    'must': [
-                        {'term': {'agent_id': agent_id}},
-                        {'term': {'symbol': symbol}},
-                        {'term': {'metadata.type': 'stock_daily_summary'}}
-                    ]
-                }
-            }
+            query_vector = self._embed(query_text, template_key)
 
             # k-NN search
             results = self.opensearch.knn_search(
@@ -385,12 +449,13 @@ I want to understand:
                 num_results=num_results
             )
 
-            logger.info(
-                f"Retrieved {len(results)} recent daily summaries for {symbol}",
-                extra={'details': {
-                    'avg_score': sum(r['score'] for r in results) / len(results) if results else 0
-                }}
-            )
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    f"Retrieved {len(results)} recent daily summaries for {symbol}",
+                    extra={'details': {
+                        'avg_score': sum(r['score'] for r in results) / len(results) if results else 0
+                    }}
+                )
 
             return results
 
@@ -407,27 +472,17 @@ I want to understand:
         """
         Retrieve the latest STOCK_WEEKLY_SUMMARY entry for a symbol from RAG
         """
-        logger.info(
-            f"Retrieving latest STOCK_WEEKLY_SUMMARY for {symbol}",
-            extra={'details': {'symbol': symbol, 'num_results': num_results}}
-        )
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                f"Retrieving latest STOCK_WEEKLY_SUMMARY for {symbol}",
+                extra={'details': {'symbol': symbol, 'num_results': num_results}}
+            )
 
-        query_text = f"Retrieve my latest weekly stock summary for {symbol}."
+        query_text, filter_conditions, template_key = self._weekly_summary_query(agent_id, symbol)
 
         try:
             # Generate query embedding
-            query_vector = self.bedrock.generate_embedding(query_text)
-
-            # Build filter: agent + symbol + type
-            filter_conditions = {
-                'bool': {
-                    'must': [
-                        {'term': {'agent_id': agent_id}},
-                        {'term': {'symbol': symbol}},
-                        {'term': {'metadata.type': 'stock_weekly_summary'}}
-                    ]
-                }
-            }
+            query_vector = self._embed(query_text, template_key)
 
             # k-NN search
             results = self.opensearch.knn_search(
@@ -436,12 +491,13 @@ I want to understand:
                 num_results=num_results
             )
 
-            logger.info(
-                f"Retrieved {len(results)} weekly summaries for {symbol}",
-                extra={'details': {
-                    'avg_score': sum(r['score'] for r in results) / len(results) if results else 0
-                }}
-            )
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    f"Retrieved {len(results)} weekly summaries for {symbol}",
+                    extra={'details': {
+                        'avg_score': sum(r['score'] for r in results) / len(results) if results else 0
+                    }}
+                )
 
             return results
 
@@ -449,6 +505,137 @@ I want to understand:
             logger.error(f"Failed to retrieve weekly summaries: {e}")
             return []
 
+    def retrieve_stock_bundle(
+        self,
+        agent_id: str,
+        symbol: str,
+        num_memories: int = 3,
+        days: int = 5,
+        num_daily: int = 5,
+        num_weekly: int = 1
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Retrieve stock memories, recent daily summaries and the latest weekly
+        summary for a symbol in one OpenSearch request (_msearch)
+
+        Args:
+            agent_id: AI ID
+            symbol: stock symbol
+            num_memories: memories to return (0 skips the query)
+            days: daily summary lookback window in days
+            num_daily: daily summaries to return (0 skips the query)
+            num_weekly: weekly summaries to return (0 skips the query)
+
+        Returns:
+            {'memories': [...], 'daily_summaries': [...], 'weekly_summaries': [...]},
+            each in the same format as the single retrieve_* methods
+        """
+        specs = []
+        if num_memories > 0:
+            specs.append(('memories', self._stock_memories_query(agent_id, symbol), num_memories))
+        if num_daily > 0:
+            specs.append(('daily_summaries', self._daily_summaries_query(agent_id, symbol, days), num_daily))
+        if num_weekly > 0:
+            specs.append(('weekly_summaries', self._weekly_summary_query(agent_id, symbol), num_weekly))
+
+        bundle = {'memories': [], 'daily_summaries': [], 'weekly_summaries': []}
+
+        try:
+            queries = [
+                {
+                    'query_vector': self._embed(query_text, template_key),
+                    'filter_conditions': filter_conditions,
+                    'num_results': num_results
+                }
+                for _, (query_text, filter_conditions, template_key), num_results in specs
+            ]
+        except Exception as e:
+            logger.error(f"Failed to retrieve stock bundle for {symbol}: {e}")
+            return bundle
+
+        for (key, _, _), results in zip(specs, self.opensearch.knn_multi_search(queries)):
+            bundle[key] = results
+
+        return bundle
+
+    def _stock_memories_query(self, agent_id: str, symbol: str) -> Tuple[str, Dict[str, Any], Tuple]:
+        """
+        Query text and filter for this agent's historical analysis of a stock
+
+        Args:
+            agent_id: AI ID
+            symbol: stock symbol
+
+        Returns:
+            (query text, filter conditions, embedding cache key)
+        """
+        query_text = STOCK_MEMORIES_QUERY.format(symbol=symbol)
+
+        # Filter: agent_id + symbol
+        filter_conditions = {
+            'bool': {
+                'must': [
+                    {'term': {'agent_id': agent_id}},
+                    {'term': {'symbol': symbol}}
+                ]
+            }
+        }
+
+        return query_text, filter_conditions, ('stock_memories', symbol, None)
+
+    def _daily_summaries_query(self, agent_id: str, symbol: str, days: int) -> Tuple[str, Dict[str, Any], Tuple]:
+        """
+        Query text and filter for recent STOCK_DAILY_SUMMARY entries
+
+        Args:
+            agent_id: AI ID
+            symbol: stock symbol
+            days: lookback window in days
+
+        Returns:
+            (query text, filter conditions, embedding cache key)
+        """
+        query_text = DAILY_SUMMARIES_QUERY.format(symbol=symbol, days=days)
+
+        # Filter: agent + symbol + type
+        filter_conditions = {
+            'bool': {
+                'must': [
+                    {'term': {'agent_id': agent_id}},
+                    {'term': {'symbol': symbol}},
+                    {'term': {'metadata.type': 'stock_daily_summary'}}
+                ]
+            }
+        }
+
+        return query_text, filter_conditions, ('daily_summaries', symbol, days)
+
+    def _weekly_summary_query(self, agent_id: str, symbol: str) -> Tuple[str, Dict[str, Any], Tuple]:
+        """
+        Query text and filter for the latest STOCK_WEEKLY_SUMMARY entry
+
+        Args:
+            agent_id: AI ID
+            symbol: stock symbol
+
+        Returns:
+            (query text, filter conditions, embedding cache key)
+        """
+        query_text = WEEKLY_SUMMARY_QUERY.format(symbol=symbol)
+
+        # Filter: agent + symbol + type
+        filter_conditions = {
+            'bool': {
+                'must': [
+                    {'term': {'agent_id': agent_id}},
+                    {'term': {'symbol': symbol}},
+                    {'term': {'metadata.type': 'stock_weekly_summary'}}
+                ]
+            }
+        }
+
+        return query_text, filter_conditions, ('weekly_summary', symbol, None)
+
     def format_stock_memories_for_prompt(
         self,
         results: List[Dict[str, Any]],
@@ -0,0 +1,65 @@
+"""
+OpenSearch routing tests
+Decisions are routed by agent_id so an agent's documents share one shard
+"""
+
+import pytest
+
+from core import opensearch_client
+from core.opensearch_client import OpenSearchClient
+
+
+@pytest.fixture
+def client(mocker):
+    """OpenSearchClient with a stubbed low-level client (no AWS / network)"""
+    os_client = OpenSearchClient.__new__(OpenSearchClient)
+    os_client.index_name = 'ai-investment-decisions'
+    os_client.client = mocker.Mock()
+    return os_client
+
+
+def _decision(decision_id: str, agent_id: str) -> dict:
+    return {
+        'decision_id': decision_id,
+        'agent_id': agent_id,
+        'decision_embedding': [0.0] * 4,
+        'reasoning': 'test',
+        'decision_type': 'BUY',
+        'symbol': 'AAPL'
+    }
+
+
+def test_index_decision_routes_by_agent_id(client):
+    client.client.index.return_value = {'_id': 'doc-1'}
+
+    client.index_decision(**_decision('d-1', 'agent-a'))
+
+    assert client.client.index.call_args.kwargs['routing'] == 'agent-a'
+
+
+def test_bulk_index_sets_routing_on_every_action(client, mocker):
+    bulk = mocker.patch.object(opensearch_client.helpers, 'bulk', return_value=(3, []))
+
+    client.bulk_index_decisions([
+        _decision('d-1', 'agent-a'),
+        _decision('d-2', 'agent-b'),
+        _decision('d-3', 'agent-a')
+    ])
+
+    actions = bulk.call_args.args[1]
+    assert [a['_routing'] for a in actions] == ['agent-a', 'agent-b', 'agent-a']
+    assert all(a['_routing'] == a['_source']['agent_id'] for a in actions)
+
+
+@pytest.mark.parametrize('routing', ['agent-a', None])
+def test_update_quality_weight_forwards_hit_routing(client, routing):
+    hit = {'_id': 'doc-1'}
+    if routing is not None:
+        hit['_routing'] = routing
+    client.client.search.return_value = {'hits': {'hits': [hit]}}
+
+    client.update_quality_weight('d-1', 0.8)
+
+    kwargs = client.client.update.call_args.kwargs
+    assert kwargs['id'] == 'doc-1'
+    assert kwargs['routing'] == routing
@@ -0,0 +1,100 @@
+"""
+Prepared statement tests
+%s / %(name)s placeholders are rewritten to PREPARE's $1..$n
+"""
+
+import pytest
+
+from core.database import DatabaseManager, _statement_name
+
+
+class FakeConnection:
+    def __init__(self):
+        self.prepared = set()
+
+
+class FakeCursor:
+    """Records executed statements instead of talking to Postgres"""
+
+    def __init__(self):
+        self.connection = FakeConnection()
+        self.executed = []
+
+    def execute(self, query, params=None):
+        self.executed.append((query, params))
+
+
+@pytest.fixture
+def db():
+    return DatabaseManager.__new__(DatabaseManager)
+
+
+@pytest.fixture
+def cur():
+    return FakeCursor()
+
+
+def test_positional_placeholders(db, cur):
+    query = "SELECT * FROM positions WHERE agent_id = %s AND symbol = %s"
+    name = _statement_name(query)
+
+    db.execute_prepared(cur, query, ('agent-a', 'AAPL'))
+
+    assert cur.executed == [
+        (f"PREPARE {name} AS SELECT * FROM positions WHERE agent_id = $1 AND symbol = $2", None),
+        (f"EXECUTE {name} (%s, %s)", ('agent-a', 'AAPL'))
+    ]
+
+
+def test_named_placeholders(db, cur):
+    query = "UPDATE wallets SET cash = cash - %(amount)s WHERE agent_id = %(agent_id)s"
+    name = _statement_name(query)
+
+    db.execute_prepared(cur, query, {'agent_id': 'agent-a', 'amount': 100})
+
+    assert cur.executed == [
+        (f"PREPARE {name} AS UPDATE wallets SET cash = cash - $1 WHERE agent_id = $2", None),
+        (f"EXECUTE {name} (%s, %s)", (100, 'agent-a'))
+    ]
+
+
+def test_repeated_named_placeholder_shares_one_parameter(db, cur):
+    query = (
+        "SELECT %(agent_id)s::text AS a FROM wallets "
+        "WHERE agent_id = %(agent_id)s AND cash > %(min)s"
+    )
+    name = _statement_name(query)
+
+    db.execute_prepared(cur, query, {'min': 0, 'agent_id': 'agent-a'})
+
+    assert cur.executed == [
+        (
+            f"PREPARE {name} AS SELECT $1::text AS a FROM wallets "
+            "WHERE agent_id = $1 AND cash > $2",
+            None
+        ),
+        (f"EXECUTE {name} (%s, %s)", ('agent-a', 0))
+    ]
+
+
+def test_no_params(db, cur):
+    query = "SELECT symbol FROM stocks WHERE enabled = TRUE"
+    name = _statement_name(query)
+
+    db.execute_prepared(cur, query)
+
+    assert cur.executed == [
+        (f"PREPARE {name} AS {query}", None),
+        (f"EXECUTE {name}", None)
+    ]
+
+
+def test_prepares_once_per_connection(db, cur):
+    query = "SELECT * FROM positions WHERE agent_id = %s"
+
+    db.execute_prepared(cur, query, ('agent-a',))
+    db.execute_prepared(cur, query, ('agent-b',))
+
+    statements = [q for q, _ in cur.executed]
+    assert sum(q.startswith('PREPARE') for q in statements) == 1
+    assert cur.executed[-1][1] == ('agent-b',)
@@ -6,6 +6,8 @@ Estimate token count for AI context optimization
 import re
 from typing import List, Dict, Any
 
+_WHITESPACE_RE = re.compile(r'\s+')
+
 
 class TokenCounter:
     """Token counter for context optimization"""
@@ -28,7 +30,7 @@ class TokenCounter:
             return 0
         
         # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text.strip())
+        text = _WHITESPACE_RE.sub(' ', text.strip())
         
         # Rough estimate: 1 token ≈ 4 characters
         char_count = len(text)
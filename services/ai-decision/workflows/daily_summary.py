@@ -155,41 +155,51 @@ class DailySummaryWorkflow:
             Data dictionary
         """
         try:
-            # CHANGE: Reduce news window from 24h to 12h
-            news = self.data_collector.collect_news(hours=12)
-            news_analysis = self.data_collector.get_hourly_news_analysis(agent_id, hours=12)
-
-            # Existing data collection
-            positions = self.data_collector.get_positions(agent_id)
-            wallet = self.memory_manager.get_wallet(agent_id)
-            transactions = self.data_collector.get_recent_transactions(agent_id, days=1)
-            decision_history = self.data_collector.get_recent_transactions(agent_id, days=5, limit=50)
-            portfolio_value = self.data_collector.calculate_portfolio_value(agent_id)
-
-            # NEW: Get all stock symbols (including ETFs and indices)
-            all_stocks = self.data_collector.get_stock_list(enabled_only=True)
-            stock_symbols = [s['symbol'] for s in all_stocks]
-
-            # NEW: Get market indices
-            market_indices = self.data_collector.get_market_indices()
+            dc = self.data_collector
+
+            # Independent lookups: run concurrently so their round trips overlap
+            fetched = dc.gather({
+                # CHANGE: Reduce news window from 24h to 12h
+                'news': lambda: dc.collect_news(hours=12),
+                'news_analysis': lambda: dc.get_hourly_news_analysis(agent_id, hours=12),
+
+                # Existing data collection
+                'positions': lambda: dc.get_positions(agent_id),
+                'wallet': lambda: self.memory_manager.get_wallet(agent_id),
+                'transactions': lambda: dc.get_recent_transactions(agent_id, days=1),
+                'decision_history': lambda: dc.get_recent_transactions(agent_id, days=5, limit=50),
+                'portfolio_value': lambda: dc.calculate_portfolio_value(agent_id),
+
+                # NEW: Get all stock symbols (including ETFs and indices)
+                'all_stocks': lambda: dc.get_stock_list(enabled_only=True),
+
+                # NEW: Get market indices
+                'market_indices': dc.get_market_indices,
+            })
+
+            news = fetched['news']
+            news_analysis = fetched['news_analysis']
+            positions = fetched['positions']
+            wallet = fetched['wallet']
+            transactions = fetched['transactions']
+            decision_history = fetched['decision_history']
+            portfolio_value = fetched['portfolio_value']
+
+            stock_symbols = [s['symbol'] for s in fetched['all_stocks']]
+            market_indices = fetched['market_indices']
             all_symbols = stock_symbols + market_indices
 
             # NEW: Get 48h price changes from DynamoDB
             logger.info(f"Fetching 48h price data for {len(all_symbols)} symbols")
             price_changes_48h = self.data_collector.get_price_changes_48h(all_symbols)
 
-            # NEW: Get recent earnings reports (last 7 days for "new" flag)
-            recent_earnings = self.data_collector.get_recent_earnings_reports(
+            # NEW: Get recent earnings reports (last 7 days for "new" flag) and
+            # LATEST earnings for ALL stocks (even if months old) in one batch
+            recent_earnings, all_earnings = self.data_collector.get_earnings_overview(
                 symbols=stock_symbols,
                 days=7
             )
 
-            # NEW: Get LATEST earnings for ALL stocks (even if months old)
-            all_earnings = self.data_collector.get_latest_earnings_reports(
-                symbols=stock_symbols,
-                limit_per_symbol=1
-            )
-
             # ENHANCED: Better market environment inference
             market_env = self._infer_market_environment(
                 news=news,
@@ -920,27 +930,19 @@ User Requirement: Output PLAIN TEXT paragraphs only (no JSON, no structured data
                             if symbol in a.get('mentioned_stocks', [])
                         ]
 
-                        # 2. Retrieve stock memories from RAG
-                        stock_memories = self.rag_retriever.retrieve_stock_memories(
-                            agent_id=agent_id,
-                            symbol=symbol,
-                            num_results=3
-                        )
-
-                        # 3. Retrieve latest weekly summary from RAG
-                        weekly_memories = self.rag_retriever.retrieve_latest_stock_weekly_summary(
-                            agent_id=agent_id,
-                            symbol=symbol,
-                            num_results=1
-                        )
-
-                        # 4. Retrieve recent daily summaries (RAG) for past 5 days
-                        rag_daily_summaries = self.rag_retriever.retrieve_recent_stock_daily_summaries(
+                        # 2-4. Retrieve stock memories, the latest weekly summary and
+                        # daily summaries for the past 5 days from RAG (one request)
+                        rag_bundle = self.rag_retriever.retrieve_stock_bundle(
                             agent_id=agent_id,
                             symbol=symbol,
+                            num_memories=3,
                             days=5,
-                            num_results=5
+                            num_daily=5,
+                            num_weekly=1
                         )
+                        stock_memories = rag_bundle['memories']
+                        weekly_memories = rag_bundle['weekly_summaries']
+                        rag_daily_summaries = rag_bundle['daily_summaries']
 
                         batch_stock_data.append({
                             'symbol': symbol,
@@ -1217,8 +1219,8 @@ Output: Plain text paragraph, approximately 50 words."""
         """
         try:
             query = "SELECT symbol FROM stocks WHERE enabled = true"
-            result = self.db.execute_query(query)
-            return {row['symbol'] for row in result}
+            result = self.db.execute_query(query, fetch='tuples')
+            return {symbol for symbol, in result}
         except Exception as e:
             logger.error(f"Failed to fetch valid stock symbols: {e}")
             # Return empty set to fail-safe (won't filter anything if DB query fails)
@@ -1326,31 +1328,33 @@ Output: Plain text paragraph, approximately 50 words."""
             True if indexed successfully
         """
         try:
+            today = str(get_et_today())
+            documents = []
+
             for summary in stock_summaries:
                 # Generate embedding
                 embedding = self.bedrock.generate_embedding(summary['content'])
 
-                # Index to OpenSearch
-                decision_id = str(uuid.uuid4())
-
-                self.opensearch.index_decision(
-                    decision_id=decision_id,
-                    agent_id=agent_id,
-                    decision_embedding=embedding,
-                    reasoning=summary['content'],
-                    decision_type='STOCK_DAILY_SUMMARY',
-                    symbol=summary['symbol'],
-                    quality_weight=0.5,
-                    metadata={
+                documents.append({
+                    'decision_id': str(uuid.uuid4()),
+                    'agent_id': agent_id,
+                    'decision_embedding': embedding,
+                    'reasoning': summary['content'],
+                    'decision_type': 'STOCK_DAILY_SUMMARY',
+                    'symbol': summary['symbol'],
+                    'quality_weight': 0.5,
+                    'metadata': {
                         'type': 'stock_daily_summary',
-                        'date': str(get_et_today()),
+                        'date': today,
                         'symbol': summary['symbol'],
                         'agent_id': agent_id,
                         'sentiment': summary['sentiment'],
                         'is_holding': summary['is_holding'],
                         'mentioned_in_news': summary['mentioned_in_news']
                     }
-                )
+                })
+
+            self.opensearch.bulk_index_decisions(documents)
 
             logger.info(f"Indexed {len(stock_summaries)} stock summaries to RAG")
             return True
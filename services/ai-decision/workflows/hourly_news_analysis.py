@@ -5,12 +5,16 @@ Hourly News Analysis Workflow
 
 from typing import Dict, Any, List, Optional
 import json
+import re
 from services import DataCollector, MemoryManager, AIOrchestrator
 from core import DatabaseManager, create_context_logger
 from utils import TokenRecorder
 
 logger = create_context_logger()
 
+# Numeric part of a malformed confidence value ("pg0.95", "80%")
+_NUMBER_RE = re.compile(r'(\d+\.?\d*)')
+
 
 class HourlyNewsAnalysisWorkflow:
     """每小时新闻分析工作流"""
@@ -492,9 +496,8 @@ Please reply in JSON format."""
             return max(0.0, min(1.0, float(value)))
 
         if isinstance(value, str):
-            import re
             # Extract numeric value from string like "pg0.95", "0.8", "80%"
-            match = re.search(r'(\d+\.?\d*)', value)
+            match = _NUMBER_RE.search(value)
             if match:
                 num = float(match.group(1))
                 # If > 1, assume it's a percentage
@@ -523,6 +526,7 @@ Please reply in JSON format."""
         """
         try:
             news_analyses = analysis.get('news_analysis', [])
+            rows = []
 
             # 保存每条新闻的分析
             for news_analysis in news_analyses:
@@ -533,18 +537,6 @@ Please reply in JSON format."""
 
                 article = news[news_index]
 
-                query = """
-                    INSERT INTO hourly_news_analysis (
-                        agent_id,
-                        news_id,
-                        analysis,
-                        sentiment,
-                        mentioned_stocks,
-                        impact_prediction,
-                        confidence_score
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s)
-                """
-
                 # 构建分析文本
                 analysis_text = f"""
 Short-term impact: {news_analysis.get('short_term_impact', 'N/A')}
@@ -555,20 +547,33 @@ Key insights: {news_analysis.get('key_insights', 'N/A')}
                 # Clean and validate confidence score
                 confidence = self._parse_confidence(news_analysis.get('confidence', 0.5))
 
-                self.data_collector.db.execute_update(
-                    query,
-                    (
+                rows.append((
+                    agent_id,
+                    article['news_id'],
+                    analysis_text,
+                    news_analysis.get('sentiment', 'NEUTRAL'),
+                    news_analysis.get('mentioned_stocks', []),
+                    news_analysis.get('short_term_impact', ''),
+                    confidence
+                ))
+
+            # One multi-row INSERT instead of a round trip per article
+            self.data_collector.execute_values(
+                """
+                    INSERT INTO hourly_news_analysis (
                         agent_id,
-                        article['news_id'],
-                        analysis_text,
-                        news_analysis.get('sentiment', 'NEUTRAL'),
-                        news_analysis.get('mentioned_stocks', []),
-                        news_analysis.get('short_term_impact', ''),
-                        confidence
-                    )
-                )
+                        news_id,
+                        analysis,
+                        sentiment,
+                        mentioned_stocks,
+                        impact_prediction,
+                        confidence_score
+                    ) VALUES %s
+                """,
+                rows
+            )
             
-            saved_count = len(news_analyses)
+            saved_count = len(rows)
             logger.info(
                 f"Saved {saved_count} news analyses out of {len(news)} total news articles"
             )
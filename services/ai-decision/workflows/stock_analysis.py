@@ -125,8 +125,8 @@ class StockAnalysisWorkflow:
             lookback_hours = lookback_days * 24
 
             # Stocks and ETFs
-            stocks = self.data_collector.get_stock_list(enabled_only=True, stock_type='stock')
-            etfs = self.data_collector.get_stock_list(enabled_only=True, stock_type='etf')
+            stock_lists = self.data_collector.get_stock_lists(['stock', 'etf'])
+            stocks, etfs = stock_lists['stock'], stock_lists['etf']
             all_assets = {s['symbol']: s for s in stocks + etfs}
 
             # Filter symbols if provided
@@ -142,16 +142,18 @@ class StockAnalysisWorkflow:
             if not symbols:
                 return None
 
-            # News (titles) and news analyses (with own analysis)
+            # News (titles)
             news = self.data_collector.collect_news(hours=lookback_hours, symbols=symbols)
-            news_analysis = self.data_collector.get_hourly_news_analysis(agent_id, hours=lookback_hours)
 
-            # Positions (to flag holdings)
-            positions = self.data_collector.get_positions(agent_id)
+            # News analyses (with own analysis), positions (to flag holdings) and
+            # decision history (last 5 days) in one round trip
+            snapshot = self.data_collector.get_agent_snapshot(
+                agent_id, days=5, hours=lookback_hours, limit=50
+            )
+            news_analysis = snapshot['news_analysis']
+            positions = snapshot['positions']
             holding_symbols = {p['symbol'] for p in positions}
-
-            # Decision history (last 5 days)
-            decision_history = self.data_collector.get_recent_transactions(agent_id, days=5, limit=50)
+            decision_history = snapshot['transactions']
 
             # Previous summaries
             daily_summaries = self._fetch_recent_daily_summaries(agent_id, symbols, lookback_days)
@@ -195,7 +197,7 @@ class StockAnalysisWorkflow:
                 FROM stock_summaries
                 WHERE agent_id = %s
                   AND summary_type = 'daily'
-                  AND summary_date >= CURRENT_DATE - INTERVAL '%s days'
+                  AND summary_date >= CURRENT_DATE - (%s * INTERVAL '1 day')
                   AND symbol = ANY(%s)
                 ORDER BY symbol, summary_date DESC
             """
@@ -306,17 +308,16 @@ class StockAnalysisWorkflow:
                     logger.warning(f"Skipping {symbol} due to missing financial report summary")
                     continue
 
-                rag_memories = self.rag_retriever.retrieve_stock_memories(
-                    agent_id=agent_id,
-                    symbol=symbol,
-                    num_results=5
-                )
-                rag_daily_summaries = self.rag_retriever.retrieve_recent_stock_daily_summaries(
+                rag_bundle = self.rag_retriever.retrieve_stock_bundle(
                     agent_id=agent_id,
                     symbol=symbol,
+                    num_memories=5,
                     days=5,
-                    num_results=5
+                    num_daily=5,
+                    num_weekly=0
                 )
+                rag_memories = rag_bundle['memories']
+                rag_daily_summaries = rag_bundle['daily_summaries']
 
                 prompt = self._build_stock_prompt(
                     symbol=symbol,
@@ -579,28 +580,32 @@ Principles:
         Index stock analyses to OpenSearch RAG
         """
         try:
+            today = str(get_et_today())
+            documents = []
+
             for summary in stock_summaries:
                 embedding = self.bedrock.generate_embedding(summary['content'])
-                decision_id = str(uuid.uuid4())
 
-                self.opensearch.index_decision(
-                    decision_id=decision_id,
-                    agent_id=agent_id,
-                    decision_embedding=embedding,
-                    reasoning=summary['content'],
-                    decision_type='STOCK_WEEKLY_SUMMARY',
-                    symbol=summary['symbol'],
-                    quality_weight=0.5,
-                    metadata={
+                documents.append({
+                    'decision_id': str(uuid.uuid4()),
+                    'agent_id': agent_id,
+                    'decision_embedding': embedding,
+                    'reasoning': summary['content'],
+                    'decision_type': 'STOCK_WEEKLY_SUMMARY',
+                    'symbol': summary['symbol'],
+                    'quality_weight': 0.5,
+                    'metadata': {
                         'type': 'stock_analysis',
-                        'date': str(get_et_today()),
+                        'date': today,
                         'symbol': summary['symbol'],
                         'agent_id': agent_id,
                         'sentiment': summary['sentiment'],
                         'is_holding': summary['is_holding'],
                         'mentioned_in_news': summary['mentioned_in_news']
                     }
-                )
+                })
+
+            self.opensearch.bulk_index_decisions(documents)
 
             logger.info(f"Indexed {len(stock_summaries)} stock analyses to RAG")
             return True
@@ -202,6 +202,9 @@ class TradingDecisionWorkflow:
             else:
                 logger.info("Step 5: Executing trade")
                 success = self.executor.execute_trade(agent_id, decision)
+                # The executor changed the wallet and trade quota directly
+                self.memory_manager.invalidate(agent_id)
+                self.validator.invalidate(agent_id)
 
                 if not success:
                     logger.error("Trade execution failed")
@@ -292,8 +295,8 @@ class TradingDecisionWorkflow:
             yesterday_summary = daily_reviews[0] if daily_reviews else None
 
             # Stock/ETF list and 48-hour price data from DynamoDB
-            stocks = self.data_collector.get_stock_list(enabled_only=True, stock_type='stock')
-            etfs = self.data_collector.get_stock_list(enabled_only=True, stock_type='etf')
+            stock_lists = self.data_collector.get_stock_lists(['stock', 'etf'])
+            stocks, etfs = stock_lists['stock'], stock_lists['etf']
             all_symbols = [s['symbol'] for s in (stocks + etfs)]
 
             # Get 48-hour price changes from DynamoDB (stocks + ETFs)
@@ -318,23 +321,21 @@ class TradingDecisionWorkflow:
                     num_results=5
                 )
 
-            # Current positions
-            positions = self.data_collector.get_positions(agent_id)
-
-            # Wallet status
-            wallet = self.memory_manager.get_wallet(agent_id)
-
-            # Monthly trade quota
-            monthly_quota = self.memory_manager.get_monthly_trade_quota(agent_id)
-
-            # AI state
-            ai_state = self.memory_manager.load_ai_state(agent_id)
-
-            # Key events
-            key_events = self.memory_manager.get_key_events(agent_id, limit=20)
-
-            # Recent news (24 hours)
-            news = self.data_collector.collect_news(hours=24)
+            # Agent context (AI state, wallet, positions), key events and recent
+            # news (24 hours) are independent: fetch them concurrently
+            fetched = self.data_collector.gather({
+                'agent_context': lambda: self.memory_manager.prefetch_agent_context(agent_id),
+                'key_events': lambda: self.memory_manager.get_key_events(agent_id, limit=20),
+                'news': lambda: self.data_collector.collect_news(hours=24),
+            })
+
+            agent_context = fetched['agent_context']
+            positions = agent_context['positions']
+            wallet = agent_context['wallet']
+            ai_state = agent_context['state']
+            monthly_quota = ai_state.get('monthly_trade_quota') or {'used': 0, 'limit': 5, 'month': None}
+            key_events = fetched['key_events']
+            news = fetched['news']
 
             # Market environment (inferred from market indices in DynamoDB)
             market_env = self._infer_market_environment(news, prices)